@@ -0,0 +1,216 @@
+"""
+Coroutine counterpart of the GitHub clients.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import weakref
+from typing import AsyncIterator, Awaitable, List, Optional
+
+DEFAULT_CONCURRENCY = 8
+
+
+class AsyncGitHub:
+    """
+    Exposes the methods of a `GitHub` client as coroutines, so that requests
+    for many repositories (e.g. listing pages, pull request lookups, check
+    runs and merges) can be in flight at the same time.
+
+    The requests are sent by the wrapped client on a thread pool, so they
+    share its connection pool, cache, rate limiter and retries, and the
+    methods that a subclass overrides (e.g. to serve prefetched data) are
+    respected. At most `concurrency` requests are in flight at the same time.
+
+    Coroutines can be awaited on any event loop. Synchronous code runs them
+    with `run` or `gather`, on an event loop that this class keeps
+    on a background thread. This is how the synchronous client fetches
+    the pages of a listing concurrently.
+
+    Whether changes are allowed depends on the wrapped client
+    (`GitHub` or `ReadWriteGitHub`).
+    """
+
+    def __init__(self, github, concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Creates an instance of this class.
+
+        :param github: The `instarepo.github.GitHub` client that sends the requests
+        :param concurrency: The maximum number of requests in flight
+        """
+        self.github = github
+        self.concurrency = max(concurrency, 1)
+        self._lock = threading.Lock()
+        self._worker = threading.local()
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        # a semaphore belongs to the event loop it is first used on
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def in_worker(self) -> bool:
+        """
+        Checks if the current thread is sending a request for this client.
+        Such a thread must not wait for other requests of this client,
+        because they might be queued behind it.
+        """
+        return getattr(self._worker, "active", False)
+
+    async def call(self, func, *args, **kwargs):
+        """
+        Calls the given blocking function on the thread pool,
+        waiting for a free slot first.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.concurrency)
+                self._semaphores[loop] = semaphore
+        async with semaphore:
+            return await loop.run_in_executor(
+                self._get_executor(), functools.partial(func, *args, **kwargs)
+            )
+
+    def submit(self, coroutine: Awaitable) -> concurrent.futures.Future:
+        """
+        Schedules the given coroutine on the background event loop.
+        Cancelling the returned future cancels the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
+
+    def run(self, coroutine: Awaitable):
+        """
+        Runs the given coroutine on the background event loop
+        and waits for its result.
+        """
+        return self.submit(coroutine).result()
+
+    def gather(self, *coroutines: Awaitable, return_exceptions: bool = False) -> List:
+        """
+        Runs the given coroutines concurrently and returns their results in order.
+
+        :param return_exceptions: Return the exceptions of failed coroutines instead of raising the first one
+        """
+
+        async def gather_all():
+            return await asyncio.gather(
+                *coroutines, return_exceptions=return_exceptions
+            )
+
+        return self.run(gather_all())
+
+    def close(self):
+        """
+        Stops the background event loop and the threads that send the requests.
+        """
+        with self._lock:
+            loop, thread, executor = self._loop, self._thread, self._executor
+            self._loop, self._thread, self._executor = None, None, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.concurrency,
+                    thread_name_prefix="github",
+                    initializer=self._mark_worker,
+                )
+            return self._executor
+
+    def _mark_worker(self):
+        self._worker.active = True
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="github-loop", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    async def get_all_repos(self, sort: str, direction: str) -> AsyncIterator:
+        iterator = iter(self.github.get_all_repos(sort, direction))
+        sentinel = object()
+        while True:
+            repo = await self.call(next, iterator, sentinel)
+            if repo is sentinel:
+                return
+            yield repo
+
+    async def get_all_repos_of_page(
+        self, sort: str, direction: str, page: int, per_page: int
+    ):
+        return await self.call(
+            lambda: list(
+                self.github.get_all_repos_of_page(sort, direction, page, per_page)
+            )
+        )
+
+    async def get_page(self, url: str, params: dict, items_key: Optional[str] = None):
+        """
+        Fetches one page of a list endpoint.
+        Returns its items and the relations of its `Link` header.
+        """
+        # pylint: disable=protected-access
+        return await self.call(self.github._get_page, url, params, items_key)
+
+    async def search_issues(self, query: str) -> list:
+        return await self.call(lambda: list(self.github.search_issues(query)))
+
+    async def create_merge_request(
+        self, full_name: str, head: str, base: str, title: str, body: str
+    ) -> str:
+        return await self.call(
+            self.github.create_merge_request, full_name, head, base, title, body
+        )
+
+    async def update_description(self, full_name: str, description: str):
+        return await self.call(self.github.update_description, full_name, description)
+
+    async def list_merge_requests(self, full_name: str, head: str, base: str):
+        return await self.call(self.github.list_merge_requests, full_name, head, base)
+
+    async def get_merge_request(self, full_name: str, pull_number: int):
+        return await self.call(self.github.get_merge_request, full_name, pull_number)
+
+    async def close_merge_request(self, full_name: str, pull_number: int):
+        return await self.call(self.github.close_merge_request, full_name, pull_number)
+
+    async def merge_merge_request(self, full_name: str, pull_number: int):
+        return await self.call(self.github.merge_merge_request, full_name, pull_number)
+
+    async def get_json(self, href: str):
+        return await self.call(self.github.get_json, href)
+
+    async def create_issue_comment(self, full_name: str, issue_number: int, body: str):
+        return await self.call(
+            self.github.create_issue_comment, full_name, issue_number, body
+        )
+
+    async def list_check_runs(self, full_name: str, sha: str):
+        return await self.call(self.github.list_check_runs, full_name, sha)
+
+    async def get_branch_sha(self, full_name: str, branch: str) -> Optional[str]:
+        return await self.call(self.github.get_branch_sha, full_name, branch)
+
+    async def get_tree(self, full_name: str, ref: str):
+        return await self.call(self.github.get_tree, full_name, ref)
+
+    async def get_blob_text(self, full_name: str, sha: str) -> str:
+        return await self.call(self.github.get_blob_text, full_name, sha)
+
+    async def create_ref(self, full_name: str, branch: str, sha: str):
+        return await self.call(self.github.create_ref, full_name, branch, sha)
+
+    async def delete_ref(self, full_name: str, branch: str):
+        return await self.call(self.github.delete_ref, full_name, branch)
@@ -0,0 +1,109 @@
+"""
+Unit tests for the async_github module.
+"""
+
+import asyncio
+import threading
+import time
+
+from .async_github import AsyncGitHub
+
+
+class FakeGitHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def list_check_runs(self, full_name: str, sha: str):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self._lock:
+            self.in_flight -= 1
+        return {"full_name": full_name, "sha": sha}
+
+    def get_all_repos(self, sort: str, direction: str):
+        yield from [sort, direction]
+
+
+def test_requests_run_concurrently_up_to_the_limit():
+    # arrange
+    github = FakeGitHub()
+    async_github = AsyncGitHub(github, concurrency=3)
+
+    async def run():
+        return await asyncio.gather(
+            *(async_github.list_check_runs(f"jdoe/repo{i}", "sha") for i in range(9))
+        )
+
+    # act
+    try:
+        results = asyncio.run(run())
+    finally:
+        async_github.close()
+
+    # assert
+    assert [result["full_name"] for result in results] == [
+        f"jdoe/repo{i}" for i in range(9)
+    ]
+    assert github.max_in_flight == 3
+
+
+def test_synchronous_code_gathers_on_the_background_loop():
+    # arrange
+    github = FakeGitHub()
+    async_github = AsyncGitHub(github, concurrency=4)
+
+    # act
+    try:
+        results = async_github.gather(
+            *(async_github.list_check_runs("jdoe/foo", f"sha{i}") for i in range(8))
+        )
+    finally:
+        async_github.close()
+
+    # assert
+    assert [result["sha"] for result in results] == [f"sha{i}" for i in range(8)]
+    assert github.max_in_flight == 4
+
+
+def test_gather_can_return_exceptions():
+    async_github = AsyncGitHub(FakeGitHub())
+
+    def fail():
+        raise ValueError("failed")
+
+    try:
+        results = async_github.gather(
+            async_github.call(fail),
+            async_github.call(lambda: "ok"),
+            return_exceptions=True,
+        )
+    finally:
+        async_github.close()
+
+    assert isinstance(results[0], ValueError)
+    assert results[1] == "ok"
+
+
+def test_only_the_threads_of_the_pool_are_workers():
+    async_github = AsyncGitHub(FakeGitHub())
+    try:
+        assert not async_github.in_worker()
+        assert async_github.run(async_github.call(async_github.in_worker))
+    finally:
+        async_github.close()
+
+
+def test_get_all_repos_is_an_async_iterator():
+    async_github = AsyncGitHub(FakeGitHub())
+
+    async def run():
+        return [repo async for repo in async_github.get_all_repos("pushed", "desc")]
+
+    try:
+        assert asyncio.run(run()) == ["pushed", "desc"]
+    finally:
+        async_github.close()
@@ -0,0 +1,306 @@
+"""
+Records HTTP exchanges into a cassette file and replays them without network access.
+
+A cassette makes whole runs (e.g. `instarepo fix`) repeatable offline,
+so that they can be timed and profiled against the same responses.
+Only HTTP traffic is captured; git operations over SSH still need the remotes.
+"""
+
+import base64
+import datetime
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+import requests.structures
+import requests.utils
+
+import instarepo.http_session
+
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# these describe the encoding on the wire, but the recorded body is already decoded
+_SKIPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class CassetteMissError(requests.exceptions.RequestException):
+    """
+    Raised when replaying a request that was not recorded.
+    """
+
+
+class Interaction:
+    """
+    One recorded request and the response that the server sent for it.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        body_hash: str,
+        status_code: int,
+        reason: str,
+        headers: Dict[str, str],
+        body: bytes,
+        elapsed: float,
+    ):
+        """
+        Creates an instance of this class.
+
+        :param method: The HTTP method of the request
+        :param url: The URL of the request
+        :param body_hash: The SHA-256 of the request body
+        :param status_code: The status code of the response
+        :param reason: The reason phrase of the response
+        :param headers: The headers of the response
+        :param body: The body of the response
+        :param elapsed: The number of seconds the server took to respond
+        """
+        self.method = method
+        self.url = url
+        self.body_hash = body_hash
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.elapsed = elapsed
+
+    def key(self) -> str:
+        return interaction_key(self.method, self.url, self.body_hash)
+
+    def to_json(self):
+        result = {
+            "method": self.method,
+            "url": self.url,
+            "body_hash": self.body_hash,
+            "status_code": self.status_code,
+            "reason": self.reason,
+            "headers": self.headers,
+            "elapsed": self.elapsed,
+        }
+        try:
+            result["text"] = self.body.decode("utf-8")
+        except UnicodeDecodeError:
+            result["base64"] = base64.b64encode(self.body).decode("ascii")
+        return result
+
+    @staticmethod
+    def from_json(value) -> "Interaction":
+        if "base64" in value:
+            body = base64.b64decode(value["base64"])
+        else:
+            body = value.get("text", "").encode("utf-8")
+        return Interaction(
+            value["method"],
+            value["url"],
+            value["body_hash"],
+            value["status_code"],
+            value.get("reason", ""),
+            value.get("headers", {}),
+            body,
+            value.get("elapsed", 0.0),
+        )
+
+
+def interaction_key(method: str, url: str, body_hash: str) -> str:
+    """
+    Gets the key that matches a request to its recorded interactions.
+    """
+    return f"{method.upper()} {url} {body_hash}"
+
+
+def body_hash(body) -> str:
+    """
+    Gets the SHA-256 of a request body, which can be missing, text or bytes.
+    """
+    if body is None:
+        body = b""
+    elif isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha256(body).hexdigest()
+
+
+class Cassette:
+    """
+    A list of recorded interactions, stored as a JSON file.
+
+    Requests are matched by method, URL and body. When the same request
+    was recorded more than once, the responses are replayed in the order
+    they were recorded, and the last one is repeated after that.
+
+    Request headers are not recorded, so that credentials never end up
+    in the file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Creates an instance of this class.
+
+        :param path: The path of the cassette file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._interactions: List[Interaction] = []
+        self._by_key: Dict[str, List[Interaction]] = {}
+        self._played: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._interactions)
+
+    def load(self):
+        """
+        Loads the interactions from the file.
+        """
+        with open(self.path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        for value in data["interactions"]:
+            self.add(Interaction.from_json(value))
+
+    def save(self):
+        """
+        Saves the interactions to the file.
+        """
+        with self._lock:
+            data = {
+                "interactions": [
+                    interaction.to_json() for interaction in self._interactions
+                ]
+            }
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=1)
+        logging.debug(
+            "Saved %d HTTP interactions to %s", len(data["interactions"]), self.path
+        )
+
+    def add(self, interaction: Interaction):
+        """
+        Adds an interaction.
+        """
+        with self._lock:
+            self._interactions.append(interaction)
+            self._by_key.setdefault(interaction.key(), []).append(interaction)
+
+    def play(self, method: str, url: str, hash_of_body: str) -> Optional[Interaction]:
+        """
+        Finds the next recorded interaction of the given request.
+        """
+        key = interaction_key(method, url, hash_of_body)
+        with self._lock:
+            candidates = self._by_key.get(key)
+            if not candidates:
+                return None
+            index = self._played.get(key, 0)
+            self._played[key] = index + 1
+            return candidates[min(index, len(candidates) - 1)]
+
+
+class RecordingAdapter(instarepo.http_session.PooledHTTPAdapter):
+    """
+    A transport adapter that sends requests to the network
+    and records every exchange in a cassette.
+    """
+
+    def __init__(self, cassette: Cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send_request(self, request, *args, **kwargs):
+        started = time.monotonic()
+        response = super().send_request(request, *args, **kwargs)
+        # reading the content here makes the recorded latency include the body
+        content = response.content
+        self.cassette.add(
+            Interaction(
+                request.method,
+                request.url,
+                body_hash(request.body),
+                response.status_code,
+                response.reason or "",
+                {
+                    name: value
+                    for name, value in response.headers.items()
+                    if name.lower() not in _SKIPPED_HEADERS
+                },
+                content or b"",
+                time.monotonic() - started,
+            )
+        )
+        return response
+
+
+class ReplayAdapter(instarepo.http_session.PooledHTTPAdapter):
+    """
+    A transport adapter that serves the responses of a cassette
+    and never touches the network.
+    """
+
+    def __init__(
+        self, cassette: Cassette, latency: bool = False, sleep=time.sleep, **kwargs
+    ):
+        """
+        Creates an instance of this class.
+
+        :param cassette: The recorded interactions
+        :param latency: Whether to wait as long as the server took when recording
+        :param sleep: Sleeps the calling thread for the given number of seconds
+        """
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        self.latency = latency
+        self._sleep = sleep
+
+    def send_request(self, request, *args, **kwargs):
+        interaction = self.cassette.play(
+            request.method, request.url, body_hash(request.body)
+        )
+        if interaction is None:
+            raise CassetteMissError(
+                f"No recorded response for {request.method} {request.url}",
+                request=request,
+            )
+        if self.latency and interaction.elapsed > 0:
+            self._sleep(interaction.elapsed)
+        response = requests.Response()
+        response.status_code = interaction.status_code
+        response.reason = interaction.reason
+        response.headers = requests.structures.CaseInsensitiveDict(interaction.headers)
+        response._content = interaction.body  # pylint: disable=protected-access
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = datetime.timedelta(seconds=interaction.elapsed)
+        return response
+
+
+def install(mode: str, path: str, latency: bool = False) -> Cassette:
+    """
+    Makes all sessions created from now on record to or replay from
+    the given cassette file.
+
+    :param mode: Either `record` or `replay`
+    :param path: The path of the cassette file
+    :param latency: When replaying, whether to wait as long as the server took when recording
+    """
+    cassette = Cassette(path)
+    if mode == MODE_RECORD:
+
+        def factory(**kwargs):
+            return RecordingAdapter(cassette, **kwargs)
+
+    elif mode == MODE_REPLAY:
+        cassette.load()
+
+        def factory(**kwargs):
+            return ReplayAdapter(cassette, latency, **kwargs)
+
+    else:
+        raise ValueError(f"Unknown cassette mode {mode}")
+    instarepo.http_session.set_adapter_factory(factory)
+    return cassette
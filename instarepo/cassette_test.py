@@ -0,0 +1,95 @@
+"""
+Unit tests for the cassette module.
+"""
+
+import http.server
+import threading
+
+import pytest
+import requests
+
+import instarepo.http_session
+from .cassette import (
+    Cassette,
+    CassetteMissError,
+    Interaction,
+    ReplayAdapter,
+    body_hash,
+    install,
+    MODE_RECORD,
+    MODE_REPLAY,
+)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    counter = 0
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        _Handler.counter += 1
+        body = f'{{"counter": {_Handler.counter}}}'.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+@pytest.fixture(name="restore_adapter")
+def fixture_restore_adapter():
+    yield
+    instarepo.http_session.set_adapter_factory(None)
+
+
+def test_record_and_replay(
+    tmp_path, restore_adapter
+):  # pylint: disable=unused-argument
+    # arrange
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/data"
+    path = str(tmp_path / "cassette.json")
+
+    # act
+    try:
+        cassette = install(MODE_RECORD, path)
+        session = instarepo.http_session.create_session()
+        recorded = [session.get(url).json() for _ in range(2)]
+        cassette.save()
+    finally:
+        server.shutdown()
+    install(MODE_REPLAY, path)
+    session = instarepo.http_session.create_session()
+    replayed = [session.get(url).json() for _ in range(3)]
+
+    # assert
+    assert recorded == [{"counter": 1}, {"counter": 2}]
+    assert replayed == [{"counter": 1}, {"counter": 2}, {"counter": 2}]
+
+
+def test_replay_unknown_request(tmp_path):
+    cassette = Cassette(str(tmp_path / "cassette.json"))
+    session = requests.Session()
+    session.mount("https://", ReplayAdapter(cassette))
+    with pytest.raises(CassetteMissError):
+        session.get("https://api.github.com/user/repos")
+
+
+def test_replay_with_latency(tmp_path):
+    cassette = Cassette(str(tmp_path / "cassette.json"))
+    cassette.add(
+        Interaction(
+            "GET", "https://example.com/", body_hash(None), 200, "OK", {}, b"hi", 0.5
+        )
+    )
+    sleeps = []
+    session = requests.Session()
+    session.mount(
+        "https://", ReplayAdapter(cassette, latency=True, sleep=sleeps.append)
+    )
+    assert session.get("https://example.com/").text == "hi"
+    assert sleeps == [0.5]
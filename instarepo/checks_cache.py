@@ -0,0 +1,119 @@
+"""
+Caches the check runs of commits.
+"""
+
+import json
+import logging
+import os
+import os.path
+import threading
+from typing import Dict, Optional, Tuple
+
+import instarepo.github
+
+
+class CommitChecks:
+    """
+    The check runs of a commit.
+    """
+
+    def __init__(self, check_runs):
+        """
+        Creates an instance of this class.
+
+        :param check_runs: The result of the list check runs API
+        """
+        self.check_runs = check_runs
+
+    def is_completed(self) -> bool:
+        """
+        Checks if all check runs have reached their final state.
+        Once that happens, the results of the commit never change.
+
+        A commit without any check runs is not completed,
+        because its CI might not have started yet.
+        """
+        check_runs = self.check_runs["check_runs"]
+        if not check_runs:
+            return False
+        for check_run in check_runs:
+            if check_run["status"] != "completed":
+                return False
+        return True
+
+    def to_json(self):
+        return {"check_runs": self.check_runs}
+
+    @staticmethod
+    def from_json(value) -> "CommitChecks":
+        return CommitChecks(value["check_runs"])
+
+
+class ChecksCache:
+    """
+    Caches the checks of commits, keyed by repository and SHA.
+
+    Checks that are completed are kept permanently (on disk, if a directory
+    is given), because their outcome never changes. Commits that still have
+    checks in progress are fetched again every time.
+    """
+
+    def __init__(
+        self, github: instarepo.github.GitHub, directory: Optional[str] = None
+    ):
+        """
+        Creates an instance of this class.
+
+        :param github: The GitHub client
+        :param directory: Optionally persist completed checks in this directory
+        """
+        self.github = github
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._completed: Dict[Tuple[str, str], CommitChecks] = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, full_name: str, sha: str) -> CommitChecks:
+        """
+        Gets the checks of the given commit.
+        """
+        key = (full_name, sha)
+        with self._lock:
+            cached = self._completed.get(key)
+        if cached is None:
+            cached = self._load(full_name, sha)
+        if cached is not None:
+            return cached
+        checks = CommitChecks(self.github.list_check_runs(full_name, sha))
+        if checks.is_completed():
+            with self._lock:
+                self._completed[key] = checks
+            self._save(full_name, sha, checks)
+        return checks
+
+    def _filename(self, full_name: str, sha: str) -> str:
+        return os.path.join(
+            self.directory, full_name.replace("/", "__") + "@" + sha + ".json"
+        )
+
+    def _load(self, full_name: str, sha: str) -> Optional[CommitChecks]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._filename(full_name, sha), "r", encoding="utf-8") as file:
+                checks = CommitChecks.from_json(json.load(file))
+        except (OSError, ValueError, KeyError):
+            return None
+        with self._lock:
+            self._completed[(full_name, sha)] = checks
+        return checks
+
+    def _save(self, full_name: str, sha: str, checks: CommitChecks):
+        if not self.directory:
+            return
+        try:
+            with open(self._filename(full_name, sha), "w", encoding="utf-8") as file:
+                json.dump(checks.to_json(), file)
+        except OSError as ex:
+            logging.warning("Could not cache checks of %s@%s: %s", full_name, sha, ex)
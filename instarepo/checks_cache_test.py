@@ -0,0 +1,59 @@
+"""
+Unit tests for the checks_cache module.
+"""
+
+from pytest_mock import MockerFixture
+
+from .checks_cache import ChecksCache
+
+
+def _check_runs(*statuses):
+    return {
+        "total_count": len(statuses),
+        "check_runs": [
+            {
+                "status": status,
+                "conclusion": "success" if status == "completed" else None,
+            }
+            for status in statuses
+        ],
+    }
+
+
+def test_completed_checks_are_persisted(mocker: MockerFixture, tmp_path):
+    # arrange
+    github = mocker.Mock()
+    github.list_check_runs.return_value = _check_runs("completed", "completed")
+
+    # act
+    first = ChecksCache(github, str(tmp_path)).get("jdoe/foo", "abc")
+    second = ChecksCache(github, str(tmp_path)).get("jdoe/foo", "abc")
+
+    # assert
+    assert first.is_completed()
+    assert second.check_runs == first.check_runs
+    github.list_check_runs.assert_called_once_with("jdoe/foo", "abc")
+
+
+def test_checks_in_progress_are_fetched_again(mocker: MockerFixture, tmp_path):
+    github = mocker.Mock()
+    github.list_check_runs.return_value = _check_runs("completed", "in_progress")
+    cache = ChecksCache(github, str(tmp_path))
+
+    assert not cache.get("jdoe/foo", "abc").is_completed()
+    cache.get("jdoe/foo", "abc")
+
+    assert github.list_check_runs.call_count == 2
+
+
+def test_commit_without_checks_is_not_persisted(mocker: MockerFixture, tmp_path):
+    # CI has not started yet, so there are no check runs
+    github = mocker.Mock()
+    github.list_check_runs.return_value = _check_runs()
+
+    first = ChecksCache(github, str(tmp_path)).get("jdoe/foo", "abc")
+    ChecksCache(github, str(tmp_path)).get("jdoe/foo", "abc")
+
+    assert not first.is_completed()
+    assert github.list_check_runs.call_count == 2
+    assert not list(tmp_path.iterdir())
@@ -5,6 +5,7 @@ from datetime import date, datetime
 
 import instarepo.git
 import instarepo.github
+import instarepo.mirror_cache
 import instarepo.repo_source
 
 
@@ -19,6 +20,11 @@ class AnalyzeCommand:
         # 2017-02-18
         self.since = datetime.strptime(args.since, "%Y-%m-%d").date()
         self.metric: str = args.metric
+        self.mirror_cache = None
+        if args.mirror_cache_dir:
+            self.mirror_cache = instarepo.mirror_cache.MirrorCache(
+                args.mirror_cache_dir, quiet=not self.verbose
+            )
 
     def run(self):
         repos = self.repo_source.get()
@@ -29,7 +35,9 @@ class AnalyzeCommand:
         logging.info("Processing repo %s", repo.name)
         with tempfile.TemporaryDirectory() as tmpdirname:
             logging.debug("Cloning repo into temp dir %s", tmpdirname)
-            git = instarepo.git.clone(repo.ssh_url, tmpdirname, quiet=not self.verbose)
+            git = instarepo.mirror_cache.clone(
+                self.mirror_cache, repo, tmpdirname, quiet=not self.verbose
+            )
             self.process_git(git)
 
     def process_git(self, git: instarepo.git.GitWorkingDir):
@@ -1,8 +1,8 @@
 import logging
 import os.path
 
-import instarepo.git
 import instarepo.github
+import instarepo.mirror_cache
 import instarepo.repo_source
 
 
@@ -13,6 +13,11 @@ class CloneCommand:
         )
         self.verbose: bool = args.verbose
         self.projects_dir: str = args.projects_dir
+        self.mirror_cache = None
+        if "mirror_cache_dir" in args and args.mirror_cache_dir:
+            self.mirror_cache = instarepo.mirror_cache.MirrorCache(
+                args.mirror_cache_dir, quiet=not self.verbose
+            )
 
     def run(self):
         if not os.path.isdir(self.projects_dir):
@@ -24,4 +29,10 @@ class CloneCommand:
                 logging.info("Skipping %s because it already exists", repo.name)
             else:
                 logging.info("Cloning %s", repo.name)
-                instarepo.git.clone(repo.ssh_url, project_dir, quiet=not self.verbose)
+                instarepo.mirror_cache.clone(
+                    self.mirror_cache,
+                    repo,
+                    project_dir,
+                    quiet=not self.verbose,
+                    persistent=True,
+                )
@@ -2,18 +2,30 @@
 Applies fixes to a repository that is either locally checked out
 or remote on GitHub.
 """
+import itertools
 import logging
+import os.path
 import tempfile
-from typing import Iterable
+import time
+from typing import Iterable, Iterator, Optional, Tuple
 
+import requests
+
+import instarepo.checks_cache
+import instarepo.fixers.prescreen
 import instarepo.git
 import instarepo.github
+import instarepo.mirror_cache
+import instarepo.pr_index
+import instarepo.repo_history
 import instarepo.repo_source
+import instarepo.virtual_git
 
-from ..credentials import build_requests_auth
 from ..fixers.discovery import (
     all_fixer_classes,
+    is_read_only,
     select_fixer_classes,
+    supports_api_commits,
 )
 from ..fixers.naming import fixer_class_to_fixer_key
 
@@ -90,35 +102,189 @@ class FixRemote(FixBase):
         super().__init__(args)
         if args.local_dir:
             raise ValueError("local_dir must be empty")
-        auth = build_requests_auth(args)
-        if args.dry_run:
-            self.github = instarepo.github.GitHub(auth=auth)
-        else:
-            self.github = instarepo.github.ReadWriteGitHub(auth=auth)
+        self.github = instarepo.github.build_github(
+            args, read_write=not args.dry_run, head_branch=BRANCH_NAME
+        )
+        self.pr_index = instarepo.pr_index.PullRequestIndex(self.github, BRANCH_NAME)
+        checks_dir = None
+        if args.http_cache_dir:
+            checks_dir = os.path.join(args.http_cache_dir, "checks")
+        self.checks_cache = instarepo.checks_cache.ChecksCache(self.github, checks_dir)
         self.auto_merge = args.auto_merge
         self.force = args.force
+        self.prescreen = "prescreen" not in args or args.prescreen
+        self.read_only = all(map(is_read_only, self.fixer_classes))
+        self.commit_via_api = "commit_via_api" in args and args.commit_via_api
+        if self.commit_via_api:
+            unsupported = [
+                fixer_class_to_fixer_key(fixer_class)
+                for fixer_class in self.fixer_classes
+                if not supports_api_commits(fixer_class)
+            ]
+            if unsupported:
+                logging.warning(
+                    "Cloning repos, because these fixers cannot commit through the API: %s",
+                    ", ".join(unsupported),
+                )
+                self.commit_via_api = False
         self.repo_source = (
             instarepo.repo_source.RepoSourceBuilder()
             .with_github(self.github)
             .with_args(args)
             .build()
         )
+        self.history = None
+        self.order = "github"
+        if "history_db" in args:
+            if args.history_db:
+                self.history = instarepo.repo_history.RepoHistory(args.history_db)
+            self.order = args.order
+            if self.order == "smart" and not self.history:
+                raise ValueError("--order smart needs --history-db")
+        self.outcome = instarepo.repo_history.RunOutcome()
+        self.mirror_cache = None
+        if "mirror_cache_dir" in args and args.mirror_cache_dir:
+            self.mirror_cache = instarepo.mirror_cache.MirrorCache(
+                args.mirror_cache_dir, quiet=not self.verbose
+            )
 
     def run(self):
         super().run()
         repos = self.repo_source.get()
-        for repo in repos:
-            if self.config.get_setting(repo.full_name, "enabled"):
-                self._process(repo)
+        if self.order == "smart":
+            repos = self.history.order(repos)
+        enabled_repos = (
+            repo for repo in repos if self.config.get_setting(repo.full_name, "enabled")
+        )
+        # the pull requests of the next few repos are looked up at the same time
+        for batch in _batches(enabled_repos, self.github.async_github.concurrency):
+            self.pr_index.prefetch(batch)
+            for repo in batch:
+                self._process_and_record(repo)
+
+    def _process_and_record(self, repo: instarepo.github.Repo):
+        """
+        Processes the given repo, recording its outcome and duration in the history.
+        """
+        self.outcome = instarepo.repo_history.RunOutcome()
+        if not self.history:
+            self._process(repo)
+            return
+        started = time.monotonic()
+        failed = True
+        try:
+            self._process(repo)
+            failed = False
+        finally:
+            self.history.record(
+                repo.full_name, time.monotonic() - started, self.outcome, failed
+            )
 
     def _process(self, repo: instarepo.github.Repo):
+        via_api = self.read_only or self.commit_via_api
+        head, tree = None, None
+        if self.prescreen or via_api:
+            head, tree = self._fetch_default_branch(repo, by_sha=via_api)
+        if self.prescreen and tree is not None and self._can_skip(repo, tree):
+            logging.info("Skipping repo %s, no fixer would change it", repo.name)
+            return
+        if via_api and tree is not None and self._process_via_api(repo, head, tree):
+            # read-only fixers need no clone, but the pull request
+            # of an earlier run may still need to be merged or closed
+            return
         logging.info("Processing repo %s", repo.name)
         with tempfile.TemporaryDirectory() as tmpdirname:
             logging.debug("Cloning repo into temp dir %s", tmpdirname)
-            git = instarepo.git.clone(repo.ssh_url, tmpdirname, quiet=not self.verbose)
-            self._process_in_temp_directory(repo, git)
+            git = instarepo.mirror_cache.clone(
+                self.mirror_cache, repo, tmpdirname, quiet=not self.verbose
+            )
+            self._process_working_dir(repo, git)
+
+    def _fetch_default_branch(
+        self, repo: instarepo.github.Repo, by_sha: bool
+    ) -> Tuple[Optional[str], Optional[instarepo.fixers.prescreen.RepoTree]]:
+        """
+        Gets the files of the default branch, once for both pre-screening
+        and committing through the API. Returns None instead of the files
+        if they are not available, so that the repo is cloned instead.
+
+        :param repo: The repository
+        :param by_sha: Fetch the files by the SHA of the default branch,
+            which is returned as well, so that commits made through
+            the API are based on exactly these files
+        """
+        try:
+            head = None
+            if by_sha:
+                head = self.github.get_branch_sha(repo.full_name, repo.default_branch)
+                if not head:
+                    return None, None
+            return head, self._fetch_tree(repo, head or repo.default_branch)
+        except (requests.RequestException, ValueError, KeyError) as ex:
+            # the clone handles everything
+            logging.debug("Could not fetch the files of repo %s: %s", repo.name, ex)
+            return None, None
+
+    def _process_via_api(
+        self,
+        repo: instarepo.github.Repo,
+        head: str,
+        tree: instarepo.fixers.prescreen.RepoTree,
+    ) -> bool:
+        """
+        Runs the fixers against files served by the GitHub API, committing
+        through the Git Data API instead of cloning and pushing.
+        Returns False if the files are not available (e.g. the tree is truncated).
+        """
+        git = instarepo.virtual_git.GitDataWorkingDir.open(
+            self.github, repo, lambda sha: self._fetch_tree(repo, sha), head, tree
+        )
+        if git is None:
+            logging.debug("Could not fetch the files of repo %s", repo.name)
+            return False
+        logging.info("Processing repo %s through the Git Data API", repo.name)
+        self._process_working_dir(repo, git)
+        return True
+
+    def _fetch_tree(self, repo: instarepo.github.Repo, ref: str):
+        """
+        Gets the files of the given branch, or None if they are not available.
+        """
+        tree_json = self.github.get_tree(repo.full_name, ref)
+        if tree_json is None:
+            return None
+        return instarepo.fixers.prescreen.RepoTree.from_json(
+            tree_json,
+            lambda sha: self.github.get_blob_text(repo.full_name, sha),
+        )
+
+    def _can_skip(
+        self, repo: instarepo.github.Repo, tree: instarepo.fixers.prescreen.RepoTree
+    ) -> bool:
+        """
+        Checks, without cloning, if the repo can be skipped because no fixer
+        could change anything. Repos that already have the instarepo branch
+        are never skipped, because their PR might need to be merged or closed.
+        """
+        try:
+            context = instarepo.fixers.context.Context(
+                git=None,
+                config=self.config,
+                repo=repo,
+                github=self.github,
+                verbose=self.verbose,
+            )
+            if instarepo.fixers.prescreen.fixers_that_could_change(
+                self.fixer_classes, tree, context
+            ):
+                return False
+            return self.github.get_branch_sha(repo.full_name, BRANCH_NAME) is None
+        except (requests.RequestException, ValueError, KeyError) as ex:
+            # pre-screening is only an optimization, the clone handles everything
+            logging.debug("Could not pre-screen repo %s: %s", repo.name, ex)
+            return False
 
-    def _process_in_temp_directory(
+    def _process_working_dir(
         self, repo: instarepo.github.Repo, git: instarepo.git.GitWorkingDir
     ):
         is_remote_branch_present = git.is_remote_branch_present(BRANCH_NAME)
@@ -157,6 +323,7 @@ class FixRemote(FixBase):
         )
         changes = composite_fixer.run()
         if changes:
+            self.outcome.changed = True
             self._create_merge_request(repo, git, changes, needs_force_push)
         elif ahead > 0 and self.auto_merge:
             # no changes in this run, but we are ahead of default branch, we can auto-merge
@@ -197,12 +364,11 @@ class FixRemote(FixBase):
                 format_body(changes),
             )
             logging.info("Created PR for repo %s - %s", repo.name, html_url)
+            self.pr_index.add(repo, html_url)
+            self.outcome.pull_request = True
 
     def _list_merge_requests(self, repo: instarepo.github.Repo):
-        head = self.github.auth.username + ":" + BRANCH_NAME
-        return self.github.list_merge_requests(
-            repo.full_name, head, repo.default_branch
-        )
+        return self.pr_index.list_merge_requests(repo)
 
     def _close_mr_if_exists(self, repo: instarepo.github.Repo):
         merge_requests = self._list_merge_requests(repo)
@@ -216,46 +382,35 @@ class FixRemote(FixBase):
             "It seems the changes in this MR have already been fixed, auto-closing.",
         )
         self.github.close_merge_request(repo.full_name, number)
+        self.pr_index.remove(repo, number)
 
     def _auto_merge_existing_mr(self, repo: instarepo.github.Repo):
         merge_requests = self._list_merge_requests(repo)
-        for merge_request in merge_requests:
-            if self._auto_merge_one_existing_mr(repo, merge_request):
-                return True
-        return False
-
-    def _auto_merge_one_existing_mr(self, repo: instarepo.github.Repo, merge_request):
-        number = merge_request["number"]
-        details = self.github.get_merge_request(repo.full_name, number)
-        if not details["mergeable"]:
-            logging.debug("Cannot merge MR because GitHub reports it is not mergeable")
-            return False
-        mergeable_state = details["mergeable_state"]
-        if mergeable_state != "clean":
-            logging.debug(
-                "Cannot merge MR because the mergeable state is not clean but %s",
-                mergeable_state,
+        async_github = self.github.async_github
+        # the details of all pull requests are fetched at the same time,
+        # then the checks of the head commits of the mergeable ones
+        all_details = async_github.gather(
+            *(
+                async_github.get_merge_request(repo.full_name, merge_request["number"])
+                for merge_request in merge_requests
             )
-            return False
-        head_sha = merge_request["head"]["sha"]
-        check_runs = self.github.list_check_runs(repo.full_name, head_sha)
-        if check_runs["total_count"] <= 0:
-            logging.debug("Cannot merge MR because there are no check runs")
-            return False
-        for check_run in check_runs["check_runs"]:
-            status = check_run["status"]
-            if status != "completed":
-                logging.debug("Cannot merge MR because there are incomplete check runs")
-                return False
-            conclusion = check_run["conclusion"]
-            if conclusion != "success":
-                logging.debug(
-                    "Cannot merge MR because there are unsuccessful check runs"
+        )
+        candidates = list(filter(_is_mergeable, all_details))
+        all_checks = async_github.gather(
+            *(
+                async_github.call(
+                    self.checks_cache.get, repo.full_name, details["head"]["sha"]
                 )
-                return False
-
-        self.github.merge_merge_request(repo.full_name, number)
-        return True
+                for details in candidates
+            )
+        )
+        for details, checks in zip(candidates, all_checks):
+            if _are_successful(checks):
+                number = details["number"]
+                self.github.merge_merge_request(repo.full_name, number)
+                self.pr_index.remove(repo, number)
+                return True
+        return False
 
     def _should_start_from_scratch(
         self, behind, ahead, git: instarepo.git.GitWorkingDir
@@ -289,6 +444,48 @@ class FixRemote(FixBase):
         return False
 
 
+def _is_mergeable(details) -> bool:
+    if not details["mergeable"]:
+        logging.debug("Cannot merge MR because GitHub reports it is not mergeable")
+        return False
+    mergeable_state = details["mergeable_state"]
+    if mergeable_state != "clean":
+        logging.debug(
+            "Cannot merge MR because the mergeable state is not clean but %s",
+            mergeable_state,
+        )
+        return False
+    return True
+
+
+def _are_successful(checks: instarepo.checks_cache.CommitChecks) -> bool:
+    check_runs = checks.check_runs
+    if check_runs["total_count"] <= 0:
+        logging.debug("Cannot merge MR because there are no check runs")
+        return False
+    for check_run in check_runs["check_runs"]:
+        status = check_run["status"]
+        if status != "completed":
+            logging.debug("Cannot merge MR because there are incomplete check runs")
+            return False
+        conclusion = check_run["conclusion"]
+        if conclusion != "success":
+            logging.debug("Cannot merge MR because there are unsuccessful check runs")
+            return False
+    return True
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    """
+    Splits the given items into lists of the given size, the last one might be shorter.
+    """
+    iterator = iter(items)
+    batch = list(itertools.islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(iterator, size))
+
+
 def create_composite_fixer(fixer_classes, context: instarepo.fixers.context.Context):
     return instarepo.fixers.base.CompositeFix(
         list(
@@ -1,5 +1,8 @@
 """Unit tests for fix.py"""
 import os
+import subprocess
+
+import pytest
 
 import instarepo.fixers.base
 import instarepo.fixers.changelog
@@ -8,8 +11,15 @@ import instarepo.fixers.context
 import instarepo.fixers.dotnet
 import instarepo.fixers.maven
 import instarepo.git
+import instarepo.github
+from instarepo.fake_github import FakeGitHubServer
+from instarepo.fixers.missing_files import EDITOR_CONFIG
+from instarepo.main import parse_args
+from instarepo.rate_limit import RateLimiter
+from instarepo.repo_source_test import dummy_repo
 
 from .fix import (
+    FixRemote,
     create_composite_fixer,
     format_body,
 )
@@ -70,3 +80,248 @@ def test_create_composite_fixer():
     assert isinstance(
         composite_fixer.rules[0], instarepo.fixers.changelog.MustHaveCliffTomlFix
     )
+
+
+def test_fix_remote_commits_via_api(tmp_path):
+    # arrange
+    with FakeGitHubServer(repo_count=1, git_dir=str(tmp_path / "remotes")) as server:
+        args = parse_args(
+            [
+                "fix",
+                "-u",
+                server.owner,
+                "-t",
+                "token",
+                "--api-url",
+                server.url,
+                "--commit-via-api",
+                "--only-fixers",
+                "missing_files.must_have_editor_config",
+            ]
+        )
+        fix = FixRemote(args)
+        fix.github.rate_limiter.mutation_interval = 0
+
+        # act
+        fix.run()
+        repo = server.repos[f"{server.owner}/repo-00000"]
+
+    # assert
+    assert [pull["head"]["ref"] for pull in repo.pulls] == ["instarepo_branch"]
+    git = instarepo.git.clone(repo.ssh_url, str(tmp_path / "clone"), quiet=True)
+    git.checkout("instarepo_branch")
+    assert git.read_text(".editorconfig") == EDITOR_CONFIG
+    assert git.get_author_names("instarepo_branch") == [instarepo.git.AUTHOR_NAME]
+
+
+def test_fix_remote_records_history(tmp_path):
+    # arrange
+    history_db = str(tmp_path / "history.db")
+    with FakeGitHubServer(repo_count=1, git_dir=str(tmp_path / "remotes")) as server:
+        args = parse_args(
+            [
+                "fix",
+                "-u",
+                server.owner,
+                "-t",
+                "token",
+                "--api-url",
+                server.url,
+                "--commit-via-api",
+                "--only-fixers",
+                "missing_files.must_have_editor_config",
+                "--history-db",
+                history_db,
+                "--order",
+                "smart",
+            ]
+        )
+        fix = FixRemote(args)
+        fix.github.rate_limiter.mutation_interval = 0
+
+        # act
+        fix.run()
+
+        # assert
+        stats = fix.history.stats()[f"{server.owner}/repo-00000"]
+    assert stats.runs == 1
+    assert stats.changes == 1
+    assert stats.pull_requests == 1
+    assert not stats.failures
+
+
+def test_smart_order_needs_history():
+    args = parse_args(["fix", "-u", "jdoe", "-t", "token", "--order", "smart"])
+    with pytest.raises(ValueError):
+        FixRemote(args)
+
+
+def test_read_only_fixers_close_a_stale_pull_request(tmp_path):
+    # arrange
+    with FakeGitHubServer(repo_count=1, git_dir=str(tmp_path / "remotes")) as server:
+        full_name = f"{server.owner}/repo-00000"
+        github = instarepo.github.ReadWriteGitHub(
+            auth=None, api_url=server.url, rate_limiter=RateLimiter(mutation_interval=0)
+        )
+        github.create_ref(
+            full_name, "instarepo_branch", github.get_branch_sha(full_name, "main")
+        )
+        github.create_merge_request(
+            full_name, "instarepo_branch", "main", "title", "body"
+        )
+        args = parse_args(
+            [
+                "fix",
+                "-u",
+                server.owner,
+                "-t",
+                "token",
+                "--api-url",
+                server.url,
+                "--only-fixers",
+                "repo_description.repo_description",
+            ]
+        )
+        fix = FixRemote(args)
+        fix.github.rate_limiter.mutation_interval = 0
+
+        # act
+        fix.run()
+        repo = server.repos[full_name]
+        branch_sha = server.ref_sha(repo, "instarepo_branch")
+
+    # assert
+    assert [pull["state"] for pull in repo.pulls] == ["closed"]
+    assert branch_sha is None
+
+
+def test_fix_remote_auto_merges_a_pull_request_without_new_changes(
+    tmp_path, monkeypatch
+):
+    # arrange
+    monkeypatch.setenv("GIT_COMMITTER_NAME", instarepo.git.AUTHOR_NAME)
+    monkeypatch.setenv("GIT_COMMITTER_EMAIL", instarepo.git.AUTHOR_EMAIL)
+    with FakeGitHubServer(repo_count=1, git_dir=str(tmp_path / "remotes")) as server:
+        full_name = f"{server.owner}/repo-00000"
+        repo = server.repos[full_name]
+        # a commit by someone else keeps the branch from being started from scratch
+        git = instarepo.git.clone(repo.ssh_url, str(tmp_path / "clone"), quiet=True)
+        git.create_branch("instarepo_branch")
+        git.write_text(".editorconfig", EDITOR_CONFIG)
+        git.add(".editorconfig")
+        subprocess.run(
+            ["git", "commit", "-q", "-m", "Add editorconfig", "--author", "Jane <j@x>"],
+            check=True,
+            cwd=git.dir,
+        )
+        git.push()
+        github = instarepo.github.ReadWriteGitHub(
+            auth=None, api_url=server.url, rate_limiter=RateLimiter(mutation_interval=0)
+        )
+        github.create_merge_request(
+            full_name, "instarepo_branch", "main", "title", "body"
+        )
+        args = parse_args(
+            [
+                "fix",
+                "-u",
+                server.owner,
+                "-t",
+                "token",
+                "--api-url",
+                server.url,
+                "--commit-via-api",
+                "--auto-merge",
+                "--only-fixers",
+                "missing_files.must_have_editor_config",
+            ]
+        )
+        fix = FixRemote(args)
+        fix.github.rate_limiter.mutation_interval = 0
+
+        # act
+        fix.run()
+        branch_sha = server.ref_sha(repo, "instarepo_branch")
+
+    # assert
+    assert [pull["merged"] for pull in repo.pulls] == [True]
+    assert branch_sha is None
+
+
+def test_prescreen_errors_fall_back_to_cloning(monkeypatch):
+    def fetch_tree(repo, ref):
+        raise ValueError("Tree has no sha")
+
+    fix = FixRemote(parse_args(["fix", "-u", "jdoe", "-t", "token"]))
+    monkeypatch.setattr(fix, "_fetch_tree", fetch_tree)
+    assert fix._fetch_default_branch(dummy_repo("foo", "jdoe/foo"), False) == (
+        None,
+        None,
+    )
+
+
+def test_prescreen_and_commits_via_api_share_the_files(tmp_path, mocker):
+    # arrange
+    with FakeGitHubServer(repo_count=1, git_dir=str(tmp_path / "remotes")) as server:
+        args = parse_args(
+            [
+                "fix",
+                "-u",
+                server.owner,
+                "-t",
+                "token",
+                "--api-url",
+                server.url,
+                "--commit-via-api",
+                "--only-fixers",
+                "missing_files.must_have_editor_config",
+            ]
+        )
+        fix = FixRemote(args)
+        fix.github.rate_limiter.mutation_interval = 0
+        full_name = f"{server.owner}/repo-00000"
+        head = fix.github.get_branch_sha(full_name, "main")
+        get_tree = mocker.spy(fix.github, "get_tree")
+
+        # act
+        fix.run()
+
+    # assert
+    get_tree.assert_called_once_with(full_name, head)
+
+
+def test_fix_remote_clones_through_the_mirror_cache(tmp_path, monkeypatch):
+    # arrange
+    monkeypatch.setenv("GIT_COMMITTER_NAME", instarepo.git.AUTHOR_NAME)
+    monkeypatch.setenv("GIT_COMMITTER_EMAIL", instarepo.git.AUTHOR_EMAIL)
+    mirrors = str(tmp_path / "mirrors")
+    with FakeGitHubServer(repo_count=1, git_dir=str(tmp_path / "remotes")) as server:
+        args = parse_args(
+            [
+                "fix",
+                "-u",
+                server.owner,
+                "-t",
+                "token",
+                "--api-url",
+                server.url,
+                "--no-prescreen",
+                "--only-fixers",
+                "missing_files.must_have_editor_config",
+                "--mirror-cache-dir",
+                mirrors,
+            ]
+        )
+        fix = FixRemote(args)
+        fix.github.rate_limiter.mutation_interval = 0
+
+        # act
+        fix.run()
+        repo = server.repos[f"{server.owner}/repo-00000"]
+
+    # assert
+    assert [pull["head"]["ref"] for pull in repo.pulls] == ["instarepo_branch"]
+    assert os.path.isdir(os.path.join(mirrors, server.owner, "repo-00000.git"))
+    git = instarepo.git.clone(repo.ssh_url, str(tmp_path / "clone"), quiet=True)
+    git.checkout("instarepo_branch")
+    assert git.read_text(".editorconfig") == EDITOR_CONFIG
@@ -0,0 +1,905 @@
+"""
+A local stand-in for the GitHub REST API, for load and scale testing.
+
+It implements the endpoints that instarepo uses over a set of synthetic
+repositories, optionally backed by local bare git remotes, and can add
+latency, random server errors and rate limit headers.
+"""
+
+import base64
+import datetime
+import hashlib
+import http.server
+import json
+import os
+import os.path
+import random
+import re
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.parse
+from typing import Dict, List, Optional
+
+DEFAULT_OWNER = "octocat"
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+LANGUAGES = ["Python", "Java", "JavaScript", "Go", None]
+EPOCH = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class FakeRepo:
+    """
+    A synthetic repository and its pull requests.
+    """
+
+    def __init__(self, owner: str, index: int, ssh_url: Optional[str] = None):
+        self.owner = owner
+        self.name = f"repo-{index:05d}"
+        self.full_name = f"{owner}/{self.name}"
+        self.description = f"Synthetic repository {index}"
+        self.language = LANGUAGES[index % len(LANGUAGES)]
+        self.archived = index % 20 == 19
+        self.fork = index % 10 == 9
+        self.private = index % 3 == 2
+        self.topics = ["synthetic"] + (["tool"] if index % 4 == 0 else [])
+        self.size = (index * 131) % 10000
+        self.ssh_url = ssh_url or f"git@github.com:{self.full_name}.git"
+        self.created_at = _timestamp(EPOCH + datetime.timedelta(hours=index))
+        # spread the activity so that sorting by it differs from sorting by name
+        self.pushed_at = _timestamp(
+            EPOCH + datetime.timedelta(days=365, hours=(index * 7919) % 8760)
+        )
+        self.updated_at = self.pushed_at
+        self.pulls: List[dict] = []
+        # the files of the default branch, unless backed by a git remote
+        self.files: Dict[str, str] = {"README.md": f"# {self.name}\n"}
+
+    def to_json(self, base_url: str) -> dict:
+        return {
+            "name": self.name,
+            "full_name": self.full_name,
+            "owner": {"login": self.owner},
+            "archived": self.archived,
+            "clone_url": f"https://github.com/{self.full_name}.git",
+            "html_url": f"https://github.com/{self.full_name}",
+            "url": f"{base_url}/repos/{self.full_name}",
+            "ssh_url": self.ssh_url,
+            "default_branch": "main",
+            "description": self.description,
+            "private": self.private,
+            "fork": self.fork,
+            "language": self.language,
+            "topics": self.topics,
+            "size": self.size,
+            "created_at": self.created_at,
+            "pushed_at": self.pushed_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class FakeGitHubServer:
+    """
+    A threaded HTTP server that pretends to be the GitHub REST API.
+
+    Use it as a context manager, or call `start` and `stop`.
+    Point a client at it with `GitHub(..., api_url=server.url)`
+    or `instarepo --api-url URL`.
+    """
+
+    def __init__(
+        self,
+        repo_count: int = 10,
+        owner: str = DEFAULT_OWNER,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: Optional[int] = None,
+        rate_limit_window: int = 3600,
+        git_dir: Optional[str] = None,
+        seed: int = 0,
+        port: int = 0,
+    ):
+        """
+        Creates an instance of this class.
+
+        :param repo_count: The number of synthetic repositories
+        :param owner: The login that owns the repositories (the authenticated user)
+        :param latency: The number of seconds to wait before every response
+        :param error_rate: The probability (0..1) of responding with a server error
+        :param rate_limit: If given, the number of requests allowed per window
+        :param rate_limit_window: The length of the rate limit window in seconds
+        :param git_dir: If given, a bare git remote is created in this directory for every repository
+        :param seed: Seeds the random errors, so that runs are repeatable
+        :param port: The port to listen to. By default, a free port is picked
+        """
+        self.owner = owner
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.git_dir = git_dir
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._remaining = rate_limit or 0
+        self._reset_at = 0
+        self._next_number = 1
+        self.request_count = 0
+        self.repos: Dict[str, FakeRepo] = {}
+        ssh_urls = _create_git_remotes(git_dir, repo_count) if git_dir else {}
+        for index in range(repo_count):
+            repo = FakeRepo(owner, index, ssh_urls.get(index))
+            self.repos[repo.full_name] = repo
+        self._server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", port), _FakeGitHubHandler
+        )
+        self._server.daemon_threads = True
+        self._server.fake = self  # type: ignore
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        The base URL of the fake API.
+        """
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        """
+        Starts serving requests on a background thread.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops serving requests.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def admit(self):
+        """
+        Decides the fate of an incoming request.
+
+        :return: A tuple of an optional error status code and the rate limit headers
+        """
+        with self._lock:
+            self.request_count += 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 502, {}
+            if not self.rate_limit:
+                return None, {}
+            now = int(time.time())
+            if now >= self._reset_at:
+                self._reset_at = now + self.rate_limit_window
+                self._remaining = self.rate_limit
+            status = None
+            if self._remaining <= 0:
+                status = 403
+            else:
+                self._remaining -= 1
+            return status, {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(self._remaining),
+                "X-RateLimit-Reset": str(self._reset_at),
+            }
+
+    def create_pull(self, repo: FakeRepo, data: dict) -> dict:
+        head = data["head"]
+        branch = head.split(":", 1)[1] if ":" in head else head
+        with self._lock:
+            number = self._next_number
+            self._next_number += 1
+        pull = {
+            "number": number,
+            "state": "open",
+            "title": data.get("title", ""),
+            "body": data.get("body", ""),
+            "html_url": f"https://github.com/{repo.full_name}/pull/{number}",
+            "user": {"login": self.owner},
+            "head": {
+                "ref": branch,
+                "label": f"{self.owner}:{branch}",
+                "sha": self._head_sha(repo, branch),
+            },
+            "base": {"ref": data.get("base", "main")},
+            "mergeable": True,
+            "mergeable_state": "clean",
+            "merged": False,
+        }
+        with self._lock:
+            repo.pulls.append(pull)
+        return pull
+
+    def _head_sha(self, repo: FakeRepo, branch: str) -> str:
+        if self.git_dir and os.path.isdir(repo.ssh_url):
+            result = subprocess.run(
+                ["git", "--git-dir", repo.ssh_url, "rev-parse", "refs/heads/" + branch],
+                check=False,
+                capture_output=True,
+                encoding="utf-8",
+            )
+            if result.returncode == 0:
+                return result.stdout.strip()
+        return hashlib.sha1(f"{repo.full_name}:{branch}".encode("utf-8")).hexdigest()
+
+    def is_git_backed(self, repo: FakeRepo) -> bool:
+        return bool(self.git_dir) and os.path.isdir(repo.ssh_url)
+
+    def _rev_parse(self, repo: FakeRepo, rev: str) -> Optional[str]:
+        result = subprocess.run(
+            ["git", "--git-dir", repo.ssh_url, "rev-parse", "-q", "--verify", rev],
+            check=False,
+            capture_output=True,
+            encoding="utf-8",
+        )
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def ref_sha(self, repo: FakeRepo, branch: str) -> Optional[str]:
+        """
+        Gets the SHA of the commit of the given branch, or None if it does not exist.
+        """
+        if self.is_git_backed(repo):
+            return self._rev_parse(repo, "refs/heads/" + branch)
+        return self._head_sha(repo, branch) if branch == "main" else None
+
+    def tree_sha(self, repo: FakeRepo, ref: str) -> str:
+        """
+        Gets the SHA of the tree of the given branch or commit.
+        """
+        if self.is_git_backed(repo):
+            return self._rev_parse(repo, _revision(ref) + "^{tree}") or ref
+        return ref
+
+    def tree(self, repo: FakeRepo, ref: str) -> Optional[List[dict]]:
+        """
+        Gets the files of the given branch or commit, or None if it does not exist.
+        """
+        if self.git_dir and os.path.isdir(repo.ssh_url):
+            result = subprocess.run(
+                [
+                    "git",
+                    "--git-dir",
+                    repo.ssh_url,
+                    "ls-tree",
+                    "-r",
+                    _revision(ref),
+                ],
+                check=False,
+                capture_output=True,
+                encoding="utf-8",
+            )
+            if result.returncode != 0:
+                return None
+            entries = []
+            for line in result.stdout.splitlines():
+                info, path = line.split("\t", 1)
+                mode, kind, sha = info.split()
+                entries.append({"path": path, "mode": mode, "type": kind, "sha": sha})
+            return entries
+        if ref != "main":
+            return None
+        return [
+            {"path": path, "mode": "100644", "type": "blob", "sha": _blob_sha(text)}
+            for path, text in repo.files.items()
+        ]
+
+    def blob(self, repo: FakeRepo, sha: str) -> Optional[bytes]:
+        """
+        Gets the contents of a blob, or None if it does not exist.
+        """
+        if self.git_dir and os.path.isdir(repo.ssh_url):
+            result = subprocess.run(
+                ["git", "--git-dir", repo.ssh_url, "cat-file", "blob", sha],
+                check=False,
+                capture_output=True,
+            )
+            return result.stdout if result.returncode == 0 else None
+        for text in repo.files.values():
+            if _blob_sha(text) == sha:
+                return text.encode("utf-8")
+        return None
+
+    def compare(self, repo: FakeRepo, base: str, head: str) -> Optional[dict]:
+        """
+        Compares two branches, like the compare API. Needs a git remote.
+        """
+        base_sha = self._rev_parse(repo, _revision(base))
+        head_sha = self._rev_parse(repo, _revision(head))
+        if not base_sha or not head_sha:
+            return None
+        counts = _git_output(
+            repo, "rev-list", "--left-right", "--count", f"{base_sha}...{head_sha}"
+        ).split()
+        log = _git_output(repo, "log", "--format=%H%x09%an", f"{base_sha}..{head_sha}")
+        commits = []
+        for line in reversed(log.splitlines()):
+            sha, author = line.split("\t", 1)
+            commits.append({"sha": sha, "commit": {"author": {"name": author}}})
+        return {
+            "behind_by": int(counts[0]),
+            "ahead_by": int(counts[1]),
+            "commits": commits,
+        }
+
+    def create_tree(self, repo: FakeRepo, data: dict) -> str:
+        """
+        Creates a tree from a base tree and changed entries with inline contents.
+        Needs a git remote.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env = dict(os.environ, GIT_INDEX_FILE=os.path.join(tmp_dir, "index"))
+            if data.get("base_tree"):
+                _git_output(repo, "read-tree", data["base_tree"], env=env)
+            for entry in data["tree"]:
+                sha = _git_output(
+                    repo, "hash-object", "-w", "--stdin", stdin=entry["content"]
+                )
+                _git_output(
+                    repo,
+                    "update-index",
+                    "--add",
+                    "--cacheinfo",
+                    f"{entry['mode']},{sha},{entry['path']}",
+                    env=env,
+                )
+            return _git_output(repo, "write-tree", env=env)
+
+    def create_commit(self, repo: FakeRepo, data: dict) -> str:
+        """
+        Creates a commit. Needs a git remote.
+        """
+        author = data.get("author", {"name": self.owner, "email": "fake@localhost"})
+        env = dict(
+            os.environ,
+            GIT_AUTHOR_NAME=author["name"],
+            GIT_AUTHOR_EMAIL=author["email"],
+            GIT_COMMITTER_NAME=author["name"],
+            GIT_COMMITTER_EMAIL=author["email"],
+        )
+        args = ["commit-tree", data["tree"], "-m", data["message"]]
+        for parent in data.get("parents", []):
+            args.extend(["-p", parent])
+        return _git_output(repo, *args, env=env)
+
+    def update_ref(
+        self, repo: FakeRepo, branch: str, sha: Optional[str], force: bool = True
+    ) -> bool:
+        """
+        Points the given branch to the given commit, or deletes it if `sha` is None.
+        Returns False if the update is not a fast-forward and `force` is not set.
+        Needs a git remote.
+        """
+        ref = "refs/heads/" + branch
+        if sha is None:
+            _git_output(repo, "update-ref", "-d", ref)
+            return True
+        current = self._rev_parse(repo, ref)
+        if current and not force:
+            result = subprocess.run(
+                [
+                    "git",
+                    "--git-dir",
+                    repo.ssh_url,
+                    "merge-base",
+                    "--is-ancestor",
+                    current,
+                    sha,
+                ],
+                check=False,
+            )
+            if result.returncode != 0:
+                return False
+        _git_output(repo, "update-ref", ref, sha)
+        return True
+
+    def find_pull(self, repo: FakeRepo, number: int) -> Optional[dict]:
+        for pull in repo.pulls:
+            if pull["number"] == number:
+                return pull
+        return None
+
+
+# (method, path pattern, handler method name)
+_ROUTES = [
+    ("GET", r"/user/repos", "list_own_repos"),
+    ("GET", r"/(?:orgs|users)/(?P<owner>[^/]+)/repos", "list_owner_repos"),
+    ("GET", r"/search/issues", "search_issues"),
+    ("GET", r"/search/repositories", "search_repos"),
+    ("GET", r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)", "get_repo"),
+    ("PATCH", r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)", "update_repo"),
+    ("GET", r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pulls", "list_pulls"),
+    ("POST", r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pulls", "create_pull"),
+    (
+        "GET",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pulls/(?P<number>\d+)",
+        "get_pull",
+    ),
+    (
+        "PATCH",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pulls/(?P<number>\d+)",
+        "update_pull",
+    ),
+    (
+        "PUT",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pulls/(?P<number>\d+)/merge",
+        "merge_pull",
+    ),
+    (
+        "POST",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/issues/(?P<number>\d+)/comments",
+        "create_comment",
+    ),
+    (
+        "GET",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/commits/(?P<sha>[^/]+)/check-runs",
+        "list_check_runs",
+    ),
+    (
+        "GET",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/commits/(?P<sha>[^/]+)/status",
+        "get_status",
+    ),
+    (
+        "GET",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/trees/(?P<ref>.+)",
+        "get_tree",
+    ),
+    (
+        "GET",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/blobs/(?P<sha>[^/]+)",
+        "get_blob",
+    ),
+    (
+        "GET",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/ref/heads/(?P<branch>.+)",
+        "get_ref",
+    ),
+    (
+        "GET",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/compare/(?P<base>.+)\.\.\.(?P<head>.+)",
+        "compare",
+    ),
+    ("POST", r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/trees", "create_tree"),
+    ("POST", r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/commits", "create_commit"),
+    ("POST", r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/refs", "create_ref"),
+    (
+        "PATCH",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/refs/heads/(?P<branch>.+)",
+        "update_ref",
+    ),
+    (
+        "DELETE",
+        r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/refs/heads/(?P<branch>.+)",
+        "delete_ref",
+    ),
+]
+
+# the Git Data API write endpoints only work for repositories backed by a git remote
+_GIT_DATA_HANDLERS = (
+    "compare",
+    "create_tree",
+    "create_commit",
+    "create_ref",
+    "update_ref",
+    "delete_ref",
+)
+
+
+class _FakeGitHubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # send headers and body in one segment, avoiding delayed ACK stalls
+    wbufsize = -1
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._dispatch()
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self._dispatch()
+
+    def do_PATCH(self):  # pylint: disable=invalid-name
+        self._dispatch()
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        self._dispatch()
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        self._dispatch()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    @property
+    def fake(self) -> FakeGitHubServer:
+        return self.server.fake  # type: ignore
+
+    def _dispatch(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        self.query = dict(urllib.parse.parse_qsl(parsed.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        self.data = json.loads(raw_body) if raw_body else {}
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        status, headers = self.fake.admit()
+        if status == 403:
+            self._send(403, {"message": "API rate limit exceeded"}, headers)
+            return
+        if status:
+            self._send(status, {"message": "Server Error"}, headers)
+            return
+        for method, pattern, name in _ROUTES:
+            if method != self.command:
+                continue
+            match = re.fullmatch(pattern, parsed.path)
+            if match:
+                params = match.groupdict()
+                repo = None
+                if "repo" in params:
+                    repo = self.fake.repos.get(params["owner"] + "/" + params["repo"])
+                    if repo is None:
+                        break
+                    if name in _GIT_DATA_HANDLERS and not self.fake.is_git_backed(repo):
+                        self._send(
+                            422, {"message": "The Git Data API needs git_dir"}, headers
+                        )
+                        return
+                status, body, extra_headers = getattr(self, "_" + name)(repo, params)
+                headers.update(extra_headers)
+                self._send(status, body, headers)
+                return
+        self._send(404, {"message": "Not Found"}, headers)
+
+    def _send(self, status: int, body, headers: Dict[str, str]):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _paginated(self, items: list):
+        per_page = min(int(self.query.get("per_page", DEFAULT_PER_PAGE)), MAX_PER_PAGE)
+        page = int(self.query.get("page", 1))
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        start = (page - 1) * per_page
+        links = []
+        path = urllib.parse.urlsplit(self.path).path
+        for rel, number in (("next", page + 1), ("last", last)):
+            if page < last:
+                query = urllib.parse.urlencode({**self.query, "page": number})
+                links.append(f'<{self.fake.url}{path}?{query}>; rel="{rel}"')
+        headers = {"Link": ", ".join(links)} if links else {}
+        return items[start : start + per_page], headers
+
+    def _list_repos(self, repos: List[FakeRepo]):
+        sort = self.query.get("sort", "full_name")
+        direction = self.query.get(
+            "direction", "asc" if sort == "full_name" else "desc"
+        )
+        field = {
+            "full_name": "full_name",
+            "created": "created_at",
+            "updated": "updated_at",
+            "pushed": "pushed_at",
+        }.get(sort, "full_name")
+        repos = sorted(
+            repos, key=lambda repo: getattr(repo, field), reverse=direction == "desc"
+        )
+        page, headers = self._paginated(repos)
+        return 200, [repo.to_json(self.fake.url) for repo in page], headers
+
+    def _list_own_repos(self, _repo, _params):
+        return self._list_repos(list(self.fake.repos.values()))
+
+    def _list_owner_repos(self, _repo, params):
+        return self._list_repos(
+            [repo for repo in self.fake.repos.values() if repo.owner == params["owner"]]
+        )
+
+    def _search_repos(self, _repo, _params):
+        owners = []
+        conditions = []
+        forks = "false"
+        for term in self.query.get("q", "").split():
+            name, _, value = term.partition(":")
+            if name in ("user", "org"):
+                owners.append(value)
+            elif name == "language":
+                conditions.append(lambda repo, value=value: repo.language == value)
+            elif name == "topic":
+                conditions.append(lambda repo, value=value: value in repo.topics)
+            elif name == "size" and value.startswith(">="):
+                conditions.append(lambda repo, value=value: repo.size >= int(value[2:]))
+            elif name == "size" and value.startswith("<="):
+                conditions.append(lambda repo, value=value: repo.size <= int(value[2:]))
+            elif name == "archived":
+                conditions.append(
+                    lambda repo, value=value: repo.archived == (value == "true")
+                )
+            elif name == "fork":
+                forks = value
+            elif name == "pushed" and value.startswith(">="):
+                # dates without time, which compare with the start of the timestamp
+                conditions.append(
+                    lambda repo, value=value: repo.pushed_at[:10] >= value[2:]
+                )
+            elif name == "pushed" and value.startswith("<="):
+                conditions.append(
+                    lambda repo, value=value: repo.pushed_at[:10] <= value[2:]
+                )
+        if forks == "only":
+            conditions.append(lambda repo: repo.fork)
+        elif forks != "true":
+            conditions.append(lambda repo: not repo.fork)
+        items = [
+            repo.to_json(self.fake.url)
+            for repo in self.fake.repos.values()
+            if (not owners or repo.owner in owners)
+            and all(condition(repo) for condition in conditions)
+        ]
+        page, headers = self._paginated(items)
+        return (
+            200,
+            {"total_count": len(items), "incomplete_results": False, "items": page},
+            headers,
+        )
+
+    def _search_issues(self, _repo, _params):
+        terms = self.query.get("q", "").split()
+        head = None
+        for term in terms:
+            if term.startswith("head:"):
+                head = term[len("head:") :]
+        items = []
+        for repo in self.fake.repos.values():
+            for pull in repo.pulls:
+                if pull["state"] != "open":
+                    continue
+                if head and pull["head"]["ref"] != head:
+                    continue
+                items.append(
+                    {
+                        "number": pull["number"],
+                        "html_url": pull["html_url"],
+                        "repository_url": f"{self.fake.url}/repos/{repo.full_name}",
+                        "pull_request": {},
+                    }
+                )
+        page, headers = self._paginated(items)
+        return (
+            200,
+            {"total_count": len(items), "incomplete_results": False, "items": page},
+            headers,
+        )
+
+    def _get_repo(self, repo: FakeRepo, _params):
+        return 200, repo.to_json(self.fake.url), {}
+
+    def _update_repo(self, repo: FakeRepo, _params):
+        if "description" in self.data:
+            repo.description = self.data["description"]
+        return 200, repo.to_json(self.fake.url), {}
+
+    def _list_pulls(self, repo: FakeRepo, _params):
+        state = self.query.get("state", "open")
+        head = self.query.get("head")
+        base = self.query.get("base")
+        pulls = [
+            pull
+            for pull in repo.pulls
+            if (state == "all" or pull["state"] == state)
+            and (not head or pull["head"]["label"] == head)
+            and (not base or pull["base"]["ref"] == base)
+        ]
+        page, headers = self._paginated(pulls)
+        return 200, page, headers
+
+    def _create_pull(self, repo: FakeRepo, _params):
+        if "head" not in self.data:
+            return 422, {"message": "Validation Failed"}, {}
+        return 201, self.fake.create_pull(repo, self.data), {}
+
+    def _get_pull(self, repo: FakeRepo, params):
+        pull = self.fake.find_pull(repo, int(params["number"]))
+        if pull is None:
+            return 404, {"message": "Not Found"}, {}
+        return 200, pull, {}
+
+    def _update_pull(self, repo: FakeRepo, params):
+        pull = self.fake.find_pull(repo, int(params["number"]))
+        if pull is None:
+            return 404, {"message": "Not Found"}, {}
+        for key in ("state", "title", "body"):
+            if key in self.data:
+                pull[key] = self.data[key]
+        return 200, pull, {}
+
+    def _merge_pull(self, repo: FakeRepo, params):
+        pull = self.fake.find_pull(repo, int(params["number"]))
+        if pull is None or pull["state"] != "open":
+            return 405, {"message": "Pull Request is not mergeable"}, {}
+        pull["state"] = "closed"
+        pull["merged"] = True
+        return 200, {"merged": True, "sha": pull["head"]["sha"]}, {}
+
+    def _create_comment(self, _repo, _params):
+        return 201, {"id": 1, "body": self.data.get("body", "")}, {}
+
+    def _list_check_runs(self, _repo, _params):
+        check_runs = [{"name": "build", "status": "completed", "conclusion": "success"}]
+        return 200, {"total_count": len(check_runs), "check_runs": check_runs}, {}
+
+    def _get_tree(self, repo: FakeRepo, params):
+        ref = urllib.parse.unquote(params["ref"])
+        entries = self.fake.tree(repo, ref)
+        if entries is None:
+            return 404, {"message": "Not Found"}, {}
+        return (
+            200,
+            {
+                "sha": self.fake.tree_sha(repo, ref),
+                "tree": entries,
+                "truncated": False,
+            },
+            {},
+        )
+
+    def _get_blob(self, repo: FakeRepo, params):
+        contents = self.fake.blob(repo, params["sha"])
+        if contents is None:
+            return 404, {"message": "Not Found"}, {}
+        return (
+            200,
+            {
+                "sha": params["sha"],
+                "encoding": "base64",
+                "content": base64.b64encode(contents).decode("ascii"),
+            },
+            {},
+        )
+
+    def _get_ref(self, repo: FakeRepo, params):
+        branch = urllib.parse.unquote(params["branch"])
+        sha = self.fake.ref_sha(repo, branch)
+        if sha is None:
+            return 404, {"message": "Not Found"}, {}
+        return (
+            200,
+            {"ref": "refs/heads/" + branch, "object": {"sha": sha, "type": "commit"}},
+            {},
+        )
+
+    def _compare(self, repo: FakeRepo, params):
+        comparison = self.fake.compare(
+            repo,
+            urllib.parse.unquote(params["base"]),
+            urllib.parse.unquote(params["head"]),
+        )
+        if comparison is None:
+            return 404, {"message": "Not Found"}, {}
+        return 200, comparison, {}
+
+    def _create_tree(self, repo: FakeRepo, _params):
+        return 201, {"sha": self.fake.create_tree(repo, self.data)}, {}
+
+    def _create_commit(self, repo: FakeRepo, _params):
+        return 201, {"sha": self.fake.create_commit(repo, self.data)}, {}
+
+    def _create_ref(self, repo: FakeRepo, _params):
+        branch = self.data["ref"][len("refs/heads/") :]
+        if self.fake.ref_sha(repo, branch):
+            return 422, {"message": "Reference already exists"}, {}
+        self.fake.update_ref(repo, branch, self.data["sha"])
+        return 201, {"ref": self.data["ref"], "object": {"sha": self.data["sha"]}}, {}
+
+    def _update_ref(self, repo: FakeRepo, params):
+        branch = urllib.parse.unquote(params["branch"])
+        if not self.fake.ref_sha(repo, branch):
+            return 422, {"message": "Reference does not exist"}, {}
+        if not self.fake.update_ref(
+            repo, branch, self.data["sha"], self.data.get("force", False)
+        ):
+            return 422, {"message": "Update is not a fast forward"}, {}
+        return (
+            200,
+            {"ref": "refs/heads/" + branch, "object": {"sha": self.data["sha"]}},
+            {},
+        )
+
+    def _delete_ref(self, repo: FakeRepo, params):
+        branch = urllib.parse.unquote(params["branch"])
+        if not self.fake.ref_sha(repo, branch):
+            return 422, {"message": "Reference does not exist"}, {}
+        self.fake.update_ref(repo, branch, None)
+        return 204, {}, {}
+
+    def _get_status(self, _repo, params):
+        return (
+            200,
+            {
+                "state": "success",
+                "sha": params["sha"],
+                "total_count": 0,
+                "statuses": [],
+            },
+            {},
+        )
+
+
+def _blob_sha(text: str) -> str:
+    data = text.encode("utf-8")
+    return hashlib.sha1(f"blob {len(data)}\0".encode("utf-8") + data).hexdigest()
+
+
+def _timestamp(value: datetime.datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _create_git_remotes(directory: str, count: int) -> Dict[int, str]:
+    """
+    Creates a bare git repository with one commit on `main` for every index.
+    """
+    os.makedirs(directory, exist_ok=True)
+    template = os.path.join(directory, "template")
+    if not os.path.isdir(template):
+        _git("init", "-q", "-b", "main", template)
+        with open(os.path.join(template, "README.md"), "w", encoding="utf-8") as file:
+            file.write("# Synthetic repository\n")
+        _git("-C", template, "add", "README.md")
+        _git(
+            "-C",
+            template,
+            "-c",
+            "user.name=instarepo",
+            "-c",
+            "user.email=instarepo@localhost",
+            "commit",
+            "-q",
+            "-m",
+            "Initial commit",
+        )
+    result = {}
+    for index in range(count):
+        path = os.path.join(directory, f"repo-{index:05d}.git")
+        if not os.path.isdir(path):
+            _git("clone", "-q", "--bare", template, path)
+        result[index] = path
+    return result
+
+
+def _git(*args):
+    subprocess.run(["git", *args], check=True)
+
+
+def _git_output(repo: FakeRepo, *args, env=None, stdin=None) -> str:
+    result = subprocess.run(
+        ["git", "--git-dir", repo.ssh_url, *args],
+        check=True,
+        capture_output=True,
+        encoding="utf-8",
+        env=env,
+        input=stdin,
+    )
+    return result.stdout.strip()
+
+
+def _revision(ref: str) -> str:
+    """
+    Gets the git revision of a branch name or a commit SHA.
+    """
+    if re.fullmatch(r"[0-9a-f]{40}", ref):
+        return ref
+    return "refs/heads/" + ref
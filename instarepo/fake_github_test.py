@@ -0,0 +1,92 @@
+"""
+Unit tests for the fake_github module.
+"""
+
+import requests.auth
+
+import instarepo.git
+
+from .fake_github import FakeGitHubServer
+from .github import GitHub, ReadWriteGitHub
+
+
+def _auth():
+    return requests.auth.HTTPBasicAuth("octocat", "token")
+
+
+def test_lists_all_repos_across_pages():
+    with FakeGitHubServer(repo_count=250) as server:
+        github = GitHub(auth=_auth(), api_url=server.url)
+        repos = list(github.get_all_repos("full_name", "asc"))
+    assert len(repos) == 250
+    assert repos[0].full_name == "octocat/repo-00000"
+    assert repos[-1].full_name == "octocat/repo-00249"
+
+
+def test_pull_request_lifecycle():
+    with FakeGitHubServer(repo_count=1) as server:
+        github = ReadWriteGitHub(auth=_auth(), api_url=server.url)
+        github.rate_limiter.mutation_interval = 0
+        full_name = "octocat/repo-00000"
+        html_url = github.create_merge_request(
+            full_name, "octocat:instarepo_branch", "main", "title", "body"
+        )
+        listed = github.list_merge_requests(
+            full_name, "octocat:instarepo_branch", "main"
+        )
+        searched = list(github.search_issues("is:pr is:open head:instarepo_branch"))
+        github.merge_merge_request(full_name, listed[0]["number"])
+        after_merge = github.list_merge_requests(
+            full_name, "octocat:instarepo_branch", "main"
+        )
+    assert html_url == "https://github.com/octocat/repo-00000/pull/1"
+    assert [pull["number"] for pull in listed] == [1]
+    assert [item["number"] for item in searched] == [1]
+    assert after_merge == []
+
+
+def test_rate_limit_headers_and_errors():
+    with FakeGitHubServer(repo_count=1, rate_limit=1, error_rate=0) as server:
+        session = requests.Session()
+        first = session.get(server.url + "/user/repos")
+        second = session.get(server.url + "/user/repos")
+    assert first.status_code == 200
+    assert first.headers["X-RateLimit-Remaining"] == "0"
+    assert second.status_code == 403
+    with FakeGitHubServer(repo_count=1, error_rate=1) as server:
+        assert requests.get(server.url + "/user/repos").status_code == 502
+
+
+def test_repos_backed_by_git_remotes(tmp_path):
+    with FakeGitHubServer(repo_count=2, git_dir=str(tmp_path / "remotes")) as server:
+        repos = list(
+            GitHub(auth=_auth(), api_url=server.url).get_all_repos("full_name", "asc")
+        )
+    working_dir = instarepo.git.clone(
+        repos[1].ssh_url, str(tmp_path / "clone"), quiet=True
+    )
+    assert working_dir.get_default_branch() == "main"
+
+
+def test_tree_and_blobs():
+    with FakeGitHubServer(repo_count=1) as server:
+        github = GitHub(auth=_auth(), api_url=server.url)
+        tree = github.get_tree("octocat/repo-00000", "main")
+        text = github.get_blob_text("octocat/repo-00000", tree["tree"][0]["sha"])
+        missing = github.get_tree("octocat/repo-00000", "instarepo_branch")
+    assert [entry["path"] for entry in tree["tree"]] == ["README.md"]
+    assert text == "# repo-00000\n"
+    assert missing is None
+
+
+def test_search_repos_filters_on_the_server():
+    with FakeGitHubServer(repo_count=250) as server:
+        github = GitHub(auth=_auth(), api_url=server.url)
+        repos = github.search_repos(
+            "user:octocat language:Python archived:false fork:false"
+        )
+        requests_sent = server.request_count
+    assert repos
+    assert all(repo.language == "Python" for repo in repos)
+    assert not any(repo.archived or repo.fork for repo in repos)
+    assert requests_sent == 1
@@ -1,6 +1,6 @@
 import os
 import os.path
-from typing import List
+from typing import List, Optional
 import instarepo.fixers.context
 import instarepo.git
 
@@ -23,16 +23,13 @@ class SingleFileFix:
         self.msg = msg
 
     def run(self):
-        filename = os.path.join(self.git.dir, self.filename)
-        if not os.path.isfile(filename):
+        if not self.git.isfile(self.filename):
             return []
-        with open(filename, "r", encoding="utf-8") as file:
-            contents = file.read()
+        contents = self.git.read_text(self.filename)
         converted_contents = self.convert(contents)
         if contents == converted_contents:
             return []
-        with open(filename, "w", encoding="utf-8") as file:
-            file.write(converted_contents)
+        self.git.write_text(self.filename, converted_contents)
         self.git.add(self.filename)
         self.git.commit(self.msg)
         return [self.msg]
@@ -42,6 +39,12 @@ class SingleFileFix:
 
 
 class MissingFileFix:
+    known_contents: Optional[str] = None
+    """
+    The contents of the file, if they are the same for every repository,
+    so that an existing file can be compared before cloning.
+    """
+
     def __init__(
         self,
         context: instarepo.fixers.context.Context,
@@ -56,12 +59,8 @@ class MissingFileFix:
         for part in parts:
             if not part:
                 raise ValueError(f"Found empty path segment in {filename}")
-        directory_parts = parts[0:-1]
-        filename_part = parts[-1]
-        ensure_directories(self.context.git, *directory_parts)
-        relative_filename = os.path.join(*directory_parts, filename_part)
-        full_filename = self.context.git.join(relative_filename)
-        file_already_exists = os.path.isfile(full_filename)
+        relative_filename = "/".join(parts)
+        file_already_exists = self.context.git.isfile(relative_filename)
         if file_already_exists and not self.should_overwrite():
             return []
         if not self.should_process_repo():
@@ -70,11 +69,9 @@ class MissingFileFix:
         if not contents:
             return []
         if file_already_exists:
-            with open(full_filename, "r", encoding="utf-8") as file:
-                if contents == file.read():
-                    return []
-        with open(full_filename, "w", encoding="utf8") as file:
-            file.write(contents)
+            if contents == self.context.git.read_text(relative_filename):
+                return []
+        self.context.git.write_text(relative_filename, contents)
         self.context.git.add(relative_filename)
         msg = "chore: {0} {1}".format(
             "Updated" if file_already_exists else "Adding", relative_filename
@@ -96,6 +93,30 @@ class MissingFileFix:
     def should_overwrite(self) -> bool:
         return False
 
+    @classmethod
+    def prescreen(cls, tree, context: instarepo.fixers.context.Context) -> bool:
+        """
+        Checks, without a clone, if this fixer could change something.
+        See `instarepo.fixers.prescreen`.
+        """
+        fixer = cls(context)
+        filename = fixer.get_filename()
+        if tree.isfile(filename):
+            if not fixer.should_overwrite():
+                return False
+            if cls.known_contents is not None and tree.matches(
+                filename, cls.known_contents
+            ):
+                return False
+        return bool(fixer.should_process_tree(tree))
+
+    def should_process_tree(self, tree) -> bool:
+        """
+        Like `should_process_repo`, but decides from the file tree before cloning.
+        Needs to be overridden when `should_process_repo` looks at files.
+        """
+        return True
+
 
 def ensure_directories(git: instarepo.git.GitWorkingDir, *args):
     """
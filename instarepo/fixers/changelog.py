@@ -4,11 +4,16 @@ from instarepo.fixers.base import MissingFileFix
 class MustHaveCliffTomlFix(MissingFileFix):
     """Ensures the configuration for git-cliff (cliff.toml) exists"""
 
+    api_commits = True
+
     order = -100
 
     def should_process_repo(self):
         return self._get_template_filename()
 
+    def should_process_tree(self, tree):
+        return self.should_process_repo()
+
     def get_contents(self):
         with open(self._get_template_filename(), "r", encoding="utf-8") as file:
             return file.read()
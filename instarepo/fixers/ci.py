@@ -26,10 +26,16 @@ class NoTravisFix:
         self.context.git.commit(msg)
         return [msg]
 
+    @staticmethod
+    def prescreen(tree, _context) -> bool:
+        return tree.isfile(".travis.yml")
+
 
 class NoTravisBadgeFix(instarepo.fixers.base.SingleFileFix):
     """Removes the Travis badge from README files"""
 
+    api_commits = True
+
     def __init__(self, context: instarepo.fixers.context.Context):
         super().__init__(
             context.git, "README.md", "chore: Removed Travis badge from README"
@@ -38,6 +44,13 @@ class NoTravisBadgeFix(instarepo.fixers.base.SingleFileFix):
     def convert(self, contents: str) -> str:
         return remove_travis_badge(contents)
 
+    @staticmethod
+    def prescreen(tree, _context) -> bool:
+        if not tree.isfile("README.md"):
+            return False
+        contents = tree.read_text("README.md")
+        return remove_travis_badge(contents) != contents
+
 
 RE_BADGE = re.compile(
     r"\[!\[Build Status\]\(https://travis-ci[^)]+\)\]\(https://travis-ci[^)]+\)"
@@ -131,6 +144,9 @@ jobs:
     def should_process_repo(self) -> bool:
         return self.context.git.isfile("Pipfile")
 
+    def should_process_tree(self, tree) -> bool:
+        return tree.isfile("Pipfile")
+
 
 class PythonReleaseFix(instarepo.fixers.base.MissingFileFix):
     """Adds a release GitHub action for Python projects"""
@@ -191,3 +207,9 @@ jobs:
             filter(lambda line: line.startswith("twine"), pipfile_lines)
         )
         return has_twine_dependency
+
+    def should_process_tree(self, tree) -> bool:
+        if not tree.isfile("Pipfile"):
+            return False
+        pipfile_lines = tree.read_text("Pipfile").splitlines()
+        return any(filter(lambda line: line.startswith("twine"), pipfile_lines))
@@ -21,6 +21,23 @@ def try_get_fixer_order(fixer_class):
     return fixer_class.order if hasattr(fixer_class, "order") else 0
 
 
+def is_read_only(fixer_class) -> bool:
+    """
+    Checks if the given fixer class only reads files,
+    i.e. it never changes the working directory.
+    """
+    return getattr(fixer_class, "read_only", False)
+
+
+def supports_api_commits(fixer_class) -> bool:
+    """
+    Checks if the given fixer class does all its file operations through
+    the git working directory, so that it can run without a clone
+    and commit through the Git Data API.
+    """
+    return is_read_only(fixer_class) or getattr(fixer_class, "api_commits", False)
+
+
 def select_fixer_classes(
     only_fixers: List[str] = None, except_fixers: List[str] = None
 ):
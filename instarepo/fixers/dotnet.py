@@ -90,6 +90,11 @@ class MustHaveCIFix:
             return [msg]
         return []
 
+    @staticmethod
+    def prescreen(tree, _context) -> bool:
+        # multiple sln files not supported
+        return len(list(tree.root_files_of_extension(".sln"))) == 1
+
     def _get_sln_paths(self):
         with os.scandir(self.context.git.dir) as iterator:
             for entry in iterator:
@@ -1,5 +1,4 @@
 import datetime
-import os.path
 import re
 
 import instarepo.fixers.context
@@ -36,27 +35,36 @@ class CopyrightYearFix:
     Does not run for forks, private repos, and local git repos.
     """
 
+    api_commits = True
+
     def __init__(self, context: instarepo.fixers.context.Context):
         self.context = context
 
     def run(self):
         if not self.context.repo or self.context.repo.private or self.context.repo.fork:
             return []
-        filename = self.context.git.join("LICENSE")
-        if not os.path.isfile(filename):
+        if not self.context.git.isfile("LICENSE"):
             return []
-        with open(filename, "r", encoding="utf-8") as file:
-            old_contents = file.read()
+        old_contents = self.context.git.read_text("LICENSE")
         new_contents = update_copyright_year(old_contents, datetime.date.today().year)
         if old_contents == new_contents:
             return []
-        with open(filename, "w", encoding="utf8") as file:
-            file.write(new_contents)
+        self.context.git.write_text("LICENSE", new_contents)
         self.context.git.add("LICENSE")
         msg = "chore: Updated copyright year in LICENSE"
         self.context.git.commit(msg)
         return [msg]
 
+    @staticmethod
+    def prescreen(tree, context: instarepo.fixers.context.Context) -> bool:
+        if not context.repo or context.repo.private or context.repo.fork:
+            return False
+        if not tree.isfile("LICENSE"):
+            return False
+        old_contents = tree.read_text("LICENSE")
+        new_contents = update_copyright_year(old_contents, datetime.date.today().year)
+        return old_contents != new_contents
+
 
 MIT_LICENSE = """MIT License
 
@@ -89,6 +97,8 @@ class MustHaveLicenseFix(MissingFileFix):
     Does not run for forks, private repos, and local git repos.
     """
 
+    api_commits = True
+
     def get_filename(self):
         return "LICENSE"
 
@@ -96,6 +106,9 @@ class MustHaveLicenseFix(MissingFileFix):
         repo = self.context.repo
         return repo and not repo.private and not repo.fork
 
+    def should_process_tree(self, tree):
+        return self.should_process_repo()
+
     def get_contents(self):
         contents = MIT_LICENSE.replace(
             "[year]", str(datetime.date.today().year)
@@ -6,11 +6,10 @@ import subprocess
 import tempfile
 import xml.etree.ElementTree as ET
 
-import requests
-
 import instarepo.fixers.context
 import instarepo.git
 import instarepo.github
+import instarepo.http_session
 import instarepo.xml_utils
 from instarepo.fixers.base import MissingFileFix
 from .finders import is_maven_project
@@ -55,6 +54,9 @@ class MustHaveCIFix(MissingFileFix):
     def should_process_repo(self):
         return is_maven_project(self.context.git.dir)
 
+    def should_process_tree(self, tree):
+        return tree.isfile("pom.xml")
+
     def get_contents(self):
         return MAVEN_YML.replace("trunk", self.context.default_branch())
 
@@ -70,6 +72,13 @@ class MavenBadgesFix:
         self.context = context
         self.maven = Maven(context.git.dir)
 
+    @staticmethod
+    def prescreen(tree, context: instarepo.fixers.context.Context) -> bool:
+        # the badges depend on Maven Central, so only the files can be checked
+        return bool(
+            context.repo and tree.isfile("README.md") and tree.isfile("pom.xml")
+        )
+
     def run(self):
         if not self.context.git.isfile("README.md"):
             return []
@@ -145,7 +154,7 @@ def maven_central_badge(root: ET.Element):
         return {}
     group_id_as_path = group_id.replace(".", "/")
     url = f"https://repo1.maven.org/maven2/{group_id_as_path}/{artifact_id}/"
-    response = requests.get(url)
+    response = instarepo.http_session.shared_session().get(url)
     if not response.ok:
         return {}
     needle = "maven-central"
@@ -253,6 +262,10 @@ class UrlFix:
     def __init__(self, context: instarepo.fixers.context.Context):
         self.context = context
 
+    @staticmethod
+    def prescreen(tree, context: instarepo.fixers.context.Context) -> bool:
+        return bool(context.repo and tree.isfile("pom.xml"))
+
     def run(self):
         if not self.context.git.isfile("pom.xml") or not self.context.repo:
             return []
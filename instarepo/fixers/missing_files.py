@@ -1,4 +1,4 @@
-import requests
+import instarepo.http_session
 from instarepo.fixers.base import MissingFileFix
 from .finders import is_lazarus_project, is_maven_project, is_vb6_project
 from .naming import fixer_class_to_fixer_key
@@ -11,6 +11,8 @@ class MustHaveReadmeFix(MissingFileFix):
     Does not run for locally checked out repositories.
     """
 
+    api_commits = True
+
     def get_filename(self):
         return "README.md"
 
@@ -25,6 +27,9 @@ class MustHaveReadmeFix(MissingFileFix):
         repo = self.context.repo
         return repo is not None
 
+    def should_process_tree(self, tree) -> bool:
+        return self.should_process_repo()
+
 
 EDITOR_CONFIG = """# Editor configuration, see https://editorconfig.org
 root = true
@@ -48,6 +53,9 @@ indent_size = 2
 class MustHaveEditorConfigFix(MissingFileFix):
     """Ensures an editorconfig file exists"""
 
+    api_commits = True
+    known_contents = EDITOR_CONFIG
+
     def get_filename(self):
         return ".editorconfig"
 
@@ -83,6 +91,9 @@ class MustHaveGitHubFundingFix(MissingFileFix):
         with open(self._get_template_filename(), "r", encoding="utf-8") as file:
             return file.read()
 
+    def should_process_tree(self, tree):
+        return self.should_process_repo()
+
     def _get_template_filename(self):
         return self.context.get_setting("funding.yml")
 
@@ -112,7 +123,7 @@ backup/
     def get_contents(self):
         if is_maven_project(self.context.git.dir):
             # https://github.com/github/gitignore/blob/master/Maven.gitignore
-            response = requests.get(
+            response = instarepo.http_session.shared_session().get(
                 "https://raw.githubusercontent.com/github/gitignore/master/Maven.gitignore"
             )
             response.raise_for_status()
@@ -123,6 +134,13 @@ backup/
             return self.VB6_GITIGNORE
         return None
 
+    def should_process_tree(self, tree):
+        return (
+            tree.isfile("pom.xml")
+            or tree.has_file_of_extension(".lpr")
+            or tree.has_file_of_extension(".vbp", ".vbg")
+        )
+
     def should_overwrite(self):
         return self.context.get_setting(
             fixer_class_to_fixer_key(self.__class__), "overwrite"
@@ -48,6 +48,14 @@ class AutoFormatFix:
         self._fallback_ptop_cfg = None
         self.verbose = context.verbose
 
+    @staticmethod
+    def prescreen(tree, _context) -> bool:
+        return (
+            os.path.isfile(JCF_EXE)
+            and bool(find_jedi_cfg())
+            and tree.has_file_of_extension(".pas", ".lpr")
+        )
+
     def run(self):
         if not os.path.isfile(JCF_EXE):
             logging.debug("JEDI Code Format exe %s not found", JCF_EXE)
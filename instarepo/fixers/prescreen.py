@@ -0,0 +1,153 @@
+"""
+Decides from the file tree of a repository, without cloning it,
+whether any fixer could possibly change something.
+
+Fixer classes opt in by implementing a `prescreen(tree, context)` class method
+that returns False only when the fixer certainly has nothing to do.
+Fixers without it are assumed to always have something to do.
+"""
+
+import hashlib
+import logging
+from typing import Callable, Dict, Iterable, Optional
+
+import instarepo.fixers.context
+
+REGULAR_FILE_MODE = "100644"
+
+
+class RepoTree:
+    """
+    The files of a branch, as returned by the Git Trees API.
+
+    File contents are fetched lazily by blob SHA. Blobs never change,
+    so a blob is fetched at most once.
+    """
+
+    def __init__(
+        self,
+        blobs: Dict[str, str],
+        read_blob: Optional[Callable[[str], str]] = None,
+        sha: Optional[str] = None,
+        modes: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Creates an instance of this class.
+
+        :param blobs: The blob SHA of every file, keyed by its path relative to the root
+        :param read_blob: Fetches the text of a blob by its SHA
+        :param sha: The SHA of the tree, if it exists on GitHub
+        :param modes: The file modes that differ from a regular file (100644), keyed by path
+        """
+        self.blobs = blobs
+        self._read_blob = read_blob
+        self._texts: Dict[str, str] = {}
+        self.sha = sha
+        self.modes = modes or {}
+
+    @staticmethod
+    def from_json(tree_json, read_blob: Optional[Callable[[str], str]] = None):
+        """
+        Creates an instance from the response of the Trees API.
+        Returns None if the tree is truncated, because then files could be missing.
+        """
+        if tree_json.get("truncated"):
+            return None
+        blobs = [entry for entry in tree_json["tree"] if entry["type"] == "blob"]
+        return RepoTree(
+            {entry["path"]: entry["sha"] for entry in blobs},
+            read_blob,
+            tree_json.get("sha"),
+            {
+                entry["path"]: entry["mode"]
+                for entry in blobs
+                if entry.get("mode", REGULAR_FILE_MODE) != REGULAR_FILE_MODE
+            },
+        )
+
+    def mode(self, path: str) -> str:
+        return self.modes.get(path, REGULAR_FILE_MODE)
+
+    def with_files(self, files: Dict[str, str]):
+        """
+        Creates a new tree where the given files (contents keyed by path) are added or replaced.
+        The new tree does not exist on GitHub, so it has no SHA.
+        """
+        result = RepoTree(dict(self.blobs), self._read_blob, None, self.modes)
+        result._texts = dict(self._texts)
+        for path, contents in files.items():
+            sha = git_blob_sha(contents)
+            result.blobs[path] = sha
+            result._texts[sha] = contents
+        return result
+
+    def isfile(self, path: str) -> bool:
+        return path in self.blobs
+
+    def blob_sha(self, path: str) -> Optional[str]:
+        return self.blobs.get(path)
+
+    def has_file_of_extension(self, *args) -> bool:
+        """
+        Checks if the root directory has a file of the given extensions,
+        like `instarepo.fixers.finders.has_file_of_extension`.
+        """
+        return any(self.root_files_of_extension(*args))
+
+    def root_files_of_extension(self, *args) -> Iterable[str]:
+        for path in self.blobs:
+            if "/" not in path and (not args or path.endswith(args)):
+                yield path
+
+    def read_text(self, path: str) -> str:
+        """
+        Reads the contents of the given file.
+        """
+        sha = self.blobs[path]
+        if sha not in self._texts:
+            if not self._read_blob:
+                raise ValueError(f"Cannot read {path} without a blob reader")
+            self._texts[sha] = self._read_blob(sha)
+        return self._texts[sha]
+
+    def matches(self, path: str, contents: str) -> bool:
+        """
+        Checks if the given file exists and has exactly the given contents,
+        comparing blob SHAs.
+        """
+        return self.blob_sha(path) == git_blob_sha(contents)
+
+
+def git_blob_sha(contents: str) -> str:
+    """
+    Computes the SHA that git assigns to a file with the given contents.
+    """
+    data = contents.encode("utf-8")
+    header = f"blob {len(data)}\0".encode("utf-8")
+    return hashlib.sha1(header + data).hexdigest()
+
+
+def could_change(
+    fixer_class, tree: RepoTree, context: instarepo.fixers.context.Context
+) -> bool:
+    """
+    Checks if the given fixer could change something in the given tree.
+    """
+    prescreen = getattr(fixer_class, "prescreen", None)
+    if prescreen is None:
+        return True
+    return prescreen(tree, context)
+
+
+def fixers_that_could_change(
+    fixer_classes, tree: RepoTree, context: instarepo.fixers.context.Context
+):
+    """
+    Gets the fixer classes that could change something in the given tree.
+    """
+    result = []
+    for fixer_class in fixer_classes:
+        if could_change(fixer_class, tree, context):
+            logging.debug("Fixer %s could change something", fixer_class.__name__)
+            result.append(fixer_class)
+    return result
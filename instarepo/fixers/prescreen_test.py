@@ -0,0 +1,91 @@
+"""Unit tests for prescreen.py"""
+
+import datetime
+
+from pytest_mock import MockerFixture
+
+import instarepo.fixers.context
+from .ci import NoTravisBadgeFix, NoTravisFix, PythonBuildFix
+from .discovery import all_fixer_classes
+from .license import CopyrightYearFix
+from .missing_files import EDITOR_CONFIG, MustHaveEditorConfigFix
+from .prescreen import RepoTree, fixers_that_could_change, git_blob_sha
+from .readme import ReadmeImageFix
+from ..repo_source_test import dummy_repo
+
+
+def _context(mocker: MockerFixture, overwrite: bool = False):
+    config = mocker.Mock()
+    config.get_setting.side_effect = lambda full_name, *args: (
+        overwrite if args[-1] == "overwrite" else None
+    )
+    return instarepo.fixers.context.Context(
+        git=None, config=config, repo=dummy_repo("foo", "jdoe/foo")
+    )
+
+
+def _tree(files):
+    blobs = {path: git_blob_sha(contents) for path, contents in files.items()}
+    by_sha = {git_blob_sha(contents): contents for contents in files.values()}
+    return RepoTree(blobs, by_sha.__getitem__)
+
+
+def test_git_blob_sha():
+    # same as: echo hello | git hash-object --stdin
+    assert git_blob_sha("hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+
+
+def test_missing_file_fix(mocker: MockerFixture):
+    assert MustHaveEditorConfigFix.prescreen(_tree({}), _context(mocker))
+    assert not MustHaveEditorConfigFix.prescreen(
+        _tree({".editorconfig": "root = true"}), _context(mocker)
+    )
+    assert MustHaveEditorConfigFix.prescreen(
+        _tree({".editorconfig": "root = true"}), _context(mocker, overwrite=True)
+    )
+    assert not MustHaveEditorConfigFix.prescreen(
+        _tree({".editorconfig": EDITOR_CONFIG}), _context(mocker, overwrite=True)
+    )
+
+
+def test_missing_file_fix_checks_tree(mocker: MockerFixture):
+    assert not PythonBuildFix.prescreen(_tree({}), _context(mocker))
+    assert PythonBuildFix.prescreen(_tree({"Pipfile": ""}), _context(mocker))
+
+
+def test_content_fixers(mocker: MockerFixture):
+    year = datetime.date.today().year
+    context = _context(mocker)
+    assert CopyrightYearFix.prescreen(
+        _tree({"LICENSE": "Copyright (c) 2000 jdoe"}), context
+    )
+    assert not CopyrightYearFix.prescreen(
+        _tree({"LICENSE": f"Copyright (c) 2000-{year} jdoe"}), context
+    )
+    readme = '![logo](/images/logo.png?raw=true "Logo")'
+    assert ReadmeImageFix.prescreen(_tree({"README.md": readme}), context)
+    assert not ReadmeImageFix.prescreen(
+        _tree({"README.md": readme, "images/logo.png": ""}), context
+    )
+    assert NoTravisFix.prescreen(_tree({".travis.yml": ""}), context)
+    badge = "[![Build Status](https://travis-ci.org/x)](https://travis-ci.org/x)"
+    assert NoTravisBadgeFix.prescreen(_tree({"README.md": badge}), context)
+    assert not NoTravisBadgeFix.prescreen(_tree({"README.md": "# foo\n"}), context)
+
+
+def test_nothing_to_fix(mocker: MockerFixture):
+    # arrange
+    year = datetime.date.today().year
+    tree = _tree(
+        {
+            "README.md": "# foo\n",
+            "LICENSE": f"Copyright (c) {year} jdoe",
+            ".editorconfig": EDITOR_CONFIG,
+        }
+    )
+
+    # act
+    result = fixers_that_could_change(all_fixer_classes(), tree, _context(mocker))
+
+    # assert
+    assert result == []
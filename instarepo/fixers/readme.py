@@ -30,6 +30,16 @@ class ReadmeImageFix(SingleFileFix):
     def convert(self, contents: str) -> str:
         return RE_MARKDOWN_IMAGE.sub(self.image_convert, contents)
 
+    @classmethod
+    def prescreen(cls, tree, context: instarepo.fixers.context.Context) -> bool:
+        if not tree.isfile("README.md"):
+            return False
+        # an image can only be fixed if it is broken
+        for match in RE_MARKDOWN_IMAGE.finditer(tree.read_text("README.md")):
+            if not tree.isfile(match.group("filename").lstrip("/")):
+                return True
+        return False
+
     def image_convert(self, match: re.Match) -> str:
         filename = match.group("filename")
         new_filename = self.find_new_filename(filename)
@@ -1,5 +1,4 @@
 import logging
-import os.path
 import re
 from typing import List
 
@@ -19,8 +18,12 @@ class RepoDescriptionFix:
     GitHub REST API directly (https://docs.github.com/en/rest/reference/repos#update-a-repository).
 
     Does not run for local git repositories.
+
+    It only reads files, so it can run without a clone.
     """
 
+    read_only = True
+
     def __init__(self, context: instarepo.fixers.context.Context):
         self.github = context.github
         self.git = context.git
@@ -40,18 +43,27 @@ class RepoDescriptionFix:
         # this fixer does not create an MR
         return []
 
+    @staticmethod
+    def prescreen(tree, context: instarepo.fixers.context.Context) -> bool:
+        if not context.repo or not context.github or not tree.isfile("README.md"):
+            return False
+        lines = [line.strip() for line in tree.read_text("README.md").splitlines()]
+        lines = [line for line in lines if RE_DESCRIPTION_LINE.match(line)]
+        readme_description = get_description_from_lines(lines)
+        return (
+            bool(readme_description) and readme_description != context.repo.description
+        )
+
     def get_readme_description(self):
-        filename = os.path.join(self.git.dir, "README.md")
-        if not os.path.isfile(filename):
+        if not self.git.isfile("README.md"):
             return None
-        with open(filename, "r", encoding="utf-8") as file:
-            # read lines
-            lines = file.readlines()
-            # trim
-            lines = [line.strip() for line in lines]
-            # keep the ones that start with a letter
-            lines = [line for line in lines if RE_DESCRIPTION_LINE.match(line)]
-            return get_description_from_lines(lines)
+        # read lines
+        lines = self.git.read_text("README.md").splitlines()
+        # trim
+        lines = [line.strip() for line in lines]
+        # keep the ones that start with a letter
+        lines = [line for line in lines if RE_DESCRIPTION_LINE.match(line)]
+        return get_description_from_lines(lines)
 
 
 def get_description_from_lines(lines: List[str]) -> str:
@@ -1,4 +1,5 @@
 import datetime
+import os
 import os.path
 import subprocess
 
@@ -26,6 +27,19 @@ class GitWorkingDir:
     def isdir(self, *args) -> bool:
         return os.path.isdir(self.join(*args))
 
+    def read_text(self, *args) -> str:
+        with open(self.join(*args), "r", encoding="utf-8") as file:
+            return file.read()
+
+    def write_text(self, relative_path: str, contents: str) -> None:
+        """
+        Writes the given file, creating its directories if needed.
+        """
+        filename = self.join(relative_path)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, "w", encoding="utf-8") as file:
+            file.write(contents)
+
     def create_branch(self, name: str) -> None:
         args = ["git", "checkout"]
         if self.quiet:
@@ -218,6 +232,19 @@ class GitWorkingDir:
         return result.stdout.splitlines()
 
 
+def global_user_name() -> str:
+    """
+    Gets the `user.name` property configured outside of any repository.
+    """
+    result = subprocess.run(
+        ["git", "config", "--global", "user.name"],
+        check=False,
+        encoding="utf-8",
+        stdout=subprocess.PIPE,
+    )
+    return result.stdout.strip()
+
+
 def clone(ssh_url: str, clone_dir: str, quiet: bool = False) -> GitWorkingDir:
     args = ["git", "clone"]
     if quiet:
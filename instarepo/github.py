@@ -1,9 +1,66 @@
+import base64
+import collections
+import concurrent.futures
 import datetime
 import logging
+import urllib.parse
+from typing import Callable, Deque, List, Optional
+
 import requests
 
+import instarepo.async_github
+import instarepo.git
+import instarepo.http_cache
+import instarepo.http_metrics
+import instarepo.http_session
+import instarepo.rate_limit
+import instarepo.retry
+
+from .credentials import build_requests_auth
+
+API_URL = "https://api.github.com"
+
+MAX_RATE_LIMIT_ATTEMPTS = 3
+
+PER_PAGE = 100
+"""The page size of list endpoints. 100 is the maximum that GitHub allows."""
+
+DEFAULT_PAGE_PREFETCH = 4
+
+SEARCH_RESULTS_LIMIT = 1000
+"""The search API returns at most this many results for a query."""
+
+DEFAULT_TIMEOUT = 60.0
+"""The number of seconds to wait for the API to respond."""
+
 
 class Repo:
+    """
+    The metadata of a GitHub repository.
+
+    Only the fields that instarepo uses are copied from the API response.
+    Timestamps are parsed on first access.
+    """
+
+    __slots__ = (
+        "name",
+        "archived",
+        "clone_url",
+        "html_url",
+        "ssh_url",
+        "default_branch",
+        "full_name",
+        "description",
+        "private",
+        "fork",
+        "language",
+        "topics",
+        "size",
+        "_created_at",
+        "_pushed_at",
+        "_updated_at",
+    )
+
     def __init__(self, repo_json):
         self.name: str = repo_json["name"]
         self.archived: bool = repo_json["archived"]
@@ -15,16 +72,77 @@ class Repo:
         self.description: str = repo_json["description"]
         self.private: bool = repo_json["private"]
         self.fork: bool = repo_json["fork"]
-        self.created_at = datetime.datetime.strptime(
-            repo_json["created_at"], "%Y-%m-%dT%H:%M:%S%z"
-        )
-        self.pushed_at = datetime.datetime.strptime(
-            repo_json["pushed_at"], "%Y-%m-%dT%H:%M:%S%z"
-        )
-        self.updated_at = datetime.datetime.strptime(
-            repo_json["updated_at"], "%Y-%m-%dT%H:%M:%S%z"
-        )
         self.language: str = repo_json["language"]
+        # not returned by every endpoint (nor kept by older caches)
+        self.topics: List[str] = repo_json.get("topics") or []
+        self.size: int = repo_json.get("size") or 0
+        # kept as strings until first access
+        self._created_at = repo_json["created_at"]
+        self._pushed_at = repo_json["pushed_at"]
+        self._updated_at = repo_json["updated_at"]
+
+    @property
+    def owner(self) -> str:
+        return self.full_name.partition("/")[0]
+
+    @property
+    def created_at(self) -> datetime.datetime:
+        if isinstance(self._created_at, str):
+            self._created_at = _parse_timestamp(self._created_at)
+        return self._created_at
+
+    @property
+    def pushed_at(self) -> datetime.datetime:
+        if isinstance(self._pushed_at, str):
+            self._pushed_at = _parse_timestamp(self._pushed_at)
+        return self._pushed_at
+
+    @property
+    def updated_at(self) -> datetime.datetime:
+        if isinstance(self._updated_at, str):
+            self._updated_at = _parse_timestamp(self._updated_at)
+        return self._updated_at
+
+    def to_json(self) -> dict:
+        """
+        Gets the fields of this repository in the format of the API response,
+        so that `Repo(repo.to_json())` is a copy of it.
+        """
+        return {
+            "name": self.name,
+            "archived": self.archived,
+            "clone_url": self.clone_url,
+            "html_url": self.html_url,
+            "ssh_url": self.ssh_url,
+            "default_branch": self.default_branch,
+            "full_name": self.full_name,
+            "description": self.description,
+            "private": self.private,
+            "fork": self.fork,
+            "language": self.language,
+            "topics": list(self.topics),
+            "size": self.size,
+            "created_at": format_timestamp(self._created_at),
+            "pushed_at": format_timestamp(self._pushed_at),
+            "updated_at": format_timestamp(self._updated_at),
+        }
+
+    def __repr__(self):
+        return f"Repo({self.full_name})"
+
+
+def _parse_timestamp(value: str) -> datetime.datetime:
+    return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+
+
+def format_timestamp(value) -> str:
+    """
+    Formats a timestamp like the API does (e.g. 2021-11-04T21:32:00Z).
+    Strings are assumed to be formatted already.
+    """
+    if isinstance(value, str):
+        return value
+    return value.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
 class GitHub:
@@ -32,30 +150,208 @@ class GitHub:
     A read-only GitHub client.
     """
 
-    def __init__(self, auth):
+    def __init__(
+        self,
+        auth,
+        session: Optional[requests.Session] = None,
+        pool_size: int = instarepo.http_session.DEFAULT_POOL_SIZE,
+        cache: Optional[instarepo.http_cache.HttpCache] = None,
+        rate_limiter: Optional[instarepo.rate_limit.RateLimiter] = None,
+        page_prefetch: int = DEFAULT_PAGE_PREFETCH,
+        concurrency: Optional[int] = None,
+        api_url: str = API_URL,
+        retry_policy: Optional[instarepo.retry.RetryPolicy] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        """
+        Creates an instance of this class.
+
+        :param auth: The authentication to use for all API calls
+        :param session: An optional session to use. If not given, a new pooled session is created
+        :param pool_size: The maximum number of keep-alive connections, if a new session is created
+        :param cache: An optional cache for conditional GET requests, if a new session is created
+        :param rate_limiter: Schedules the requests within the rate limits. If not given, a new one is created
+        :param page_prefetch: The maximum number of pages of a listing to fetch concurrently
+        :param concurrency: The maximum number of requests that `async_github` keeps in flight, by default `pool_size`
+        :param api_url: The base URL of the API, e.g. to use a local fake server
+        :param retry_policy: Decides how to retry requests that fail because of transient errors
+        :param timeout: The number of seconds to wait for the server to respond
+        """
         self.auth = auth
+        self.api_url = api_url.rstrip("/")
+        self.rate_limiter = rate_limiter or instarepo.rate_limit.RateLimiter()
+        self.page_prefetch = page_prefetch
+        self.retry_policy = retry_policy or instarepo.retry.RetryPolicy()
+        self.timeout = timeout
+        self.session = session or instarepo.http_session.create_session(
+            pool_size=pool_size,
+            headers={"Accept": "application/vnd.github.v3+json"},
+            auth=auth,
+            cache=cache,
+            base_url=self.api_url,
+        )
+        self.async_github = instarepo.async_github.AsyncGitHub(
+            self, concurrency=concurrency or pool_size
+        )
+
+    def connection_stats(self) -> instarepo.http_session.ConnectionStats:
+        """
+        Gets the connection statistics of the underlying connection pool.
+        """
+        return self.session.get_adapter(self.api_url).stats
+
+    def http_metrics(self) -> instarepo.http_metrics.HttpMetrics:
+        """
+        Gets the per-endpoint metrics of the requests of this client.
+        """
+        return self.session.get_adapter(self.api_url).metrics
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        mutating: Optional[bool] = None,
+        idempotent: Optional[bool] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Sends a request through the rate limiter.
+        Requests that are rejected because of a rate limit are sent again
+        after the limit resets. Idempotent requests that fail because of
+        transient errors (server errors, timeouts, connection errors) are
+        sent again according to the retry policy.
+
+        :param mutating: Whether the request changes data. Defaults to deciding by the HTTP method.
+        :param idempotent: Whether the request can be sent again safely.
+        Defaults to true for requests that do not change data and for idempotent HTTP methods.
+        """
+        if idempotent is None:
+            idempotent = mutating is False or (
+                method.upper() in instarepo.retry.IDEMPOTENT_METHODS
+            )
+        kwargs.setdefault("timeout", self.timeout)
+        resource = instarepo.rate_limit.resource_of(url)
+        attempt = 1
+        retry = 1
+        while True:
+            self.rate_limiter.acquire(method, mutating, resource)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except instarepo.retry.RETRYABLE_EXCEPTIONS as ex:
+                if not idempotent or not self.retry_policy.can_retry(retry):
+                    raise
+                self._retry(method, url, retry, ex)
+                retry = retry + 1
+                continue
+            wait = self.rate_limiter.update(response, resource)
+            if wait is not None and attempt < MAX_RATE_LIMIT_ATTEMPTS:
+                logging.warning(
+                    "Hit GitHub rate limit on %s %s, retrying in %.0f seconds",
+                    method,
+                    url,
+                    wait,
+                )
+                attempt = attempt + 1
+                continue
+            if (
+                idempotent
+                and instarepo.retry.is_retryable_status(response.status_code)
+                and self.retry_policy.can_retry(retry)
+            ):
+                self._retry(method, url, retry, f"HTTP {response.status_code}")
+                retry = retry + 1
+                continue
+            return response
+
+    def _retry(self, method: str, url: str, retry: int, reason):
+        """
+        Records a retry and waits before it.
+        """
+        logging.warning(
+            "%s %s failed (%s), retrying (%d/%d)",
+            method,
+            url,
+            reason,
+            retry,
+            self.retry_policy.max_retries,
+        )
+        self.http_metrics().record_retry(
+            method, instarepo.http_metrics.endpoint_template(url, self.api_url)
+        )
+        self.retry_policy.backoff(retry)
+
+    def get_all_repos(
+        self, sort: str, direction: str, stop: Optional[Callable[[Repo], bool]] = None
+    ):
+        """
+        Lists the repositories of the authenticated user.
 
-    def get_all_repos(self, sort: str, direction: str):
-        page = 1
-        per_page = 30
-        has_more = True
-        while has_more:
-            count = 0
-            for repo in self.get_all_repos_of_page(sort, direction, page, per_page):
-                count = count + 1
+        :param sort: The field to sort by
+        :param direction: The direction to sort by
+        :param stop: If given, pagination stops at the first repository for which it returns True
+        """
+        # https://docs.github.com/en/rest/reference/repos#list-repositories-for-the-authenticated-user
+        return self._paginate_repos(
+            f"{self.api_url}/user/repos",
+            {
+                "sort": sort,
+                "direction": direction,
+                "visibility": "all",  # Can be one of all, public, or private. Default: all
+                "affiliation": "owner",  # Comma-separated list of values. Default: owner,collaborator,organization_member
+            },
+            stop,
+        )
+
+    def get_org_repos(
+        self,
+        org: str,
+        sort: str,
+        direction: str,
+        stop: Optional[Callable[[Repo], bool]] = None,
+    ):
+        # https://docs.github.com/en/rest/reference/repos#list-organization-repositories
+        return self._paginate_repos(
+            f"{self.api_url}/orgs/{org}/repos",
+            {"sort": sort, "direction": direction, "type": "all"},
+            stop,
+        )
+
+    def get_user_repos(
+        self,
+        user: str,
+        sort: str,
+        direction: str,
+        stop: Optional[Callable[[Repo], bool]] = None,
+    ):
+        # https://docs.github.com/en/rest/reference/repos#list-repositories-for-a-user
+        return self._paginate_repos(
+            f"{self.api_url}/users/{user}/repos",
+            {"sort": sort, "direction": direction, "type": "owner"},
+            stop,
+        )
+
+    def _paginate_repos(
+        self, url: str, params: dict, stop: Optional[Callable[[Repo], bool]]
+    ):
+        pages = self._paginate(url, params)
+        try:
+            for repo_json in pages:
+                repo = Repo(repo_json)
+                if stop and stop(repo):
+                    logging.debug("Stopped listing %s at %s", url, repo.full_name)
+                    return
                 yield repo
-            page = page + 1
-            has_more = count >= per_page
+        finally:
+            # cancels the pages that have not been requested yet
+            pages.close()
 
     def get_all_repos_of_page(
         self, sort: str, direction: str, page: int, per_page: int
     ):
         # https://docs.github.com/en/rest/reference/repos#list-repositories-for-the-authenticated-user
-        response = requests.get(
-            "https://api.github.com/user/repos",
-            auth=self.auth,
-            headers={"Accept": "application/vnd.github.v3+json"},
-            params={
+        items, _ = self._get_page(
+            f"{self.api_url}/user/repos",
+            {
                 "sort": sort,
                 "direction": direction,
                 "page": page,  # first page's index is 1
@@ -64,11 +360,106 @@ class GitHub:
                 "affiliation": "owner",  # Comma-separated list of values. Default: owner,collaborator,organization_member
             },
         )
-        response.raise_for_status()
-        for repo in response.json():
-            logging.debug("yield repo: %s", repo)
+        for repo in items:
             yield Repo(repo)
 
+    def search_issues(self, query: str):
+        """
+        Searches issues and pull requests.
+        Raises a ValueError if GitHub reports that the results are incomplete.
+        """
+        # https://docs.github.com/en/rest/reference/search#search-issues-and-pull-requests
+        return self._paginate(f"{self.api_url}/search/issues", {"q": query}, "items")
+
+    def search_repos(self, query: str) -> Optional[List[Repo]]:
+        """
+        Searches repositories, in no particular order.
+
+        Returns None if more than `SEARCH_RESULTS_LIMIT` repositories match,
+        because the search API cannot return all of them, or if GitHub reports
+        that the results are incomplete (e.g. because the search timed out).
+        """
+        # https://docs.github.com/en/rest/reference/search#search-repositories
+        url = f"{self.api_url}/search/repositories"
+        params = {"q": query, "per_page": PER_PAGE, "page": 1}
+        items = []
+        while url:
+            response = self._request("GET", url, params=params)
+            response.raise_for_status()
+            result = response.json()
+            if result["total_count"] > SEARCH_RESULTS_LIMIT:
+                return None
+            if result.get("incomplete_results"):
+                logging.warning("GitHub returned incomplete results for %s", query)
+                return None
+            items.extend(result["items"])
+            url = response.links.get("next", {}).get("url")
+            # the next link carries the query parameters
+            params = {}
+        return [Repo(repo) for repo in items]
+
+    def _get_page(self, url: str, params: dict, items_key: Optional[str] = None):
+        """
+        Fetches one page of a list endpoint.
+        Returns the items of the page and the parsed `Link` header.
+
+        :param items_key: The key of the items, for endpoints that wrap them in an object (e.g. search)
+        """
+        response = self._request("GET", url, params=params)
+        response.raise_for_status()
+        result = response.json()
+        if items_key:
+            if result.get("incomplete_results"):
+                raise ValueError(f"GitHub returned incomplete results for {url}")
+            result = result[items_key]
+        return result, response.links
+
+    def _paginate(self, url: str, params: dict, items_key: Optional[str] = None):
+        """
+        Fetches all pages of a list endpoint, following the `Link` header.
+
+        Once the number of the last page is known, the remaining pages are
+        fetched concurrently through `async_github`, keeping at most
+        `page_prefetch` pages in flight. Items are yielded in order.
+        """
+        params = dict(params, per_page=PER_PAGE)
+        items, links = self._get_page(url, dict(params, page=1), items_key)
+        yield from items
+        last_page = _page_number(links.get("last", {}).get("url"))
+        if last_page is None:
+            # no "last" relation, keep following "next" links one by one
+            next_url = links.get("next", {}).get("url")
+            while next_url:
+                items, links = self._get_page(next_url, {}, items_key)
+                yield from items
+                next_url = links.get("next", {}).get("url")
+            return
+        if self.async_github.in_worker():
+            # the other workers might be busy waiting for pages too
+            for page in range(2, last_page + 1):
+                items, _ = self._get_page(url, dict(params, page=page), items_key)
+                yield from items
+            return
+        window = max(self.page_prefetch, 1)
+        pending: Deque[concurrent.futures.Future] = collections.deque()
+        try:
+            next_page = 2
+            while next_page <= last_page or pending:
+                while next_page <= last_page and len(pending) < window:
+                    pending.append(
+                        self.async_github.submit(
+                            self.async_github.get_page(
+                                url, dict(params, page=next_page), items_key
+                            )
+                        )
+                    )
+                    next_page = next_page + 1
+                items, _ = pending.popleft().result()
+                yield from items
+        finally:
+            for future in pending:
+                future.cancel()
+
     def create_merge_request(
         self, full_name: str, head: str, base: str, title: str, body: str
     ) -> str:
@@ -78,12 +469,18 @@ class GitHub:
     def update_description(self, full_name: str, description: str):
         logging.debug("Would have set description of %s to %s", full_name, description)
 
+    def prefetches_merge_requests(self, head_branch: str) -> bool:
+        """
+        Checks if the open pull requests of the given branch are fetched
+        together with the repositories, so that listing them is free.
+        """
+        return False
+
     def list_merge_requests(self, full_name: str, head: str, base: str):
         # https://docs.github.com/en/rest/reference/pulls#list-pull-requests
-        response = requests.get(
-            f"https://api.github.com/repos/{full_name}/pulls",
-            auth=self.auth,
-            headers={"Accept": "application/vnd.github.v3+json"},
+        response = self._request(
+            "GET",
+            f"{self.api_url}/repos/{full_name}/pulls",
             params={"head": head, "base": base},
         )
         result = response.json()
@@ -91,7 +488,7 @@ class GitHub:
         return result
 
     def get_merge_request(self, full_name: str, pull_number: int):
-        href = f"https://api.github.com/repos/{full_name}/pulls/{pull_number}"
+        href = f"{self.api_url}/repos/{full_name}/pulls/{pull_number}"
         return self.get_json(href)
 
     def close_merge_request(self, full_name: str, pull_number: int):
@@ -101,9 +498,7 @@ class GitHub:
         logging.info("Would have merged MR %s %d", full_name, pull_number)
 
     def get_json(self, href: str):
-        response = requests.get(
-            href, auth=self.auth, headers={"Accept": "application/vnd.github.v3+json"}
-        )
+        response = self._request("GET", href)
         result = response.json()
         response.raise_for_status()
         return result
@@ -113,10 +508,84 @@ class GitHub:
 
     def list_check_runs(self, full_name: str, sha: str):
         # https://docs.github.com/en/rest/reference/checks#list-check-runs-for-a-git-reference
+        check_runs = list(
+            self._paginate(
+                f"{self.api_url}/repos/{full_name}/commits/{sha}/check-runs",
+                {},
+                "check_runs",
+            )
+        )
+        return {"total_count": len(check_runs), "check_runs": check_runs}
+
+    def get_tree(self, full_name: str, ref: str) -> Optional[dict]:
+        """
+        Gets the recursive file tree of the given branch.
+        Returns None if the branch does not exist or the repository is empty.
+        """
+        # https://docs.github.com/en/rest/reference/git#get-a-tree
+        response = self._request(
+            "GET",
+            f"{self.api_url}/repos/{full_name}/git/trees/{urllib.parse.quote(ref)}",
+            params={"recursive": "1"},
+        )
+        if response.status_code in (404, 409):
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def get_blob_text(self, full_name: str, sha: str) -> str:
+        """
+        Gets the contents of a file by its blob SHA.
+        """
+        # https://docs.github.com/en/rest/reference/git#get-a-blob
+        result = self.get_json(f"{self.api_url}/repos/{full_name}/git/blobs/{sha}")
+        return base64.b64decode(result["content"]).decode("utf-8", errors="replace")
+
+    def get_branch_sha(self, full_name: str, branch: str) -> Optional[str]:
+        """
+        Gets the SHA of the commit that the given branch points to.
+        Returns None if the branch does not exist.
+        """
+        # https://docs.github.com/en/rest/reference/git#get-a-reference
+        response = self._request(
+            "GET",
+            f"{self.api_url}/repos/{full_name}/git/ref/heads/{urllib.parse.quote(branch)}",
+        )
+        if response.status_code in (404, 409):
+            return None
+        response.raise_for_status()
+        return response.json()["object"]["sha"]
+
+    def compare_commits(self, full_name: str, base: str, head: str) -> dict:
+        """
+        Compares two branches or commits, returning how far apart they are
+        (`ahead_by`, `behind_by`) and the commits of `head` that are not in `base`.
+        """
+        # https://docs.github.com/en/rest/reference/commits#compare-two-commits
         return self.get_json(
-            f"https://api.github.com/repos/{full_name}/commits/{sha}/check-runs"
+            f"{self.api_url}/repos/{full_name}/compare/"
+            f"{urllib.parse.quote(base)}...{urllib.parse.quote(head)}"
         )
 
+    def create_tree(self, full_name: str, base_tree: str, entries: List[dict]) -> str:
+        logging.debug("Would have created tree in %s", full_name)
+        return ""
+
+    def create_commit(
+        self, full_name: str, message: str, tree: str, parents: List[str]
+    ) -> str:
+        logging.debug("Would have created commit in %s", full_name)
+        return ""
+
+    def create_ref(self, full_name: str, branch: str, sha: str):
+        logging.info("Would have created branch %s in %s", branch, full_name)
+
+    def update_ref(self, full_name: str, branch: str, sha: str, force: bool = False):
+        logging.info("Would have updated branch %s in %s", branch, full_name)
+
+    def delete_ref(self, full_name: str, branch: str):
+        logging.info("Would have deleted branch %s in %s", branch, full_name)
+
 
 class ReadWriteGitHub(GitHub):
     """
@@ -127,27 +596,54 @@ class ReadWriteGitHub(GitHub):
         self, full_name: str, head: str, base: str, title: str, body: str
     ) -> str:
         # https://docs.github.com/en/rest/reference/pulls#create-a-pull-request
-        response = requests.post(
-            f"https://api.github.com/repos/{full_name}/pulls",
-            auth=self.auth,
-            headers={"Accept": "application/vnd.github.v3+json"},
-            json={
-                "head": head,
-                "base": base,
-                "title": title,
-                "body": body,
-            },
-        )
-        result = response.json()
-        response.raise_for_status()
-        return result["html_url"]
+        # Creating a pull request is not idempotent. If the request fails
+        # in a way that it might have reached GitHub, list the pull requests
+        # to find out, and only send it again if it is not there.
+        retry = 1
+        while True:
+            error: Optional[Exception] = None
+            try:
+                response = self._request(
+                    "POST",
+                    f"{self.api_url}/repos/{full_name}/pulls",
+                    json={
+                        "head": head,
+                        "base": base,
+                        "title": title,
+                        "body": body,
+                    },
+                )
+            except instarepo.retry.RETRYABLE_EXCEPTIONS as ex:
+                error = ex
+            else:
+                if not instarepo.retry.is_retryable_status(response.status_code):
+                    result = response.json()
+                    response.raise_for_status()
+                    return result["html_url"]
+            existing = self.list_merge_requests(full_name, head, base)
+            if existing:
+                logging.info(
+                    "Found PR %s that was created despite the error", full_name
+                )
+                return existing[0]["html_url"]
+            if not self.retry_policy.can_retry(retry):
+                if error:
+                    raise error
+                response.raise_for_status()
+            self._retry(
+                "POST",
+                f"{self.api_url}/repos/{full_name}/pulls",
+                retry,
+                error or f"HTTP {response.status_code}",
+            )
+            retry = retry + 1
 
     def update_description(self, full_name: str, description: str):
         # https://docs.github.com/en/rest/reference/repos#update-a-repository
-        response = requests.patch(
-            f"https://api.github.com/repos/{full_name}",
-            auth=self.auth,
-            headers={"Accept": "application/vnd.github.v3+json"},
+        response = self._request(
+            "PATCH",
+            f"{self.api_url}/repos/{full_name}",
+            idempotent=True,
             json={"description": description},
         )
         response.raise_for_status()
@@ -155,10 +651,10 @@ class ReadWriteGitHub(GitHub):
     def close_merge_request(self, full_name: str, pull_number: int):
         # https://docs.github.com/en/rest/reference/pulls#update-a-pull-request
         logging.info("Closing PR %s %d", full_name, pull_number)
-        response = requests.patch(
-            f"https://api.github.com/repos/{full_name}/pulls/{pull_number}",
-            auth=self.auth,
-            headers={"Accept": "application/vnd.github.v3+json"},
+        response = self._request(
+            "PATCH",
+            f"{self.api_url}/repos/{full_name}/pulls/{pull_number}",
+            idempotent=True,
             json={"state": "closed"},
         )
         response.raise_for_status()
@@ -166,19 +662,165 @@ class ReadWriteGitHub(GitHub):
     def merge_merge_request(self, full_name: str, pull_number: int):
         # https://docs.github.com/en/rest/reference/pulls#merge-a-pull-request
         logging.info("Merging PR %s %d", full_name, pull_number)
-        response = requests.put(
-            f"https://api.github.com/repos/{full_name}/pulls/{pull_number}/merge",
-            auth=self.auth,
-            headers={"Accept": "application/vnd.github.v3+json"},
+        response = self._request(
+            "PUT",
+            f"{self.api_url}/repos/{full_name}/pulls/{pull_number}/merge",
         )
+        if response.status_code in (405, 409, 422):
+            # a retry fails if an earlier attempt merged the PR but its response was lost
+            if self.get_merge_request(full_name, pull_number).get("merged"):
+                logging.info("PR %s %d is already merged", full_name, pull_number)
+                return
         response.raise_for_status()
 
     def create_issue_comment(self, full_name: str, issue_number: int, body: str):
         # https://docs.github.com/en/rest/reference/issues#create-an-issue-comment
-        response = requests.post(
-            f"https://api.github.com/repos/{full_name}/issues/{issue_number}/comments",
-            auth=self.auth,
-            headers={"Accept": "application/vnd.github.v3+json"},
+        response = self._request(
+            "POST",
+            f"{self.api_url}/repos/{full_name}/issues/{issue_number}/comments",
             json={"body": body},
         )
         response.raise_for_status()
+
+    def create_tree(self, full_name: str, base_tree: str, entries: List[dict]) -> str:
+        """
+        Creates a tree that changes the given entries of the base tree.
+        Entries with a `content` create their blob as well.
+        """
+        # https://docs.github.com/en/rest/reference/git#create-a-tree
+        # git objects are content addressed, so sending it again is harmless
+        response = self._request(
+            "POST",
+            f"{self.api_url}/repos/{full_name}/git/trees",
+            idempotent=True,
+            json={"base_tree": base_tree, "tree": entries},
+        )
+        response.raise_for_status()
+        return response.json()["sha"]
+
+    def create_commit(
+        self, full_name: str, message: str, tree: str, parents: List[str]
+    ) -> str:
+        # https://docs.github.com/en/rest/reference/git#create-a-commit
+        # a commit that was created twice is not referenced by any branch
+        response = self._request(
+            "POST",
+            f"{self.api_url}/repos/{full_name}/git/commits",
+            idempotent=True,
+            json={
+                "message": message,
+                "tree": tree,
+                "parents": parents,
+                "author": {
+                    "name": instarepo.git.AUTHOR_NAME,
+                    "email": instarepo.git.AUTHOR_EMAIL,
+                },
+            },
+        )
+        response.raise_for_status()
+        return response.json()["sha"]
+
+    def create_ref(self, full_name: str, branch: str, sha: str):
+        # https://docs.github.com/en/rest/reference/git#create-a-reference
+        # sent again after transient errors, like the other Git Data API calls
+        try:
+            response = self._request(
+                "POST",
+                f"{self.api_url}/repos/{full_name}/git/refs",
+                idempotent=True,
+                json={"ref": f"refs/heads/{branch}", "sha": sha},
+            )
+        except instarepo.retry.RETRYABLE_EXCEPTIONS:
+            if self.get_branch_sha(full_name, branch) == sha:
+                logging.info("Branch %s in %s is already created", branch, full_name)
+                return
+            raise
+        if response.status_code == 422 or instarepo.retry.is_retryable_status(
+            response.status_code
+        ):
+            # "Reference already exists", e.g. because an earlier attempt created it
+            if self.get_branch_sha(full_name, branch) == sha:
+                logging.info("Branch %s in %s is already created", branch, full_name)
+                return
+        response.raise_for_status()
+
+    def update_ref(self, full_name: str, branch: str, sha: str, force: bool = False):
+        # https://docs.github.com/en/rest/reference/git#update-a-reference
+        response = self._request(
+            "PATCH",
+            f"{self.api_url}/repos/{full_name}/git/refs/heads/{urllib.parse.quote(branch)}",
+            idempotent=True,
+            json={"sha": sha, "force": force},
+        )
+        response.raise_for_status()
+
+    def delete_ref(self, full_name: str, branch: str):
+        # https://docs.github.com/en/rest/reference/git#delete-a-reference
+        logging.info("Deleting branch %s in %s", branch, full_name)
+        response = self._request(
+            "DELETE",
+            f"{self.api_url}/repos/{full_name}/git/refs/heads/{urllib.parse.quote(branch)}",
+        )
+        if response.status_code in (404, 422):
+            # "Reference does not exist", e.g. because an earlier attempt deleted it
+            if self.get_branch_sha(full_name, branch) is None:
+                logging.info("Branch %s in %s is already deleted", branch, full_name)
+                return
+        response.raise_for_status()
+
+
+def _page_number(url: Optional[str]) -> Optional[int]:
+    if not url:
+        return None
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+    pages = query.get("page")
+    return int(pages[0]) if pages else None
+
+
+def build_github(
+    args, read_write: bool = False, head_branch: Optional[str] = None
+) -> GitHub:
+    """
+    Creates a GitHub client configured by the given CLI arguments.
+
+    :param args: The parsed CLI arguments
+    :param read_write: If true, a client that is able to modify repositories is created
+    :param head_branch: The branch of the pull requests that the caller is interested in.
+    The GraphQL client fetches them together with the repositories.
+    """
+    auth = build_requests_auth(args)
+    pool_size = instarepo.http_session.DEFAULT_POOL_SIZE
+    if "http_pool_size" in args:
+        pool_size = args.http_pool_size
+    cache = None
+    if "http_cache_dir" in args and args.http_cache_dir:
+        cache = instarepo.http_cache.HttpCache(
+            args.http_cache_dir, args.http_cache_max_size * 1024 * 1024
+        )
+    api_url = API_URL
+    if "api_url" in args and args.api_url:
+        api_url = args.api_url
+    retry_policy = None
+    if "http_retries" in args:
+        retry_policy = instarepo.retry.RetryPolicy(max_retries=args.http_retries)
+    if "graphql" in args and args.graphql:
+        # pylint: disable=import-outside-toplevel,cyclic-import
+        from .github_graphql import GraphQLGitHub, ReadWriteGraphQLGitHub
+
+        github_class = ReadWriteGraphQLGitHub if read_write else GraphQLGitHub
+        return github_class(
+            auth=auth,
+            pool_size=pool_size,
+            cache=cache,
+            api_url=api_url,
+            retry_policy=retry_policy,
+            head_branch=head_branch,
+        )
+    github_class = ReadWriteGitHub if read_write else GitHub
+    return github_class(
+        auth=auth,
+        pool_size=pool_size,
+        cache=cache,
+        api_url=api_url,
+        retry_policy=retry_policy,
+    )
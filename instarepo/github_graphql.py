@@ -0,0 +1,304 @@
+"""
+A GitHub client that uses the GraphQL API for bulk reads.
+
+One GraphQL query returns a page of repositories together with their open
+pull requests of a given branch, the mergeable state of those pull requests
+and the check runs of their head commit. The per-repo REST calls of the
+`GitHub` client are then served from memory.
+
+See https://docs.github.com/en/graphql
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from instarepo.github import GitHub, ReadWriteGitHub, Repo
+
+DEFAULT_PAGE_SIZE = 50
+
+SORT_FIELDS = {
+    "full_name": "NAME",
+    "created": "CREATED_AT",
+    "updated": "UPDATED_AT",
+    "pushed": "PUSHED_AT",
+}
+
+REPOSITORIES_QUERY = """
+query($pageSize: Int!, $cursor: String, $field: RepositoryOrderField!, $direction: OrderDirection!, $branch: String!, $withPullRequests: Boolean!) {
+  viewer {
+    repositories(first: $pageSize, after: $cursor, ownerAffiliations: [OWNER], orderBy: {field: $field, direction: $direction}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        nameWithOwner
+        description
+        url
+        sshUrl
+        isArchived
+        isPrivate
+        isFork
+        createdAt
+        pushedAt
+        updatedAt
+        primaryLanguage { name }
+        repositoryTopics(first: 20) { nodes { topic { name } } }
+        diskUsage
+        defaultBranchRef { name }
+        pullRequests(headRefName: $branch, states: [OPEN], first: 5) @include(if: $withPullRequests) {
+          nodes {
+            number
+            url
+            mergeable
+            mergeStateStatus
+            baseRefName
+            headRefName
+            headRefOid
+            headRepositoryOwner { login }
+            commits(last: 1) {
+              nodes {
+                commit {
+                  statusCheckRollup {
+                    contexts(first: 100) {
+                      totalCount
+                      nodes {
+                        __typename
+                        ... on CheckRun { name status conclusion }
+                      }
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class GraphQLGitHub(GitHub):
+    """
+    A read-only GitHub client that fetches repositories, their open pull
+    requests and the check runs of those pull requests in bulk with GraphQL.
+
+    Reads that were not prefetched fall back to the REST API.
+    """
+
+    def __init__(
+        self,
+        *args,
+        head_branch: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        **kwargs,
+    ):
+        """
+        Creates an instance of this class.
+
+        :param head_branch: If given, open pull requests of this branch are fetched together with the repositories
+        :param page_size: The number of repositories to fetch per query
+        """
+        super().__init__(*args, **kwargs)
+        self.head_branch = head_branch
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._pull_requests: Dict[str, List[dict]] = {}
+        self._check_runs: Dict[Tuple[str, str], dict] = {}
+
+    def graphql(self, query: str, variables: dict):
+        """
+        Runs a GraphQL query and returns its data.
+        """
+        # queries are sent with POST but they do not change anything
+        response = self._request(
+            "POST",
+            f"{self.api_url}/graphql",
+            mutating=False,
+            json={"query": query, "variables": variables},
+        )
+        response.raise_for_status()
+        result = response.json()
+        if result.get("errors"):
+            raise ValueError(f"GraphQL query failed: {result['errors']}")
+        return result["data"]
+
+    def get_all_repos(
+        self, sort: str, direction: str, stop: Optional[Callable[[Repo], bool]] = None
+    ):
+        variables = {
+            "pageSize": self.page_size,
+            "cursor": None,
+            "field": SORT_FIELDS.get(sort, "NAME"),
+            "direction": direction.upper() if direction else "ASC",
+            "branch": self.head_branch or "",
+            "withPullRequests": bool(self.head_branch),
+        }
+        has_more = True
+        while has_more:
+            data = self.graphql(REPOSITORIES_QUERY, variables)
+            repositories = data["viewer"]["repositories"]
+            for node in repositories["nodes"]:
+                if self.head_branch:
+                    self._remember_pull_requests(node)
+                repo = Repo(repo_json_from_node(node))
+                if stop and stop(repo):
+                    return
+                yield repo
+            has_more = repositories["pageInfo"]["hasNextPage"]
+            variables["cursor"] = repositories["pageInfo"]["endCursor"]
+
+    def _remember_pull_requests(self, node):
+        full_name = node["nameWithOwner"]
+        pull_requests = []
+        with self._lock:
+            for pr_node in node["pullRequests"]["nodes"]:
+                pull_request = pull_request_json_from_node(pr_node)
+                pull_requests.append(pull_request)
+                check_runs = check_runs_json_from_node(pr_node)
+                if check_runs is not None:
+                    self._check_runs[(full_name, pull_request["head"]["sha"])] = (
+                        check_runs
+                    )
+            self._pull_requests[full_name] = pull_requests
+
+    def prefetches_merge_requests(self, head_branch: str) -> bool:
+        return bool(self.head_branch) and self.head_branch == head_branch
+
+    def list_merge_requests(self, full_name: str, head: str, base: str):
+        owner, _, branch = head.rpartition(":")
+        with self._lock:
+            pull_requests = self._pull_requests.get(full_name)
+        if pull_requests is None or branch != self.head_branch:
+            return super().list_merge_requests(full_name, head, base)
+        return [
+            pull_request
+            for pull_request in pull_requests
+            if pull_request["base"]["ref"] == base
+            # logins are case insensitive
+            and (
+                not owner
+                or pull_request["head"]["user"]["login"].lower() == owner.lower()
+            )
+        ]
+
+    def get_merge_request(self, full_name: str, pull_number: int):
+        with self._lock:
+            pull_requests = self._pull_requests.get(full_name, [])
+        for pull_request in pull_requests:
+            # GitHub computes the mergeable state lazily, ask again if it was not known yet
+            if (
+                pull_request["number"] == pull_number
+                and pull_request["mergeable"] is not None
+            ):
+                return pull_request
+        return super().get_merge_request(full_name, pull_number)
+
+    def list_check_runs(self, full_name: str, sha: str):
+        with self._lock:
+            check_runs = self._check_runs.get((full_name, sha))
+        if check_runs is None:
+            return super().list_check_runs(full_name, sha)
+        return check_runs
+
+    def create_merge_request(
+        self, full_name: str, head: str, base: str, title: str, body: str
+    ) -> str:
+        self._forget(full_name)
+        return super().create_merge_request(full_name, head, base, title, body)
+
+    def close_merge_request(self, full_name: str, pull_number: int):
+        self._forget(full_name)
+        super().close_merge_request(full_name, pull_number)
+
+    def merge_merge_request(self, full_name: str, pull_number: int):
+        self._forget(full_name)
+        super().merge_merge_request(full_name, pull_number)
+
+    def _forget(self, full_name: str):
+        logging.debug("Forgetting prefetched pull requests of %s", full_name)
+        with self._lock:
+            self._pull_requests.pop(full_name, None)
+
+
+class ReadWriteGraphQLGitHub(GraphQLGitHub, ReadWriteGitHub):
+    """
+    A read-write GitHub client that uses GraphQL for bulk reads
+    and the REST API for changes.
+    """
+
+
+def repo_json_from_node(node) -> dict:
+    """
+    Converts a GraphQL repository node to the shape of the REST API.
+    """
+    return {
+        "name": node["name"],
+        "archived": node["isArchived"],
+        "clone_url": node["url"] + ".git",
+        "html_url": node["url"],
+        "ssh_url": node["sshUrl"],
+        "default_branch": (node.get("defaultBranchRef") or {}).get("name", ""),
+        "full_name": node["nameWithOwner"],
+        "description": node["description"],
+        "private": node["isPrivate"],
+        "fork": node["isFork"],
+        "created_at": node["createdAt"],
+        "pushed_at": node["pushedAt"] or node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        "topics": [
+            topic_node["topic"]["name"]
+            for topic_node in (node.get("repositoryTopics") or {}).get("nodes", [])
+        ],
+        "size": node.get("diskUsage") or 0,
+    }
+
+
+def pull_request_json_from_node(node) -> dict:
+    """
+    Converts a GraphQL pull request node to the shape of the REST API.
+    """
+    mergeable = {"MERGEABLE": True, "CONFLICTING": False}.get(node["mergeable"])
+    head_owner = (node.get("headRepositoryOwner") or {}).get("login", "")
+    return {
+        "number": node["number"],
+        "html_url": node["url"],
+        "mergeable": mergeable,
+        "mergeable_state": node["mergeStateStatus"].lower(),
+        "base": {"ref": node["baseRefName"]},
+        "head": {
+            "ref": node["headRefName"],
+            "sha": node["headRefOid"],
+            "label": f"{head_owner}:{node['headRefName']}",
+            "user": {"login": head_owner},
+        },
+    }
+
+
+def check_runs_json_from_node(node) -> Optional[dict]:
+    """
+    Converts the status check rollup of the head commit of a GraphQL
+    pull request node to the shape of the REST check runs API.
+    Returns None if not all check runs were fetched.
+    """
+    commits = node["commits"]["nodes"]
+    if not commits:
+        return None
+    rollup = commits[0]["commit"]["statusCheckRollup"]
+    if not rollup:
+        return {"total_count": 0, "check_runs": []}
+    contexts = rollup["contexts"]
+    check_runs = [
+        {
+            "name": context["name"],
+            "status": context["status"].lower(),
+            "conclusion": (context["conclusion"] or "").lower() or None,
+        }
+        for context in contexts["nodes"]
+        if context["__typename"] == "CheckRun"
+    ]
+    if len(contexts["nodes"]) < contexts["totalCount"]:
+        return None
+    return {"total_count": len(check_runs), "check_runs": check_runs}
@@ -0,0 +1,143 @@
+"""
+Unit tests for the github_graphql module.
+"""
+
+import json
+
+from pytest_mock import MockerFixture
+
+from .github_graphql import GraphQLGitHub
+from .rate_limit_test import fake_response
+
+
+def _repo_node(name: str, pull_requests):
+    return {
+        "name": name,
+        "nameWithOwner": "jdoe/" + name,
+        "description": "A repo",
+        "url": "https://github.com/jdoe/" + name,
+        "sshUrl": f"git@github.com:jdoe/{name}.git",
+        "isArchived": False,
+        "isPrivate": False,
+        "isFork": False,
+        "createdAt": "2021-11-04T21:32:00Z",
+        "pushedAt": "2021-11-05T21:32:00Z",
+        "updatedAt": "2021-11-06T21:32:00Z",
+        "primaryLanguage": {"name": "Python"},
+        "defaultBranchRef": {"name": "main"},
+        "pullRequests": {"nodes": pull_requests},
+    }
+
+
+def _pull_request_node(number: int, check_runs):
+    return {
+        "number": number,
+        "url": f"https://github.com/jdoe/foo/pull/{number}",
+        "mergeable": "MERGEABLE",
+        "mergeStateStatus": "CLEAN",
+        "baseRefName": "main",
+        "headRefName": "instarepo_branch",
+        "headRefOid": "abc123",
+        "headRepositoryOwner": {"login": "jdoe"},
+        "commits": {
+            "nodes": [
+                {
+                    "commit": {
+                        "statusCheckRollup": {
+                            "contexts": {
+                                "totalCount": len(check_runs),
+                                "nodes": check_runs,
+                            }
+                        }
+                    }
+                }
+            ]
+        },
+    }
+
+
+def _graphql_response(nodes, has_next_page=False):
+    return fake_response(
+        200,
+        text=json.dumps(
+            {
+                "data": {
+                    "viewer": {
+                        "repositories": {
+                            "pageInfo": {
+                                "hasNextPage": has_next_page,
+                                "endCursor": "cursor1",
+                            },
+                            "nodes": nodes,
+                        }
+                    }
+                }
+            }
+        ),
+    )
+
+
+def test_prefetched_pull_requests_and_check_runs(mocker: MockerFixture):
+    # arrange
+    check_run = {
+        "__typename": "CheckRun",
+        "name": "build",
+        "status": "COMPLETED",
+        "conclusion": "SUCCESS",
+    }
+    session = mocker.Mock()
+    session.request.side_effect = [
+        _graphql_response(
+            [_repo_node("foo", [_pull_request_node(7, [check_run])])],
+            has_next_page=True,
+        ),
+        _graphql_response([_repo_node("bar", [])]),
+    ]
+    github = GraphQLGitHub(auth=None, session=session, head_branch="instarepo_branch")
+
+    # act
+    repos = list(github.get_all_repos("pushed", "desc"))
+    merge_requests = github.list_merge_requests(
+        "jdoe/foo", "jdoe:instarepo_branch", "main"
+    )
+    details = github.get_merge_request("jdoe/foo", 7)
+    check_runs = github.list_check_runs("jdoe/foo", "abc123")
+
+    # assert
+    assert [repo.full_name for repo in repos] == ["jdoe/foo", "jdoe/bar"]
+    assert repos[0].default_branch == "main"
+    assert repos[0].language == "Python"
+    assert session.request.call_count == 2
+    variables = session.request.call_args_list[1].kwargs["json"]["variables"]
+    assert variables["cursor"] == "cursor1"
+    assert variables["field"] == "PUSHED_AT"
+    assert variables["direction"] == "DESC"
+    assert [mr["number"] for mr in merge_requests] == [7]
+    assert details["mergeable"] is True
+    assert details["mergeable_state"] == "clean"
+    assert check_runs == {
+        "total_count": 1,
+        "check_runs": [
+            {"name": "build", "status": "completed", "conclusion": "success"}
+        ],
+    }
+    assert github.list_merge_requests("jdoe/bar", "jdoe:instarepo_branch", "main") == []
+    # the owner of the head repository, regardless of case
+    assert [
+        mr["number"]
+        for mr in github.list_merge_requests(
+            "jdoe/foo", "JDoe:instarepo_branch", "main"
+        )
+    ] == [7]
+    assert not github.list_merge_requests("jdoe/foo", "acme:instarepo_branch", "main")
+
+
+def test_falls_back_to_rest_for_unknown_repos(mocker: MockerFixture):
+    session = mocker.Mock()
+    session.request.return_value = fake_response(200, text="[]")
+    github = GraphQLGitHub(auth=None, session=session, head_branch="instarepo_branch")
+    assert github.list_merge_requests("jdoe/foo", "jdoe:instarepo_branch", "main") == []
+    assert session.request.call_args.args == (
+        "GET",
+        "https://api.github.com/repos/jdoe/foo/pulls",
+    )
@@ -0,0 +1,366 @@
+"""
+Unit tests for the github module.
+"""
+
+import datetime
+import json
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from .github import GitHub, ReadWriteGitHub, Repo
+from .rate_limit import RateLimiter
+from .retry import RetryPolicy
+from .rate_limit_test import FakeClock, fake_response
+
+
+def test_request_is_sent_again_after_rate_limit(mocker: MockerFixture):
+    # arrange
+    clock = FakeClock()
+    session = mocker.Mock()
+    session.request.side_effect = [
+        fake_response(429, headers={"Retry-After": "5"}),
+        fake_response(200, text="{}"),
+    ]
+    github = GitHub(
+        auth=None,
+        session=session,
+        rate_limiter=RateLimiter(clock=clock.time, sleep=clock.sleep),
+    )
+
+    # act
+    result = github.get_json("https://api.github.com/repos/foo/bar")
+
+    # assert
+    assert result == {}
+    assert session.request.call_count == 2
+    assert clock.sleeps == [5]
+
+
+def _repo_json(name: str):
+    return {
+        "name": name,
+        "archived": False,
+        "clone_url": "",
+        "html_url": "",
+        "ssh_url": "",
+        "default_branch": "main",
+        "full_name": "jdoe/" + name,
+        "description": "",
+        "private": False,
+        "fork": False,
+        "created_at": "2021-11-04T21:32:00Z",
+        "pushed_at": "2021-11-04T21:32:00Z",
+        "updated_at": "2021-11-04T21:32:00Z",
+        "language": "Python",
+    }
+
+
+def _page_response(names, links: str = ""):
+    headers = {"Link": links} if links else {}
+    return fake_response(
+        200, headers=headers, text=json.dumps([_repo_json(name) for name in names])
+    )
+
+
+def test_get_all_repos_prefetches_remaining_pages(mocker: MockerFixture):
+    # arrange
+    url = "https://api.github.com/user/repos"
+    pages = {
+        1: _page_response(
+            ["a", "b"],
+            f'<{url}?page=2>; rel="next", <{url}?page=3>; rel="last"',
+        ),
+        2: _page_response(["c", "d"]),
+        3: _page_response(["e"]),
+    }
+    session = mocker.Mock()
+    session.request.side_effect = lambda method, url, params, **kwargs: pages[
+        params["page"]
+    ]
+    github = GitHub(auth=None, session=session)
+
+    # act
+    names = [repo.name for repo in github.get_all_repos("full_name", "asc")]
+
+    # assert
+    assert names == ["a", "b", "c", "d", "e"]
+    assert session.request.call_count == 3
+    for call in session.request.call_args_list:
+        assert call.kwargs["params"]["per_page"] == 100
+
+
+def test_workers_of_the_async_client_fetch_pages_one_by_one(mocker: MockerFixture):
+    # arrange
+    url = "https://api.github.com/user/repos"
+    pages = {
+        1: _page_response(["a"], f'<{url}?page=2>; rel="last"'),
+        2: _page_response(["b"]),
+    }
+    session = mocker.Mock()
+    session.request.side_effect = lambda method, url, params, **kwargs: pages[
+        params["page"]
+    ]
+    # a single worker would wait for itself if it fetched the pages concurrently
+    github = GitHub(auth=None, session=session, concurrency=1)
+
+    # act
+    try:
+        names = github.async_github.run(
+            github.async_github.call(
+                lambda: [repo.name for repo in github.get_all_repos("full_name", "asc")]
+            )
+        )
+    finally:
+        github.async_github.close()
+
+    # assert
+    assert names == ["a", "b"]
+
+
+def test_get_all_repos_follows_next_links(mocker: MockerFixture):
+    # arrange
+    url = "https://api.github.com/user/repos"
+    session = mocker.Mock()
+    session.request.side_effect = [
+        _page_response(["a"], f'<{url}?page=2&per_page=100>; rel="next"'),
+        _page_response(["b"]),
+    ]
+    github = GitHub(auth=None, session=session)
+
+    # act
+    names = [repo.name for repo in github.get_all_repos("full_name", "asc")]
+
+    # assert
+    assert names == ["a", "b"]
+    assert session.request.call_args_list[1].args[1] == f"{url}?page=2&per_page=100"
+
+
+def test_repo_parses_timestamps_lazily():
+    repo = Repo(_repo_json("foo"))
+    assert repo._pushed_at == "2021-11-04T21:32:00Z"  # pylint: disable=protected-access
+    assert repo.pushed_at == datetime.datetime(
+        2021, 11, 4, 21, 32, tzinfo=datetime.timezone.utc
+    )
+    assert repo.pushed_at is repo.pushed_at
+    assert not hasattr(repo, "__dict__")
+
+
+def test_transient_errors_are_retried_with_backoff(mocker: MockerFixture):
+    # arrange
+    sleeps = []
+    session = mocker.Mock()
+    session.request.side_effect = [
+        fake_response(502),
+        requests.exceptions.ConnectionError("reset"),
+        fake_response(200, text="{}"),
+    ]
+    github = GitHub(
+        auth=None,
+        session=session,
+        retry_policy=RetryPolicy(rand=lambda: 0.5, sleep=sleeps.append),
+    )
+
+    # act
+    result = github.get_json("https://api.github.com/repos/foo/bar")
+
+    # assert
+    assert result == {}
+    assert session.request.call_count == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_create_merge_request_is_reconciled_by_listing(mocker: MockerFixture):
+    # arrange
+    session = mocker.Mock()
+    session.request.side_effect = [
+        requests.exceptions.ReadTimeout("timeout"),
+        fake_response(
+            200, text=json.dumps([{"html_url": "https://github.com/foo/bar/pull/1"}])
+        ),
+    ]
+    github = ReadWriteGitHub(
+        auth=None,
+        session=session,
+        rate_limiter=RateLimiter(mutation_interval=0),
+        retry_policy=RetryPolicy(sleep=lambda _: None),
+    )
+
+    # act
+    result = github.create_merge_request("foo/bar", "foo:branch", "main", "t", "b")
+
+    # assert
+    assert result == "https://github.com/foo/bar/pull/1"
+    methods = [call.args[0] for call in session.request.call_args_list]
+    assert methods == ["POST", "GET"]
+
+
+def test_create_merge_request_is_sent_again_if_not_found(mocker: MockerFixture):
+    session = mocker.Mock()
+    session.request.side_effect = [
+        fake_response(502),
+        fake_response(200, text="[]"),
+        fake_response(201, text='{"html_url": "https://github.com/foo/bar/pull/2"}'),
+    ]
+    github = ReadWriteGitHub(
+        auth=None,
+        session=session,
+        rate_limiter=RateLimiter(mutation_interval=0),
+        retry_policy=RetryPolicy(sleep=lambda _: None),
+    )
+    result = github.create_merge_request("foo/bar", "foo:branch", "main", "t", "b")
+    assert result == "https://github.com/foo/bar/pull/2"
+    methods = [call.args[0] for call in session.request.call_args_list]
+    assert methods == ["POST", "GET", "POST"]
+
+
+def _read_write_github(session) -> ReadWriteGitHub:
+    return ReadWriteGitHub(
+        auth=None,
+        session=session,
+        rate_limiter=RateLimiter(mutation_interval=0),
+        retry_policy=RetryPolicy(sleep=lambda _: None),
+    )
+
+
+def test_merge_merge_request_succeeds_if_a_lost_attempt_merged_it(
+    mocker: MockerFixture,
+):
+    session = mocker.Mock()
+    session.request.side_effect = [
+        fake_response(502),
+        fake_response(405, text='{"message": "Pull Request is not mergeable"}'),
+        fake_response(200, text='{"number": 2, "merged": true}'),
+    ]
+    github = _read_write_github(session)
+    github.merge_merge_request("foo/bar", 2)
+    methods = [call.args[0] for call in session.request.call_args_list]
+    assert methods == ["PUT", "PUT", "GET"]
+
+
+def test_merge_merge_request_fails_if_not_merged(mocker: MockerFixture):
+    session = mocker.Mock()
+    session.request.side_effect = [
+        fake_response(405, text='{"message": "Pull Request is not mergeable"}'),
+        fake_response(200, text='{"number": 2, "merged": false}'),
+    ]
+    github = _read_write_github(session)
+    with pytest.raises(requests.HTTPError):
+        github.merge_merge_request("foo/bar", 2)
+
+
+def test_delete_ref_succeeds_if_a_lost_attempt_deleted_it(mocker: MockerFixture):
+    session = mocker.Mock()
+    session.request.side_effect = [
+        requests.exceptions.Timeout(),
+        fake_response(422, text='{"message": "Reference does not exist"}'),
+        fake_response(404, text='{"message": "Not Found"}'),
+    ]
+    github = _read_write_github(session)
+    github.delete_ref("foo/bar", "instarepo_branch")
+    methods = [call.args[0] for call in session.request.call_args_list]
+    assert methods == ["DELETE", "DELETE", "GET"]
+
+
+def test_create_ref_succeeds_if_a_lost_attempt_created_it(mocker: MockerFixture):
+    session = mocker.Mock()
+    session.request.side_effect = [
+        fake_response(502),
+        fake_response(422, text='{"message": "Reference already exists"}'),
+        fake_response(200, text='{"object": {"sha": "abc123"}}'),
+    ]
+    github = _read_write_github(session)
+    github.create_ref("foo/bar", "instarepo_branch", "abc123")
+    methods = [call.args[0] for call in session.request.call_args_list]
+    assert methods == ["POST", "POST", "GET"]
+
+
+def test_create_ref_fails_if_the_branch_points_elsewhere(mocker: MockerFixture):
+    session = mocker.Mock()
+    session.request.side_effect = [
+        fake_response(422, text='{"message": "Reference already exists"}'),
+        fake_response(200, text='{"object": {"sha": "def456"}}'),
+    ]
+    github = _read_write_github(session)
+    with pytest.raises(requests.HTTPError):
+        github.create_ref("foo/bar", "instarepo_branch", "abc123")
+
+
+def test_search_repos_gives_up_above_the_results_limit(mocker: MockerFixture):
+    # arrange
+    session = mocker.Mock()
+    session.request.return_value = fake_response(
+        200,
+        text=json.dumps(
+            {"total_count": 1001, "incomplete_results": False, "items": []}
+        ),
+    )
+    github = GitHub(auth=None, session=session)
+
+    # act
+    result = github.search_repos("user:jdoe language:Python")
+
+    # assert
+    assert result is None
+    assert session.request.call_count == 1
+
+
+def test_search_repos_gives_up_on_incomplete_results(mocker: MockerFixture):
+    # arrange
+    url = "https://api.github.com/search/repositories"
+    session = mocker.Mock()
+    session.request.side_effect = [
+        fake_response(
+            200,
+            text=json.dumps(
+                {"total_count": 150, "incomplete_results": False, "items": []}
+            ),
+            headers={"Link": f'<{url}?q=user%3Ajdoe&page=2>; rel="next"'},
+        ),
+        fake_response(
+            200,
+            text=json.dumps(
+                {"total_count": 150, "incomplete_results": True, "items": []}
+            ),
+        ),
+    ]
+    github = GitHub(auth=None, session=session)
+
+    # act
+    result = github.search_repos("user:jdoe language:Python")
+
+    # assert
+    assert result is None
+    assert session.request.call_count == 2
+
+
+def test_get_all_repos_stops_paginating(mocker: MockerFixture):
+    # arrange
+    url = "https://api.github.com/user/repos"
+    session = mocker.Mock()
+    session.request.side_effect = [
+        _page_response(["a", "b"], f'<{url}?page=2&per_page=100>; rel="next"'),
+        _page_response(["c"]),
+    ]
+    github = GitHub(auth=None, session=session)
+
+    # act
+    names = [
+        repo.name
+        for repo in github.get_all_repos(
+            "full_name", "asc", stop=lambda repo: repo.name == "b"
+        )
+    ]
+
+    # assert
+    assert names == ["a"]
+    assert session.request.call_count == 1
+
+
+def test_repo_to_json_round_trip():
+    repo = Repo(_repo_json("a"))
+    assert repo.pushed_at  # parsed timestamps are formatted back
+    copy = Repo(repo.to_json())
+    assert copy.to_json() == repo.to_json()
+    assert copy.pushed_at == repo.pushed_at
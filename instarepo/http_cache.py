@@ -0,0 +1,224 @@
+"""
+A persistent cache of HTTP responses that is revalidated with conditional requests.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import os.path
+import tempfile
+import threading
+from typing import Optional
+
+import requests
+import requests.structures
+
+DEFAULT_MAX_SIZE = 50 * 1024 * 1024
+
+LOW_WATER_MARK = 0.8
+"""Eviction frees space down to this fraction of the maximum size, so that it runs rarely."""
+
+
+class CacheEntry:
+    """
+    A cached response, together with its validators.
+    """
+
+    def __init__(self, url: str, etag: str, last_modified: str, headers, body: str):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.headers = headers
+        self.body = body
+
+    def to_json(self):
+        return {
+            "url": self.url,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "headers": self.headers,
+            "body": self.body,
+        }
+
+    @staticmethod
+    def from_json(value) -> "CacheEntry":
+        return CacheEntry(
+            value["url"],
+            value["etag"],
+            value["last_modified"],
+            value["headers"],
+            value["body"],
+        )
+
+
+class HttpCache:
+    """
+    Stores GET responses on disk, keyed by URL (including the query string)
+    and the identity of the caller.
+
+    Entries are revalidated with `If-None-Match` / `If-Modified-Since`.
+    When the total size exceeds the limit, the least recently used entries
+    are evicted, down to `LOW_WATER_MARK` of the limit.
+
+    Entries are written to a temporary file that replaces the entry once
+    it is complete, so that a crash or a concurrent run never leaves
+    a truncated entry behind.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Creates an instance of this class.
+
+        :param directory: The directory where responses are stored. It is created if it does not exist.
+        :param max_size: The maximum total size of the cache, in bytes
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def key(self, request: requests.PreparedRequest) -> str:
+        """
+        Calculates the cache key of the given request.
+        The credentials are hashed as part of the key but are never stored.
+        """
+        digest = hashlib.sha256()
+        for part in [
+            request.method or "",
+            request.url or "",
+            request.headers.get("Accept", ""),
+            request.headers.get("Authorization", ""),
+        ]:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        filename = self._filename(key)
+        with self._lock:
+            try:
+                with open(filename, "r", encoding="utf-8") as file:
+                    entry = CacheEntry.from_json(json.load(file))
+                # mark as recently used
+                os.utime(filename)
+                return entry
+            except (OSError, ValueError, KeyError):
+                return None
+
+    def put(self, key: str, entry: CacheEntry):
+        filename = self._filename(key)
+        contents = json.dumps(entry.to_json())
+        with self._lock:
+            old_size = os.path.getsize(filename) if os.path.isfile(filename) else 0
+            # temporary files do not end with .json, so they are never served
+            fd, temp_filename = tempfile.mkstemp(
+                prefix=key + ".", suffix=".tmp", dir=self.directory
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as file:
+                    file.write(contents)
+                new_size = os.path.getsize(temp_filename)
+                os.replace(temp_filename, filename)
+            except BaseException:
+                os.remove(temp_filename)
+                raise
+            self._size += new_size - old_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """
+        Evicts the least recently used entries, down to the low-water mark.
+        Only this scans the directory, which also picks up the entries
+        that other runs added or removed in the meantime.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self._size = sum(size for _, size, _ in entries)
+        low_water = self.max_size * LOW_WATER_MARK
+        for filename, size, _ in entries:
+            if self._size <= low_water:
+                break
+            logging.debug("Evicting cached response %s", filename)
+            try:
+                os.remove(filename)
+                self._size -= size
+            except OSError:
+                pass
+
+    def _entries(self):
+        with os.scandir(self.directory) as iterator:
+            for entry in iterator:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def _filename(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+
+def prepare_conditional_request(
+    cache: HttpCache, request: requests.PreparedRequest
+) -> Optional[CacheEntry]:
+    """
+    Adds the validators of a cached response to the given request.
+    Returns the cached entry, if any.
+    """
+    if request.method != "GET":
+        return None
+    entry = cache.get(cache.key(request))
+    if entry:
+        if entry.etag:
+            request.headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            request.headers["If-Modified-Since"] = entry.last_modified
+    return entry
+
+
+def process_response(
+    cache: HttpCache,
+    request: requests.PreparedRequest,
+    response: requests.Response,
+    entry: Optional[CacheEntry],
+) -> requests.Response:
+    """
+    Serves the cached body on a 304 response, or stores a fresh response.
+    """
+    response.from_cache = False
+    if request.method != "GET":
+        return response
+    if response.status_code == 304 and entry:
+        headers = requests.structures.CaseInsensitiveDict(entry.headers)
+        headers.update(response.headers)
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = headers
+        body = entry.body.encode("utf-8")
+        response._content = body  # pylint: disable=protected-access
+        response.encoding = "utf-8"
+        response.from_cache = True
+        return response
+    if response.status_code == 200:
+        etag = response.headers.get("ETag", "")
+        last_modified = response.headers.get("Last-Modified", "")
+        if etag or last_modified:
+            cache.put(
+                cache.key(request),
+                CacheEntry(
+                    request.url,
+                    etag,
+                    last_modified,
+                    _cacheable_headers(response.headers),
+                    response.text,
+                ),
+            )
+    return response
+
+
+def _cacheable_headers(headers) -> dict:
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() in ("content-type", "link", "etag", "last-modified")
+    }
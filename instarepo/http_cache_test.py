@@ -0,0 +1,118 @@
+"""
+Unit tests for the http_cache module.
+"""
+
+import http.server
+import json
+import os
+import threading
+
+import requests
+
+import instarepo.http_cache
+import instarepo.http_session
+
+
+class _ETagHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    full_responses = 0
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        _ETagHandler.full_responses += 1
+        body = b'[{"name": "foo"}]'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Link", '<http://localhost/?page=2>; rel="next"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def test_serves_cached_body_on_not_modified(tmp_path):
+    # arrange
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ETagHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    cache = instarepo.http_cache.HttpCache(str(tmp_path))
+    session = instarepo.http_session.create_session(
+        cache=cache, stats=instarepo.http_session.ConnectionStats()
+    )
+    url = f"http://127.0.0.1:{server.server_address[1]}/user/repos?page=1"
+    _ETagHandler.full_responses = 0
+
+    # act
+    try:
+        first = session.get(url)
+        second = session.get(url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # assert
+    assert _ETagHandler.full_responses == 1
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.status_code == 200
+    assert second.json() == [{"name": "foo"}]
+    assert second.links["next"]["url"] == "http://localhost/?page=2"
+
+
+def test_key_depends_on_auth_identity(tmp_path):
+    cache = instarepo.http_cache.HttpCache(str(tmp_path))
+    first = _prepared_request("http://localhost/user/repos", "Basic one")
+    second = _prepared_request("http://localhost/user/repos", "Basic two")
+    assert cache.key(first) != cache.key(second)
+    assert cache.key(first) == cache.key(first.copy())
+
+
+def test_evicts_least_recently_used(tmp_path):
+    entry = instarepo.http_cache.CacheEntry("url", "etag", "", {}, "x" * 50)
+    entry_size = len(json.dumps(entry.to_json()))
+    cache = instarepo.http_cache.HttpCache(
+        str(tmp_path), max_size=entry_size * 2 + entry_size // 2
+    )
+    cache.put("key0", entry)
+    os.utime(tmp_path / "key0.json", (1, 1))
+    cache.put("key1", entry)
+    os.utime(tmp_path / "key1.json", (2, 2))
+    cache.put("key2", entry)
+    assert not os.path.isfile(tmp_path / "key0.json")
+    assert cache.get("key1") is not None
+    assert cache.get("key2") is not None
+
+
+def test_eviction_frees_space_down_to_the_low_water_mark(tmp_path):
+    entry = instarepo.http_cache.CacheEntry("url", "etag", "", {}, "x" * 50)
+    entry_size = len(json.dumps(entry.to_json()))
+    cache = instarepo.http_cache.HttpCache(str(tmp_path), max_size=entry_size * 10)
+    for i in range(11):
+        cache.put(f"key{i}", entry)
+        os.utime(tmp_path / f"key{i}.json", (i, i))
+    # evicted to 80% of the limit, so the next puts fit without evicting
+    assert len(os.listdir(tmp_path)) == 8
+    assert not os.path.isfile(tmp_path / "key2.json")
+    assert os.path.isfile(tmp_path / "key3.json")
+
+
+def test_put_replaces_entries_atomically(tmp_path):
+    cache = instarepo.http_cache.HttpCache(str(tmp_path))
+    cache.put("key", instarepo.http_cache.CacheEntry("url", "v1", "", {}, "old"))
+    cache.put("key", instarepo.http_cache.CacheEntry("url", "v2", "", {}, "new"))
+    assert os.listdir(tmp_path) == ["key.json"]
+    assert cache.get("key").body == "new"
+
+
+def _prepared_request(url: str, authorization: str) -> requests.PreparedRequest:
+    return requests.Request(
+        "GET", url, headers={"Authorization": authorization}
+    ).prepare()
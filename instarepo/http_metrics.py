@@ -0,0 +1,216 @@
+"""
+Collects per-endpoint metrics of HTTP requests.
+"""
+
+import bisect
+import re
+import threading
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""The upper bounds (in seconds) of the latency histogram buckets."""
+
+# path segments whose next segment(s) identify a resource
+_NAMED_SEGMENTS = {
+    "orgs": ["{org}"],
+    "users": ["{user}"],
+    "commits": ["{sha}"],
+    "blobs": ["{sha}"],
+    "trees": ["{ref}"],
+    "heads": ["{branch}"],
+    "compare": ["{basehead}"],
+    "repos": ["{full_name}", None],
+}
+_NUMBER = re.compile(r"^\d+$")
+
+
+class EndpointMetrics:
+    """
+    The metrics of one endpoint (HTTP method and URL template).
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.status_codes: Dict[int, int] = {}
+        self.latency_buckets: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.response_bytes = 0
+        self.cache_hits = 0
+        self.rate_limit_remaining: Optional[int] = None
+
+    def observe_latency(self, elapsed: float):
+        self.total_latency += elapsed
+        self.max_latency = max(self.max_latency, elapsed)
+        self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "status_codes": dict(self.status_codes),
+            "latency": {
+                "total": self.total_latency,
+                "mean": self.total_latency / self.calls if self.calls else 0.0,
+                "max": self.max_latency,
+                "buckets": {
+                    _bucket_label(index): count
+                    for index, count in enumerate(self.latency_buckets)
+                },
+            },
+            "response_bytes": self.response_bytes,
+            "cache_hits": self.cache_hits,
+            "rate_limit_remaining": self.rate_limit_remaining,
+        }
+
+
+class HttpMetrics:
+    """
+    Counts requests, retries, status codes, latency, response bytes, cache hits and
+    rate limit headroom, grouped by HTTP method and endpoint template
+    (e.g. `GET repos/{full_name}/pulls`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[Tuple[str, str], EndpointMetrics] = {}
+
+    def record(
+        self,
+        method: str,
+        endpoint: str,
+        elapsed: float,
+        status_code: Optional[int] = None,
+        response_bytes: int = 0,
+        from_cache: bool = False,
+        rate_limit_remaining: Optional[int] = None,
+    ):
+        """
+        Records a finished request.
+
+        :param method: The HTTP method
+        :param endpoint: The endpoint template, see `endpoint_template`
+        :param elapsed: The number of seconds the request took
+        :param status_code: The status code of the response. None if the request failed without a response
+        :param response_bytes: The size of the response body
+        :param from_cache: Whether the body was served from the HTTP cache
+        :param rate_limit_remaining: The value of the `X-RateLimit-Remaining` header, if any
+        """
+        with self._lock:
+            metrics = self._endpoints.setdefault(
+                (method.upper(), endpoint), EndpointMetrics()
+            )
+            metrics.calls += 1
+            metrics.observe_latency(elapsed)
+            if status_code is None:
+                metrics.errors += 1
+            else:
+                metrics.status_codes[status_code] = (
+                    metrics.status_codes.get(status_code, 0) + 1
+                )
+            metrics.response_bytes += response_bytes
+            if from_cache:
+                metrics.cache_hits += 1
+            if rate_limit_remaining is not None:
+                metrics.rate_limit_remaining = rate_limit_remaining
+
+    def record_retry(self, method: str, endpoint: str):
+        """
+        Records that a failed request is about to be sent again.
+        """
+        with self._lock:
+            metrics = self._endpoints.setdefault(
+                (method.upper(), endpoint), EndpointMetrics()
+            )
+            metrics.retries += 1
+
+    def as_dict(self) -> Dict[str, dict]:
+        """
+        Gets the metrics as plain data, keyed by `METHOD endpoint`.
+        """
+        with self._lock:
+            return {
+                f"{method} {endpoint}": metrics.as_dict()
+                for (method, endpoint), metrics in sorted(self._endpoints.items())
+            }
+
+    def summary(self) -> str:
+        """
+        Formats the metrics as a table, slowest endpoints first.
+        """
+        rows = sorted(
+            self.as_dict().items(),
+            key=lambda item: item[1]["latency"]["total"],
+            reverse=True,
+        )
+        lines = [
+            f"{'endpoint':<50} {'calls':>6} {'errors':>6} {'retries':>7} {'mean ms':>8} {'max ms':>8} "
+            f"{'KB':>8} {'cached':>6} {'remaining':>9}  status codes"
+        ]
+        for name, metrics in rows:
+            latency = metrics["latency"]
+            remaining = metrics["rate_limit_remaining"]
+            status_codes = ", ".join(
+                f"{code}: {count}"
+                for code, count in sorted(metrics["status_codes"].items())
+            )
+            lines.append(
+                f"{name:<50} {metrics['calls']:>6} {metrics['errors']:>6} {metrics['retries']:>7} "
+                f"{latency['mean'] * 1000:>8.0f} {latency['max'] * 1000:>8.0f} "
+                f"{metrics['response_bytes'] / 1024:>8.1f} {metrics['cache_hits']:>6} "
+                f"{'' if remaining is None else remaining:>9}  {status_codes}"
+            )
+        return "\n".join(lines)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._endpoints)
+
+
+HTTP_METRICS = HttpMetrics()
+"""Run-wide HTTP metrics, shared by all sessions created by default."""
+
+
+def endpoint_template(url: str, base_url: Optional[str] = None) -> str:
+    """
+    Gets the template of the endpoint of the given URL, replacing
+    identifiers with placeholders, e.g.
+    https://api.github.com/repos/ngeor/instarepo/pulls/42 -> repos/{full_name}/pulls/{number}
+
+    :param url: The URL of the request
+    :param base_url: URLs under this base are templated relative to it. Other URLs keep their host.
+    """
+    if base_url and url.startswith(base_url.rstrip("/") + "/"):
+        path = url[len(base_url.rstrip("/")) :]
+        prefix = ""
+    else:
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path
+        prefix = parts.netloc
+    path = path.split("?", 1)[0]
+    segments = [segment for segment in path.split("/") if segment]
+    result = []
+    index = 0
+    while index < len(segments):
+        segment = segments[index]
+        result.append(_NUMBER.sub("{number}", segment))
+        index = index + 1
+        for placeholder in _NAMED_SEGMENTS.get(segment, []):
+            if index >= len(segments):
+                break
+            if placeholder:
+                result.append(placeholder)
+            index = index + 1
+    if prefix:
+        result.insert(0, prefix)
+    return "/".join(result)
+
+
+def _bucket_label(index: int) -> str:
+    if index < len(LATENCY_BUCKETS):
+        return f"<={LATENCY_BUCKETS[index]}"
+    return f">{LATENCY_BUCKETS[-1]}"
@@ -0,0 +1,80 @@
+"""
+Unit tests for the http_metrics module.
+"""
+
+import pytest
+
+from .fake_github import FakeGitHubServer
+from .github import GitHub
+from .http_metrics import HttpMetrics, endpoint_template
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        ("https://api.github.com/user/repos?page=2", "user/repos"),
+        ("https://api.github.com/orgs/acme/repos", "orgs/{org}/repos"),
+        (
+            "https://api.github.com/repos/ngeor/instarepo/pulls",
+            "repos/{full_name}/pulls",
+        ),
+        (
+            "https://api.github.com/repos/ngeor/instarepo/pulls/42/merge",
+            "repos/{full_name}/pulls/{number}/merge",
+        ),
+        (
+            "https://api.github.com/repos/ngeor/instarepo/commits/abc123/check-runs",
+            "repos/{full_name}/commits/{sha}/check-runs",
+        ),
+        (
+            "https://api.github.com/repos/ngeor/instarepo/git/refs/heads/instarepo_branch",
+            "repos/{full_name}/git/refs/heads/{branch}",
+        ),
+        (
+            "https://api.github.com/repos/ngeor/instarepo/compare/trunk...instarepo_branch",
+            "repos/{full_name}/compare/{basehead}",
+        ),
+        (
+            "https://search.maven.org/solrsearch/select?q=g:junit",
+            "search.maven.org/solrsearch/select",
+        ),
+    ],
+)
+def test_endpoint_template(url, expected):
+    assert endpoint_template(url, "https://api.github.com") == expected
+
+
+def test_record():
+    # arrange
+    metrics = HttpMetrics()
+
+    # act
+    metrics.record("get", "user/repos", 0.2, 200, 1024, rate_limit_remaining=10)
+    metrics.record("GET", "user/repos", 0.02, 200, 0, from_cache=True)
+    metrics.record("GET", "user/repos", 20.0)
+
+    # assert
+    result = metrics.as_dict()["GET user/repos"]
+    assert result["calls"] == 3
+    assert result["errors"] == 1
+    assert result["status_codes"] == {200: 2}
+    assert result["response_bytes"] == 1024
+    assert result["cache_hits"] == 1
+    assert result["rate_limit_remaining"] == 10
+    assert result["latency"]["buckets"]["<=0.05"] == 1
+    assert result["latency"]["buckets"]["<=0.25"] == 1
+    assert result["latency"]["buckets"][">10.0"] == 1
+    assert "GET user/repos" in metrics.summary()
+
+
+def test_github_requests_are_measured():
+    with FakeGitHubServer(repo_count=150, rate_limit=100) as server:
+        github = GitHub(auth=None, api_url=server.url)
+        github.session.get_adapter(server.url).metrics = HttpMetrics()
+        list(github.get_all_repos("full_name", "asc"))
+    result = github.http_metrics().as_dict()
+    assert list(result) == ["GET user/repos"]
+    assert result["GET user/repos"]["calls"] == 2
+    assert result["GET user/repos"]["status_codes"] == {200: 2}
+    assert result["GET user/repos"]["rate_limit_remaining"] == 98
+    assert result["GET user/repos"]["response_bytes"] > 0
@@ -0,0 +1,208 @@
+"""
+Shared HTTP sessions with pooled, keep-alive connections.
+"""
+
+import functools
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+import requests.adapters
+import urllib3
+
+import instarepo.http_cache
+import instarepo.http_metrics
+
+DEFAULT_POOL_SIZE = 10
+
+
+class ConnectionStats:
+    """
+    Counts HTTP requests and the connections that were opened to serve them.
+
+    Every request that did not need a new connection reused an existing
+    keep-alive connection from the pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def reused(self) -> int:
+        """
+        The number of requests that were served by an already open connection.
+        """
+        return max(self.requests - self.connections, 0)
+
+    def on_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def on_new_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def __str__(self):
+        return f"{self.requests} requests, {self.connections} connections opened, {self.reused} reused"
+
+
+CONNECTION_STATS = ConnectionStats()
+"""Run-wide connection statistics, shared by all sessions created by default."""
+
+
+class _CountingHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    def __init__(self, *args, stats: ConnectionStats, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats = stats
+
+    def _new_conn(self):
+        self._stats.on_new_connection()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    def __init__(self, *args, stats: ConnectionStats, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats = stats
+
+    def _new_conn(self):
+        self._stats.on_new_connection()
+        return super()._new_conn()
+
+
+class PooledHTTPAdapter(requests.adapters.HTTPAdapter):
+    """
+    A transport adapter that keeps connections alive in a pool
+    and counts how often they are reused.
+
+    If a cache is given, GET requests are revalidated against it
+    with conditional requests.
+
+    Every request is recorded in the HTTP metrics, grouped by its endpoint
+    template. URLs under `base_url` are templated relative to it.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        stats: Optional[ConnectionStats] = None,
+        cache: Optional[instarepo.http_cache.HttpCache] = None,
+        metrics: Optional[instarepo.http_metrics.HttpMetrics] = None,
+        base_url: Optional[str] = None,
+    ):
+        self.stats = stats or CONNECTION_STATS
+        self.cache = cache
+        self.metrics = metrics or instarepo.http_metrics.HTTP_METRICS
+        self.base_url = base_url
+        super().__init__(pool_connections=pool_size, pool_maxsize=pool_size)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": functools.partial(_CountingHTTPConnectionPool, stats=self.stats),
+            "https": functools.partial(_CountingHTTPSConnectionPool, stats=self.stats),
+        }
+
+    def send(self, request, *args, **kwargs):  # pylint: disable=arguments-differ
+        self.stats.on_request()
+        endpoint = instarepo.http_metrics.endpoint_template(request.url, self.base_url)
+        started = time.monotonic()
+        try:
+            response = self._send_cached(request, *args, **kwargs)
+        except Exception:
+            self.metrics.record(request.method, endpoint, time.monotonic() - started)
+            raise
+        size = 0 if kwargs.get("stream") else len(response.content or b"")
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        self.metrics.record(
+            request.method,
+            endpoint,
+            time.monotonic() - started,
+            status_code=response.status_code,
+            response_bytes=size,
+            from_cache=getattr(response, "from_cache", False),
+            rate_limit_remaining=(
+                int(remaining) if remaining and remaining.isdigit() else None
+            ),
+        )
+        return response
+
+    def _send_cached(self, request, *args, **kwargs):
+        if not self.cache:
+            return self.send_request(request, *args, **kwargs)
+        entry = instarepo.http_cache.prepare_conditional_request(self.cache, request)
+        response = self.send_request(request, *args, **kwargs)
+        return instarepo.http_cache.process_response(
+            self.cache, request, response, entry
+        )
+
+    def send_request(self, request, *args, **kwargs):
+        """
+        Exchanges the given request with the server.
+        Subclasses can override this to change the transport (e.g. replay recorded responses).
+        """
+        return super().send(request, *args, **kwargs)
+
+
+_adapter_factory: Optional[Callable[..., PooledHTTPAdapter]] = None
+
+
+def set_adapter_factory(factory: Optional[Callable[..., PooledHTTPAdapter]]):
+    """
+    Changes the transport adapter of the sessions that are created from now on.
+
+    The factory is called with the keyword arguments of `PooledHTTPAdapter`.
+    Passing None restores the default `PooledHTTPAdapter`.
+    """
+    global _adapter_factory, _shared_session  # pylint: disable=global-statement
+    _adapter_factory = factory
+    with _shared_session_lock:
+        _shared_session = None
+
+
+def create_session(
+    pool_size: int = DEFAULT_POOL_SIZE,
+    headers: Optional[dict] = None,
+    auth=None,
+    stats: Optional[ConnectionStats] = None,
+    cache: Optional[instarepo.http_cache.HttpCache] = None,
+    base_url: Optional[str] = None,
+) -> requests.Session:
+    """
+    Creates a long-lived session with a pool of keep-alive connections.
+
+    :param pool_size: The maximum number of connections kept open per host
+    :param headers: Default headers to send with every request
+    :param auth: Default authentication to use for every request
+    :param stats: Collects connection statistics. Defaults to the run-wide `CONNECTION_STATS`
+    :param cache: An optional cache for conditional GET requests
+    :param base_url: The base URL of the API, used to group the HTTP metrics by endpoint
+    """
+    session = requests.Session()
+    factory = _adapter_factory or PooledHTTPAdapter
+    adapter = factory(pool_size=pool_size, stats=stats, cache=cache, base_url=base_url)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    session.auth = auth
+    return session
+
+
+_shared_session: Optional[requests.Session] = None
+_shared_session_lock = threading.Lock()
+
+
+def shared_session() -> requests.Session:
+    """
+    Gets the unauthenticated session that is shared by all downloads
+    that do not target the GitHub API (e.g. Maven Central).
+    """
+    global _shared_session  # pylint: disable=global-statement
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
@@ -0,0 +1,61 @@
+"""
+Unit tests for the http_session module.
+"""
+
+import http.server
+import threading
+
+import instarepo.http_session
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def test_connection_is_reused():
+    # arrange
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stats = instarepo.http_session.ConnectionStats()
+    session = instarepo.http_session.create_session(stats=stats)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    # act
+    try:
+        for _ in range(3):
+            session.get(url).raise_for_status()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # assert
+    assert stats.requests == 3
+    assert stats.connections == 1
+    assert stats.reused == 2
+
+
+def test_create_session_default_headers_and_auth():
+    session = instarepo.http_session.create_session(
+        headers={"Accept": "application/json"}, auth=("user", "token")
+    )
+    assert session.headers["Accept"] == "application/json"
+    assert session.auth == ("user", "token")
+
+
+def test_shared_session_is_singleton():
+    assert (
+        instarepo.http_session.shared_session()
+        is instarepo.http_session.shared_session()
+    )
@@ -1,8 +1,15 @@
 """Main entrypoint of the program"""
 import argparse
+import json
 import logging
 
 import instarepo
+import instarepo.cassette
+import instarepo.github
+import instarepo.http_cache
+import instarepo.http_metrics
+import instarepo.http_session
+import instarepo.retry
 import instarepo.commands.analyze
 import instarepo.commands.clone
 import instarepo.commands.fix
@@ -18,8 +25,35 @@ def main():
         format="%(asctime)s %(levelname)s %(message)s",
         level=logging.DEBUG if args.verbose else logging.INFO,
     )
+    cassette = _install_cassette(args)
     cmd = create_command(args)
-    cmd.run()
+    try:
+        cmd.run()
+    finally:
+        if cassette and args.record:
+            cassette.save()
+    logging.debug("HTTP connections: %s", instarepo.http_session.CONNECTION_STATS)
+    _report_http_metrics(args)
+
+
+def _report_http_metrics(args):
+    metrics = instarepo.http_metrics.HTTP_METRICS
+    if not len(metrics):  # pylint: disable=use-implicit-booleaness-not-len
+        return
+    logging.info("HTTP requests:\n%s", metrics.summary())
+    if "http_metrics_file" in args and args.http_metrics_file:
+        with open(args.http_metrics_file, "w", encoding="utf-8") as file:
+            json.dump(metrics.as_dict(), file, indent=2)
+
+
+def _install_cassette(args):
+    if "record" in args and args.record:
+        return instarepo.cassette.install(instarepo.cassette.MODE_RECORD, args.record)
+    if "replay" in args and args.replay:
+        return instarepo.cassette.install(
+            instarepo.cassette.MODE_REPLAY, args.replay, args.replay_latency
+        )
+    return None
 
 
 def create_command(args):
@@ -114,6 +148,7 @@ Fixers:
 
 def _configure_list_parser(parser: argparse.ArgumentParser):
     _add_auth_options(parser)
+    _add_http_options(parser)
     _add_sort_options(parser)
     _add_filter_options(parser)
     _add_archived_option(parser)
@@ -121,6 +156,7 @@ def _configure_list_parser(parser: argparse.ArgumentParser):
 
 def _configure_fix_parser(parser: argparse.ArgumentParser):
     _add_auth_options(parser)
+    _add_http_options(parser)
     _add_sort_options(parser)
     _add_filter_options(parser)
     parser.add_argument(
@@ -167,10 +203,39 @@ def _configure_fix_parser(parser: argparse.ArgumentParser):
         action="store_true",
         help="Disregard existing instarepo MRs and start from scratch",
     )
+    parser.add_argument(
+        "--no-prescreen",
+        dest="prescreen",
+        action="store_false",
+        default=True,
+        help="Clone every repo, instead of skipping the ones that no fixer would change based on their file tree",
+    )
+    parser.add_argument(
+        "--commit-via-api",
+        action="store_true",
+        default=False,
+        help="Read files and commit fixes through the GitHub API, instead of cloning and pushing. "
+        "Only for fixers that change text files. Every commit, the branch update and the PR "
+        "are mutating requests, which are spaced by a second to avoid secondary rate limits, "
+        "so a changed repository takes about four seconds",
+    )
+    _add_mirror_cache_option(parser)
+    parser.add_argument(
+        "--history-db",
+        help="Record the outcome and duration of processing each repo in this SQLite database",
+    )
+    parser.add_argument(
+        "--order",
+        default="github",
+        choices=["github", "smart"],
+        help="Process repos in the order of --sort, or process first the ones that are likely "
+        "to change and quick to process, based on their history (needs --history-db)",
+    )
 
 
 def _configure_analyze_parser(parser: argparse.ArgumentParser):
     _add_auth_options(parser)
+    _add_http_options(parser)
     _add_sort_options(parser)
     _add_filter_options(parser)
     _add_archived_option(parser)
@@ -186,10 +251,12 @@ def _configure_analyze_parser(parser: argparse.ArgumentParser):
         default="commits",
         help="The metric to report on",
     )
+    _add_mirror_cache_option(parser)
 
 
 def _configure_clone_parser(parser: argparse.ArgumentParser):
     _add_auth_options(parser)
+    _add_http_options(parser)
     _add_archived_option(parser)
     _add_filter_options(parser)
     parser.add_argument(
@@ -197,12 +264,21 @@ def _configure_clone_parser(parser: argparse.ArgumentParser):
         help="The directory where projects are going to be cloned into",
         default=".",
     )
+    _add_mirror_cache_option(parser)
 
 
 def _configure_login_parser(parser: argparse.ArgumentParser):
     _add_auth_options(parser, required=True)
 
 
+def _add_mirror_cache_option(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--mirror-cache-dir",
+        help="Keep a bare mirror of every repo in this directory and clone from it, "
+        "fetching only new commits",
+    )
+
+
 def _add_archived_option(parser: argparse.ArgumentParser):
     parser.add_argument(
         "--archived",
@@ -221,6 +297,65 @@ def _add_auth_options(parser: argparse.ArgumentParser, required=False):
     auth_group.add_argument("-t", "--token", required=required, help="The GitHub token")
 
 
+def _add_http_options(parser: argparse.ArgumentParser):
+    http_group = parser.add_argument_group("HTTP")
+    http_group.add_argument(
+        "--api-url",
+        default=instarepo.github.API_URL,
+        help="The base URL of the GitHub API, e.g. to use a local fake server",
+    )
+    http_group.add_argument(
+        "--http-pool-size",
+        type=int,
+        default=instarepo.http_session.DEFAULT_POOL_SIZE,
+        help="The maximum number of keep-alive connections to the GitHub API",
+    )
+    http_group.add_argument(
+        "--http-cache-dir",
+        help="Cache GitHub API responses in the given directory and revalidate them with conditional requests",
+    )
+    http_group.add_argument(
+        "--http-cache-max-size",
+        type=int,
+        default=instarepo.http_cache.DEFAULT_MAX_SIZE // (1024 * 1024),
+        help="The maximum size of the HTTP cache in MB",
+    )
+    http_group.add_argument(
+        "--graphql",
+        action="store_true",
+        default=False,
+        help="Use the GraphQL API to fetch repositories, their instarepo PRs and check runs in bulk",
+    )
+    http_group.add_argument(
+        "--http-retries",
+        type=int,
+        default=instarepo.retry.DEFAULT_MAX_RETRIES,
+        help="The number of times to retry GitHub API requests that fail with transient errors",
+    )
+    http_group.add_argument(
+        "--http-metrics-file",
+        metavar="FILE",
+        help="Write the per-endpoint HTTP metrics of the run as JSON to the given file",
+    )
+    cassette_group = http_group.add_mutually_exclusive_group()
+    cassette_group.add_argument(
+        "--record",
+        metavar="FILE",
+        help="Record all HTTP exchanges into the given cassette file",
+    )
+    cassette_group.add_argument(
+        "--replay",
+        metavar="FILE",
+        help="Serve all HTTP requests from the given cassette file, without network access",
+    )
+    http_group.add_argument(
+        "--replay-latency",
+        action="store_true",
+        default=False,
+        help="When replaying, wait as long as the server took to respond when recording",
+    )
+
+
 def _add_sort_options(parser: argparse.ArgumentParser):
     sort_group = parser.add_argument_group("Sorting")
     sort_group.add_argument(
@@ -235,24 +370,87 @@ def _add_sort_options(parser: argparse.ArgumentParser):
 
 
 def _add_filter_options(parser: argparse.ArgumentParser):
+    source_group = parser.add_argument_group("Sources")
+    source_group.add_argument(
+        "--org",
+        action="append",
+        help="Process the repositories of the given organization (repeatable)",
+    )
+    source_group.add_argument(
+        "--user",
+        action="append",
+        help="Process the repositories owned by the given user (repeatable)",
+    )
+    source_group.add_argument(
+        "--repo-cache-db",
+        help="Keep the repository list in this SQLite database, refreshing it incrementally",
+    )
+    source_group.add_argument(
+        "--repo-cache-ttl",
+        default="1h",
+        help="How long the cached repository list is used without checking for changes e.g. 15m",
+    )
+    source_group.add_argument(
+        "--cached",
+        action="store_true",
+        default=False,
+        help="Only use the cached repository list, without contacting GitHub (needs --repo-cache-db)",
+    )
+    source_group.add_argument(
+        "--repos-from",
+        help="Process the repositories saved with --save-selection, without listing or filtering them",
+    )
+    source_group.add_argument(
+        "--save-selection",
+        help="Save the selected repositories to this file (JSONL), to be reused with --repos-from",
+    )
+
     language_group = parser.add_mutually_exclusive_group()
     language_group.add_argument(
         "--only-language",
-        help="Only process repositories of the given programming language",
+        action="append",
+        help="Only process repositories of the given programming language (repeatable)",
     )
     language_group.add_argument(
         "--except-language",
-        help="Do not process repositories of the given programming language",
+        action="append",
+        help="Do not process repositories of the given programming language (repeatable)",
     )
 
     prefix_group = parser.add_mutually_exclusive_group()
     prefix_group.add_argument(
         "--only-name-prefix",
-        help="Only process repositories whose name starts with the given prefix",
+        action="append",
+        help="Only process repositories whose name starts with the given prefix (repeatable)",
     )
     prefix_group.add_argument(
         "--except-name-prefix",
-        help="Do not process repositories whose name starts with the given prefix",
+        action="append",
+        help="Do not process repositories whose name starts with the given prefix (repeatable)",
+    )
+
+    regex_group = parser.add_mutually_exclusive_group()
+    regex_group.add_argument(
+        "--only-name-regex",
+        action="append",
+        help="Only process repositories whose name matches the given regular expression (repeatable)",
+    )
+    regex_group.add_argument(
+        "--except-name-regex",
+        action="append",
+        help="Do not process repositories whose name matches the given regular expression (repeatable)",
+    )
+
+    topic_group = parser.add_mutually_exclusive_group()
+    topic_group.add_argument(
+        "--only-topic",
+        action="append",
+        help="Only process repositories that have the given topic (repeatable)",
+    )
+    topic_group.add_argument(
+        "--except-topic",
+        action="append",
+        help="Do not process repositories that have the given topic (repeatable)",
     )
 
     filter_group = parser.add_argument_group("Filtering")
@@ -271,6 +469,51 @@ def _add_filter_options(parser: argparse.ArgumentParser):
         "--pushed-before",
         help="Only process repositories that had changes pushed before the given time interval e.g. 4h",
     )
+    filter_group.add_argument(
+        "--created-after",
+        help="Only process repositories that were created after the given time interval e.g. 4h",
+    )
+    filter_group.add_argument(
+        "--created-before",
+        help="Only process repositories that were created before the given time interval e.g. 4h",
+    )
+    filter_group.add_argument(
+        "--updated-after",
+        help="Only process repositories that were updated after the given time interval e.g. 4h",
+    )
+    filter_group.add_argument(
+        "--updated-before",
+        help="Only process repositories that were updated before the given time interval e.g. 4h",
+    )
+    filter_group.add_argument(
+        "--min-size",
+        type=int,
+        help="Only process repositories that are at least this big, in KB",
+    )
+    filter_group.add_argument(
+        "--max-size",
+        type=int,
+        help="Only process repositories that are at most this big, in KB",
+    )
+    filter_group.add_argument(
+        "--shard",
+        metavar="INDEX/COUNT",
+        help="Only process one of COUNT disjoint shards of the selected repositories e.g. 2/4",
+    )
+    filter_group.add_argument(
+        "--shard-by",
+        default="name",
+        choices=["name", "size"],
+        help="Assign repositories to shards by a hash of their name, "
+        "or balance the shards by repository size (needs the same selection on every worker e.g. --repos-from)",
+    )
+    filter_group.add_argument(
+        "--no-search-api",
+        action="store_false",
+        dest="search",
+        default=True,
+        help="Always list all repositories and filter them locally, instead of using the search API",
+    )
 
 
 if __name__ == "__main__":
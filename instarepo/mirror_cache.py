@@ -0,0 +1,241 @@
+"""
+Keeps a bare mirror of every repository on disk, so that working copies
+are created from local objects and only new objects are fetched.
+"""
+
+import contextlib
+import logging
+import os
+import os.path
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import Callable, Optional
+
+import instarepo.git
+import instarepo.github
+
+DEFAULT_FETCH_ATTEMPTS = 3
+"""How many times a failed fetch is tried, before checking the mirror for corruption."""
+
+
+class MirrorCache:
+    """
+    A directory of bare mirrors, one per repository (e.g. `owner/name.git`).
+
+    Every checkout updates the mirror with an incremental fetch and then
+    creates a `--shared` clone of it, which borrows the objects of the mirror
+    instead of copying them. The origin of the clone is the repository
+    on GitHub, so pushing works as with a regular clone.
+
+    Working copies that outlive the run (e.g. of the clone command) copy
+    the objects with `--reference --dissociate` instead, so that they
+    do not depend on the mirror.
+
+    Each mirror is guarded by a lock file, so that concurrent runs
+    do not fetch into the same mirror at the same time.
+
+    Mirrors are never deleted, because working copies of other runs may be
+    borrowing their objects. A failed fetch is retried, and a mirror is
+    rebuilt only if `git fsck` finds it corrupted. The corrupted mirror is
+    then moved aside, to be deleted by hand once nothing uses it.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        quiet: bool = False,
+        fetch_attempts: int = DEFAULT_FETCH_ATTEMPTS,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Creates an instance of this class.
+
+        :param directory: The directory of the mirrors. It is created if it does not exist
+        :param quiet: Do not show the progress of git commands
+        :param fetch_attempts: How many times a failed fetch is tried
+        :param sleep: Waits between fetch attempts, with exponential backoff
+        """
+        self.directory = directory
+        self.quiet = quiet
+        self.fetch_attempts = fetch_attempts
+        self._sleep = sleep
+
+    def mirror_path(self, full_name: str) -> str:
+        """
+        Gets the directory of the mirror of the given repository.
+        """
+        owner, _, name = full_name.partition("/")
+        return os.path.join(self.directory, owner, name + ".git")
+
+    def clone(
+        self, repo: instarepo.github.Repo, clone_dir: str, persistent: bool = False
+    ) -> instarepo.git.GitWorkingDir:
+        """
+        Updates the mirror of the given repository and clones it into the given directory.
+
+        :param repo: The repository
+        :param clone_dir: The directory of the working copy
+        :param persistent: The working copy outlives the run (e.g. the clone command),
+        so it copies the objects of the mirror instead of borrowing them
+        """
+        mirror = self.mirror_path(repo.full_name)
+        os.makedirs(os.path.dirname(mirror), exist_ok=True)
+        with _file_lock(mirror + ".lock"):
+            self._update(repo, mirror)
+            args = ["git", "clone"]
+            if self.quiet:
+                args.append("-q")
+            if persistent:
+                # only the objects that the mirror lacks are downloaded
+                args.extend(["--reference", mirror, "--dissociate", repo.ssh_url])
+            else:
+                args.extend(["--shared", mirror])
+            args.append(clone_dir)
+            subprocess.run(args, check=True)
+        if not persistent:
+            subprocess.run(
+                ["git", "remote", "set-url", "origin", repo.ssh_url],
+                check=True,
+                cwd=clone_dir,
+            )
+        return instarepo.git.GitWorkingDir(clone_dir, self.quiet)
+
+    def _update(self, repo: instarepo.github.Repo, mirror: str):
+        if not os.path.isdir(mirror):
+            self._create(repo, mirror)
+        else:
+            try:
+                self._fetch(mirror)
+            except subprocess.CalledProcessError:
+                if self._is_intact(mirror):
+                    # most likely a network failure, the mirror is kept
+                    raise
+                broken = f"{mirror}.broken-{int(time.time())}"
+                logging.warning(
+                    "Mirror %s is corrupted, moving it to %s and cloning it again",
+                    mirror,
+                    broken,
+                )
+                os.replace(mirror, broken)
+                self._create(repo, mirror)
+        if repo.default_branch:
+            # follows a renamed default branch, so that clones check it out
+            self._git(
+                mirror, "symbolic-ref", "HEAD", f"refs/heads/{repo.default_branch}"
+            )
+
+    def _fetch(self, mirror: str):
+        args = ["fetch"]
+        if self.quiet:
+            args.append("-q")
+        # only branches and tags, not the pull request refs of GitHub
+        args.extend(["--prune", "--tags", "origin", "+refs/heads/*:refs/heads/*"])
+        for attempt in range(self.fetch_attempts):
+            try:
+                logging.debug("Fetching into mirror %s", mirror)
+                self._git(mirror, *args)
+                return
+            except subprocess.CalledProcessError:
+                if attempt + 1 >= self.fetch_attempts:
+                    raise
+                logging.debug("Could not fetch into mirror %s, trying again", mirror)
+                self._sleep(2**attempt)
+
+    @staticmethod
+    def _is_intact(mirror: str) -> bool:
+        result = subprocess.run(
+            [
+                "git",
+                "--git-dir",
+                mirror,
+                "fsck",
+                "--connectivity-only",
+                "--no-progress",
+            ],
+            check=False,
+            capture_output=True,
+        )
+        return result.returncode == 0
+
+    def _create(self, repo: instarepo.github.Repo, mirror: str):
+        """
+        Clones the mirror into a temporary directory next to it
+        and moves it into place once it is complete.
+        """
+        logging.debug("Creating mirror %s", mirror)
+        temp_dir = tempfile.mkdtemp(
+            prefix=os.path.basename(mirror) + ".", dir=os.path.dirname(mirror)
+        )
+        try:
+            args = ["git", "clone", "--bare"]
+            if self.quiet:
+                args.append("-q")
+            args.extend([repo.ssh_url, temp_dir])
+            subprocess.run(args, check=True)
+            # shared clones borrow objects from the mirror, which gc could delete
+            self._git(temp_dir, "config", "gc.auto", "0")
+            os.replace(temp_dir, mirror)
+        except BaseException:
+            # nothing borrows from an unfinished mirror
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+    @staticmethod
+    def _git(mirror: str, *args):
+        subprocess.run(["git", "--git-dir", mirror, *args], check=True)
+
+
+def clone(
+    mirror_cache: Optional[MirrorCache],
+    repo: instarepo.github.Repo,
+    clone_dir: str,
+    quiet: bool = False,
+    persistent: bool = False,
+) -> instarepo.git.GitWorkingDir:
+    """
+    Clones the given repository through the mirror cache, if any,
+    or directly from GitHub otherwise.
+    See `MirrorCache.clone` about `persistent`.
+    """
+    if mirror_cache:
+        return mirror_cache.clone(repo, clone_dir, persistent)
+    return instarepo.git.clone(repo.ssh_url, clone_dir, quiet=quiet)
+
+
+if os.name == "nt":
+    import msvcrt  # pylint: disable=import-error
+
+    def _lock(file):
+        file.seek(0)
+        while True:
+            try:
+                # gives up with an OSError after trying for about 10 seconds
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                logging.debug("Still waiting for lock %s", file.name)
+
+    def _unlock(file):
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock(file):
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(file):
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    with open(path, "a+b") as file:
+        _lock(file)
+        try:
+            yield
+        finally:
+            _unlock(file)
@@ -0,0 +1,152 @@
+"""
+Unit tests for the mirror_cache module.
+"""
+
+import os
+import subprocess
+
+import pytest
+from pytest_mock import MockerFixture
+
+from .github import Repo
+from .mirror_cache import MirrorCache
+from .repo_source_test import dummy_repo
+
+
+def _git(*args) -> str:
+    result = subprocess.run(
+        [
+            "git",
+            "-c",
+            "user.name=instarepo",
+            "-c",
+            "user.email=instarepo@localhost",
+            *args,
+        ],
+        check=True,
+        capture_output=True,
+        encoding="utf-8",
+    )
+    return result.stdout.strip()
+
+
+def _commit(work: str, name: str):
+    with open(os.path.join(work, name), "w", encoding="utf-8") as file:
+        file.write(name)
+    _git("-C", work, "add", name)
+    _git("-C", work, "commit", "-q", "-m", f"Add {name}")
+    _git("-C", work, "push", "-q", "origin", "main")
+
+
+def _upstream(tmp_path) -> Repo:
+    remote = str(tmp_path / "remote.git")
+    work = str(tmp_path / "work")
+    _git("init", "-q", "--bare", "-b", "main", remote)
+    _git("clone", "-q", remote, work)
+    _git("-C", work, "checkout", "-q", "-b", "main")
+    _commit(work, "a.txt")
+    repo_json = dummy_repo("hello", "jdoe/hello").to_json()
+    repo_json["ssh_url"] = remote
+    repo_json["default_branch"] = "main"
+    return Repo(repo_json)
+
+
+def _cache(tmp_path, sleeps=None) -> MirrorCache:
+    return MirrorCache(
+        str(tmp_path / "mirrors"),
+        quiet=True,
+        sleep=lambda seconds: sleeps.append(seconds) if sleeps is not None else None,
+    )
+
+
+def test_clone_borrows_objects_from_the_mirror(tmp_path):
+    repo = _upstream(tmp_path)
+    cache = _cache(tmp_path)
+
+    git = cache.clone(repo, str(tmp_path / "clone"))
+
+    mirror = cache.mirror_path("jdoe/hello")
+    assert mirror == os.path.join(str(tmp_path / "mirrors"), "jdoe", "hello.git")
+    assert git.isfile("a.txt")
+    assert git.get_remote_url() == repo.ssh_url
+    assert git.get_default_branch() == "main"
+    assert os.path.isfile(git.join(".git", "objects", "info", "alternates"))
+
+
+def test_persistent_clone_does_not_depend_on_the_mirror(tmp_path):
+    repo = _upstream(tmp_path)
+    cache = _cache(tmp_path)
+
+    git = cache.clone(repo, str(tmp_path / "clone"), persistent=True)
+
+    assert git.isfile("a.txt")
+    assert git.get_remote_url() == repo.ssh_url
+    assert not os.path.isfile(git.join(".git", "objects", "info", "alternates"))
+    assert os.path.isdir(cache.mirror_path("jdoe/hello"))
+
+
+def test_clone_fetches_new_commits_into_the_mirror(tmp_path):
+    repo = _upstream(tmp_path)
+    cache = _cache(tmp_path)
+    cache.clone(repo, str(tmp_path / "first"))
+    _commit(str(tmp_path / "work"), "b.txt")
+
+    git = cache.clone(repo, str(tmp_path / "second"))
+
+    assert git.isfile("b.txt")
+    upstream_head = _git("--git-dir", repo.ssh_url, "rev-parse", "main")
+    assert git.rev_parse("HEAD") == upstream_head
+
+
+def test_failed_fetch_is_retried(tmp_path, mocker: MockerFixture):
+    repo = _upstream(tmp_path)
+    sleeps = []
+    cache = _cache(tmp_path, sleeps)
+    cache.clone(repo, str(tmp_path / "first"))
+    run = subprocess.run
+    failures = []
+
+    def flaky_run(args, **kwargs):
+        if "fetch" in args and not failures:
+            failures.append(args)
+            raise subprocess.CalledProcessError(128, args)
+        return run(args, **kwargs)
+
+    mocker.patch("subprocess.run", side_effect=flaky_run)
+
+    git = cache.clone(repo, str(tmp_path / "second"))
+
+    assert git.isfile("a.txt")
+    assert len(failures) == 1
+    assert sleeps == [1]
+
+
+def test_intact_mirror_is_kept_when_fetch_keeps_failing(tmp_path):
+    repo = _upstream(tmp_path)
+    cache = _cache(tmp_path)
+    first = cache.clone(repo, str(tmp_path / "first"))
+    os.rename(repo.ssh_url, repo.ssh_url + ".offline")
+
+    with pytest.raises(subprocess.CalledProcessError):
+        cache.clone(repo, str(tmp_path / "second"))
+
+    # the working copy that borrows from the mirror still works
+    assert os.path.isdir(cache.mirror_path(repo.full_name))
+    assert first.rev_parse("HEAD")
+
+
+def test_corrupted_mirror_is_moved_aside_and_cloned_again(tmp_path):
+    repo = _upstream(tmp_path)
+    cache = _cache(tmp_path)
+    mirror = cache.mirror_path(repo.full_name)
+    os.makedirs(mirror)
+
+    git = cache.clone(repo, str(tmp_path / "clone"))
+
+    assert git.isfile("a.txt")
+    owner_dir = os.path.dirname(mirror)
+    assert sorted(name.split("-")[0] for name in os.listdir(owner_dir)) == [
+        "hello.git",
+        "hello.git.broken",
+        "hello.git.lock",
+    ]
@@ -0,0 +1,176 @@
+"""
+A run-wide index of the open pull requests that instarepo created.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import requests
+
+import instarepo.github
+
+SEARCH_RESULTS_LIMIT = 1000
+"""GitHub returns at most this many search results, regardless of pagination."""
+
+REPOS_URL_PREFIX = "/repos/"
+
+
+class PullRequestIndex:
+    """
+    Finds the open pull requests of a branch across all repositories
+    with one paginated search per base branch, instead of listing them
+    per repository. Repositories usually share a handful of default branch
+    names (e.g. `main` and `master`), so this takes a handful of searches.
+
+    The index of a base branch is built on first use and kept up to date
+    locally when pull requests are created, closed or merged. If the search
+    cannot be trusted to be complete, lookups fall back to listing the pull
+    requests of each repository, which `prefetch` does for a batch of
+    repositories at once.
+
+    If the GitHub client already fetched the pull requests of the branch
+    together with the repositories (see `instarepo.github_graphql`),
+    those take precedence and no search is made.
+    """
+
+    def __init__(self, github: instarepo.github.GitHub, head_branch: str):
+        """
+        Creates an instance of this class.
+
+        :param github: The GitHub client
+        :param head_branch: The branch of the pull requests, e.g. `instarepo_branch`
+        """
+        self.github = github
+        self.head_branch = head_branch
+        self._lock = threading.Lock()
+        self._pull_requests: Dict[str, Optional[Dict[str, List[dict]]]] = {}
+        self._listed: Dict[str, List[dict]] = {}
+
+    def prefetch(self, repos: List[instarepo.github.Repo]):
+        """
+        Lists the pull requests of the given repositories concurrently,
+        if they cannot be found in the index. Each result is used
+        by the next lookup of its repository.
+        """
+        if self.github.prefetches_merge_requests(self.head_branch):
+            return
+        missing = [repo for repo in repos if self._load(repo.default_branch) is None]
+        if not missing:
+            return
+        async_github = self.github.async_github
+        results = async_github.gather(
+            *(
+                async_github.list_merge_requests(
+                    repo.full_name, self._head(repo), repo.default_branch
+                )
+                for repo in missing
+            ),
+            return_exceptions=True,
+        )
+        with self._lock:
+            for repo, result in zip(missing, results):
+                # a failed lookup is sent again when the repository is processed
+                if not isinstance(result, Exception):
+                    self._listed[repo.full_name] = result
+
+    def list_merge_requests(self, repo: instarepo.github.Repo) -> List[dict]:
+        """
+        Gets the open pull requests of the branch in the given repository,
+        targeting its default branch.
+        """
+        pull_requests = self._load(repo.default_branch)
+        if pull_requests is None:
+            with self._lock:
+                listed = self._listed.pop(repo.full_name, None)
+            if listed is not None:
+                return listed
+            return self.github.list_merge_requests(
+                repo.full_name, self._head(repo), repo.default_branch
+            )
+        with self._lock:
+            return list(pull_requests.get(repo.full_name, []))
+
+    def add(self, repo: instarepo.github.Repo, html_url: str):
+        """
+        Records a pull request that was just created against the default branch.
+        """
+        number = pull_number_from_html_url(html_url)
+        pull_requests = self._load(repo.default_branch)
+        if number is None or pull_requests is None:
+            return
+        with self._lock:
+            pull_requests.setdefault(repo.full_name, []).append(
+                {"number": number, "html_url": html_url}
+            )
+
+    def remove(self, repo: instarepo.github.Repo, number: int):
+        """
+        Forgets a pull request that was closed or merged.
+        """
+        pull_requests = self._load(repo.default_branch)
+        if pull_requests is None:
+            return
+        with self._lock:
+            pull_requests[repo.full_name] = [
+                pull_request
+                for pull_request in pull_requests.get(repo.full_name, [])
+                if pull_request["number"] != number
+            ]
+
+    def _head(self, repo: instarepo.github.Repo) -> str:
+        # the branch is pushed to the repository itself, not to a fork,
+        # so its owner is the owner of the repository (e.g. an organization)
+        return repo.owner + ":" + self.head_branch
+
+    def _load(self, base: str) -> Optional[Dict[str, List[dict]]]:
+        if self.github.prefetches_merge_requests(self.head_branch):
+            return None
+        with self._lock:
+            if base not in self._pull_requests:
+                self._pull_requests[base] = self._search(base)
+            return self._pull_requests[base]
+
+    def _search(self, base: str) -> Optional[Dict[str, List[dict]]]:
+        query = (
+            f"is:pr is:open author:{self.github.auth.username}"
+            f" head:{self.head_branch} base:{base}"
+        )
+        result: Dict[str, List[dict]] = {}
+        count = 0
+        try:
+            for item in self.github.search_issues(query):
+                full_name = full_name_from_repository_url(item["repository_url"])
+                result.setdefault(full_name, []).append(item)
+                count = count + 1
+        except (requests.RequestException, ValueError, KeyError) as ex:
+            logging.warning(
+                "Could not build the PR index, listing PRs per repo: %s", ex
+            )
+            return None
+        if count >= SEARCH_RESULTS_LIMIT:
+            logging.warning(
+                "Found %d open PRs, more than the search can return, listing PRs per repo",
+                count,
+            )
+            return None
+        logging.debug("Found %d open PRs of %s into %s", count, self.head_branch, base)
+        return result
+
+
+def full_name_from_repository_url(repository_url: str) -> str:
+    """
+    Gets the full name of a repository from its API URL,
+    e.g. https://api.github.com/repos/ngeor/instarepo -> ngeor/instarepo
+    """
+    index = repository_url.index(REPOS_URL_PREFIX)
+    return repository_url[index + len(REPOS_URL_PREFIX) :]
+
+
+def pull_number_from_html_url(html_url: str) -> Optional[int]:
+    """
+    Gets the number of a pull request from its web URL,
+    e.g. https://github.com/ngeor/instarepo/pull/42 -> 42
+    """
+    _, _, number = html_url.rstrip("/").rpartition("/pull/")
+    return int(number) if number.isdigit() else None
@@ -0,0 +1,180 @@
+"""
+Unit tests for the pr_index module.
+"""
+
+import collections
+import threading
+import time
+
+import requests
+from pytest_mock import MockerFixture
+
+from .async_github import AsyncGitHub
+from .pr_index import (
+    PullRequestIndex,
+    full_name_from_repository_url,
+    pull_number_from_html_url,
+)
+
+Auth = collections.namedtuple("Auth", "username")
+Repo = collections.namedtuple("Repo", "full_name default_branch owner")
+
+
+def _repo(full_name: str, default_branch: str = "main") -> Repo:
+    return Repo(full_name, default_branch, full_name.partition("/")[0])
+
+
+def _github(mocker: MockerFixture):
+    github = mocker.Mock()
+    github.auth = Auth("jdoe")
+    github.prefetches_merge_requests.return_value = False
+    return github
+
+
+def _search_item(full_name: str, number: int):
+    return {
+        "number": number,
+        "repository_url": f"https://api.github.com/repos/{full_name}",
+    }
+
+
+def test_lookups_are_served_from_one_search(mocker: MockerFixture):
+    # arrange
+    github = _github(mocker)
+    github.search_issues.return_value = iter(
+        [_search_item("jdoe/foo", 1), _search_item("jdoe/bar", 2)]
+    )
+    index = PullRequestIndex(github, "instarepo_branch")
+
+    # act
+    foo = index.list_merge_requests(_repo("jdoe/foo"))
+    baz = index.list_merge_requests(_repo("jdoe/baz"))
+
+    # assert
+    github.search_issues.assert_called_once_with(
+        "is:pr is:open author:jdoe head:instarepo_branch base:main"
+    )
+    github.list_merge_requests.assert_not_called()
+    assert [pr["number"] for pr in foo] == [1]
+    assert not baz
+
+
+def test_index_is_updated_locally(mocker: MockerFixture):
+    github = _github(mocker)
+    github.search_issues.return_value = iter([_search_item("jdoe/foo", 1)])
+    index = PullRequestIndex(github, "instarepo_branch")
+    repo = _repo("jdoe/foo")
+
+    index.remove(repo, 1)
+    assert not index.list_merge_requests(repo)
+    index.add(repo, "https://github.com/jdoe/foo/pull/3")
+    assert [pr["number"] for pr in index.list_merge_requests(repo)] == [3]
+
+
+def test_falls_back_to_listing_when_search_is_incomplete(mocker: MockerFixture):
+    github = _github(mocker)
+    github.search_issues.side_effect = ValueError("incomplete")
+    github.list_merge_requests.return_value = [{"number": 5}]
+    index = PullRequestIndex(github, "instarepo_branch")
+
+    result = index.list_merge_requests(_repo("jdoe/foo"))
+
+    assert result == [{"number": 5}]
+    github.list_merge_requests.assert_called_once_with(
+        "jdoe/foo", "jdoe:instarepo_branch", "main"
+    )
+
+
+def test_falls_back_to_listing_when_search_fails(mocker: MockerFixture):
+    github = _github(mocker)
+    github.search_issues.side_effect = requests.HTTPError("422 Unprocessable Entity")
+    github.list_merge_requests.return_value = []
+
+    index = PullRequestIndex(github, "instarepo_branch")
+
+    assert not index.list_merge_requests(_repo("acme/foo"))
+    # the branch of an organization repository belongs to the organization
+    github.list_merge_requests.assert_called_once_with(
+        "acme/foo", "acme:instarepo_branch", "main"
+    )
+
+
+def test_searches_once_per_base_branch(mocker: MockerFixture):
+    # arrange
+    github = _github(mocker)
+    github.search_issues.side_effect = lambda query: iter(
+        [_search_item("jdoe/foo", 1)] if query.endswith("base:main") else []
+    )
+    index = PullRequestIndex(github, "instarepo_branch")
+
+    # act
+    foo = index.list_merge_requests(_repo("jdoe/foo"))
+    foo_into_master = index.list_merge_requests(_repo("jdoe/foo", "master"))
+    index.list_merge_requests(_repo("jdoe/bar", "master"))
+
+    # assert
+    assert [pr["number"] for pr in foo] == [1]
+    assert not foo_into_master
+    assert github.search_issues.call_count == 2
+
+
+def test_prefetched_pull_requests_take_precedence(mocker: MockerFixture):
+    github = _github(mocker)
+    github.prefetches_merge_requests.return_value = True
+    github.list_merge_requests.return_value = [{"number": 5}]
+    index = PullRequestIndex(github, "instarepo_branch")
+
+    result = index.list_merge_requests(_repo("jdoe/foo"))
+
+    assert result == [{"number": 5}]
+    github.prefetches_merge_requests.assert_called_once_with("instarepo_branch")
+    github.search_issues.assert_not_called()
+
+
+def test_prefetch_lists_pull_requests_concurrently(mocker: MockerFixture):
+    # arrange
+    github = _github(mocker)
+    github.search_issues.side_effect = ValueError("incomplete")
+    github.async_github = AsyncGitHub(github, concurrency=4)
+    lock = threading.Lock()
+    in_flight = []
+    max_in_flight = []
+
+    def list_merge_requests(full_name, head, base):
+        with lock:
+            in_flight.append(full_name)
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.remove(full_name)
+        return [{"number": 1, "full_name": full_name}]
+
+    github.list_merge_requests.side_effect = list_merge_requests
+    index = PullRequestIndex(github, "instarepo_branch")
+    repos = [_repo(f"jdoe/repo{i}") for i in range(4)]
+
+    # act
+    try:
+        index.prefetch(repos)
+        results = [index.list_merge_requests(repo) for repo in repos]
+    finally:
+        github.async_github.close()
+
+    # assert
+    assert [result[0]["full_name"] for result in results] == [
+        repo.full_name for repo in repos
+    ]
+    assert github.list_merge_requests.call_count == 4
+    assert max(max_in_flight) == 4
+
+
+def test_full_name_from_repository_url():
+    assert (
+        full_name_from_repository_url("https://api.github.com/repos/ngeor/instarepo")
+        == "ngeor/instarepo"
+    )
+
+
+def test_pull_number_from_html_url():
+    assert pull_number_from_html_url("https://github.com/ngeor/instarepo/pull/42") == 42
+    assert pull_number_from_html_url("") is None
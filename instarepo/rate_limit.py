@@ -0,0 +1,211 @@
+"""
+Schedules GitHub API requests so that they stay within the rate limits.
+
+See https://docs.github.com/en/rest/overview/resources-in-the-rest-api#rate-limiting
+"""
+
+import logging
+import threading
+import time
+import urllib.parse
+from typing import Dict, Optional
+
+import requests
+
+DEFAULT_MUTATION_INTERVAL = 1.0
+"""
+The minimum number of seconds between two mutating requests.
+GitHub recommends waiting at least one second between them to avoid secondary rate limits.
+"""
+
+DEFAULT_SECONDARY_WAIT = 60.0
+"""
+The number of seconds to wait after hitting a secondary rate limit without a `Retry-After` header.
+"""
+
+MUTATING_METHODS = ("POST", "PATCH", "PUT", "DELETE")
+
+CORE_RESOURCE = "core"
+"""The rate limit resource of most REST API endpoints."""
+
+
+class _Bucket:
+    """
+    The budget of one rate limit resource, e.g. "core" or "search".
+    """
+
+    def __init__(self):
+        # unknown until the first response arrives
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+
+
+class RateLimiter:
+    """
+    Token buckets that are shared by all callers of a GitHub client,
+    one per rate limit resource (e.g. "core", "search", "graphql"),
+    because GitHub limits each resource separately.
+
+    The buckets are refilled by the `X-RateLimit-Remaining` / `X-RateLimit-Reset`
+    headers of the API responses, which `X-RateLimit-Resource` assigns to a bucket.
+    Every request takes one token; when the bucket is empty, callers wait until
+    the rate limit window resets. Conditional requests that are answered with
+    304 Not Modified do not count against the rate limit, so their token is
+    given back. Mutating requests are additionally spaced by `mutation_interval` seconds.
+
+    Waiting blocks only the calling thread, so work that does not need the API
+    (e.g. git operations) continues.
+    """
+
+    def __init__(
+        self,
+        mutation_interval: float = DEFAULT_MUTATION_INTERVAL,
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        """
+        Creates an instance of this class.
+
+        :param mutation_interval: The minimum number of seconds between two mutating requests
+        :param clock: Returns the current time as seconds since the epoch
+        :param sleep: Sleeps the calling thread for the given number of seconds
+        """
+        self.mutation_interval = mutation_interval
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _Bucket] = {}
+        self._paused_until = 0.0
+        self._next_mutation_at = 0.0
+
+    def acquire(
+        self,
+        method: str,
+        mutating: Optional[bool] = None,
+        resource: str = CORE_RESOURCE,
+    ):
+        """
+        Takes a token for a request with the given HTTP method,
+        waiting as long as needed.
+
+        :param method: The HTTP method of the request
+        :param mutating: Whether the request changes data. Defaults to deciding by the HTTP method.
+        :param resource: The rate limit resource of the request, see `resource_of`
+        """
+        if mutating is None:
+            mutating = method.upper() in MUTATING_METHODS
+        while True:
+            wait = self._try_acquire(mutating, resource)
+            if wait <= 0:
+                return
+            logging.debug(
+                "Waiting %.1f seconds for the GitHub %s rate limit", wait, resource
+            )
+            self._sleep(wait)
+
+    def _try_acquire(self, mutating: bool, resource: str) -> float:
+        with self._lock:
+            now = self._clock()
+            if self._paused_until > now:
+                return self._paused_until - now
+            bucket = self._buckets.setdefault(resource, _Bucket())
+            if bucket.remaining is not None:
+                if bucket.reset_at <= now:
+                    # a new window has started, the budget is unknown again
+                    bucket.remaining = None
+                elif bucket.remaining <= 0:
+                    return bucket.reset_at - now
+            if mutating and self._next_mutation_at > now:
+                return self._next_mutation_at - now
+            if bucket.remaining is not None:
+                bucket.remaining -= 1
+            if mutating:
+                self._next_mutation_at = now + self.mutation_interval
+            return 0
+
+    def update(
+        self, response: requests.Response, resource: Optional[str] = None
+    ) -> Optional[float]:
+        """
+        Updates the budget from the headers of the given response.
+
+        If the response indicates that a rate limit was hit, the number of
+        seconds to wait is returned. Otherwise, it returns None.
+        A primary rate limit empties the bucket of its resource only,
+        while a secondary rate limit pauses all callers.
+
+        :param response: The response
+        :param resource: The rate limit resource the token was taken from.
+        The `X-RateLimit-Resource` header takes precedence.
+        """
+        headers = response.headers
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        reset_at = _int_header(headers, "X-RateLimit-Reset")
+        resource = headers.get("X-RateLimit-Resource") or resource or CORE_RESOURCE
+        not_modified = response.status_code == 304 or getattr(
+            response, "from_cache", False
+        )
+        with self._lock:
+            bucket = self._buckets.setdefault(resource, _Bucket())
+            if not_modified and bucket.remaining is not None:
+                # 304 responses do not count against the rate limit
+                bucket.remaining += 1
+            if remaining is not None and reset_at is not None:
+                if reset_at != bucket.reset_at or bucket.remaining is None:
+                    bucket.reset_at = reset_at
+                    bucket.remaining = remaining
+                else:
+                    # other callers may have taken tokens since this response was sent
+                    bucket.remaining = min(bucket.remaining, remaining)
+            wait = self._throttle_wait(response, remaining, reset_at)
+            # the bucket is already empty until it resets
+            primary = (
+                remaining == 0 and reset_at is not None and "Retry-After" not in headers
+            )
+            if wait is not None and not primary:
+                self._paused_until = max(self._paused_until, self._clock() + wait)
+            return wait
+
+    def _throttle_wait(
+        self,
+        response: requests.Response,
+        remaining: Optional[int],
+        reset_at: Optional[int],
+    ) -> Optional[float]:
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = _int_header(response.headers, "Retry-After")
+        if retry_after is not None:
+            return float(retry_after)
+        if remaining == 0 and reset_at is not None:
+            return max(reset_at - self._clock(), 0) + 1
+        if response.status_code == 429 or "rate limit" in response.text.lower():
+            return DEFAULT_SECONDARY_WAIT
+        # a regular 403, e.g. missing permissions
+        return None
+
+
+def resource_of(url: str) -> str:
+    """
+    Guesses the rate limit resource of a request from its URL,
+    before the `X-RateLimit-Resource` header of the response is known.
+    """
+    segments = [
+        segment for segment in urllib.parse.urlsplit(url).path.split("/") if segment
+    ]
+    if segments[-1:] == ["graphql"]:
+        return "graphql"
+    # e.g. /search/repositories, but not a repository named "search"
+    if "search" in segments and "repos" not in segments:
+        return "search"
+    return CORE_RESOURCE
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
@@ -0,0 +1,182 @@
+"""
+Unit tests for the rate_limit module.
+"""
+
+import requests
+
+from .rate_limit import DEFAULT_SECONDARY_WAIT, RateLimiter, resource_of
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def fake_response(status_code: int = 200, headers=None, text: str = ""):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = text.encode("utf-8")  # pylint: disable=protected-access
+    return response
+
+
+def test_acquire_without_budget_information_does_not_wait():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock.time, sleep=clock.sleep)
+    for _ in range(10):
+        limiter.acquire("GET")
+    assert not clock.sleeps
+
+
+def test_acquire_waits_for_reset_when_budget_is_exhausted():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock.time, sleep=clock.sleep)
+    limiter.update(
+        fake_response(
+            headers={"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": "1100"}
+        )
+    )
+    limiter.acquire("GET")
+    limiter.acquire("GET")
+    assert not clock.sleeps
+    limiter.acquire("GET")
+    assert clock.sleeps == [100]
+
+
+def test_budget_is_not_increased_by_stale_headers():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock.time, sleep=clock.sleep)
+    headers = {"X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "1100"}
+    limiter.update(fake_response(headers=headers))
+    limiter.acquire("GET")
+    # a response of an earlier, concurrent request arrives late
+    limiter.update(
+        fake_response(
+            headers={"X-RateLimit-Remaining": "5", "X-RateLimit-Reset": "1100"}
+        )
+    )
+    limiter.acquire("GET")
+    assert clock.sleeps == [100]
+
+
+def test_mutating_requests_are_spaced():
+    clock = FakeClock()
+    limiter = RateLimiter(mutation_interval=1.0, clock=clock.time, sleep=clock.sleep)
+    limiter.acquire("POST")
+    limiter.acquire("GET")
+    limiter.acquire("PATCH")
+    assert clock.sleeps == [1.0]
+
+
+def test_update_retry_after_pauses_all_callers():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock.time, sleep=clock.sleep)
+    wait = limiter.update(fake_response(429, headers={"Retry-After": "30"}))
+    assert wait == 30
+    limiter.acquire("GET")
+    assert clock.sleeps == [30]
+
+
+def test_update_primary_rate_limit_exceeded():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock.time, sleep=clock.sleep)
+    wait = limiter.update(
+        fake_response(
+            403, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1010"}
+        )
+    )
+    assert wait == 11
+
+
+def test_primary_search_rate_limit_does_not_block_core_requests():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock.time, sleep=clock.sleep)
+    wait = limiter.update(
+        fake_response(
+            403,
+            headers={
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": "1050",
+                "X-RateLimit-Resource": "search",
+            },
+        ),
+        "search",
+    )
+    assert wait == 51
+    limiter.acquire("GET")
+    assert not clock.sleeps
+    limiter.acquire("GET", resource="search")
+    assert clock.sleeps == [50]
+
+
+def test_update_secondary_rate_limit_without_headers():
+    limiter = RateLimiter()
+    wait = limiter.update(
+        fake_response(
+            403, text='{"message": "You have exceeded a secondary rate limit"}'
+        )
+    )
+    assert wait == DEFAULT_SECONDARY_WAIT
+
+
+def test_update_forbidden_is_not_throttling():
+    limiter = RateLimiter()
+    assert limiter.update(fake_response(403, text='{"message": "Forbidden"}')) is None
+
+
+def test_resources_have_separate_budgets():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock.time, sleep=clock.sleep)
+    limiter.update(
+        fake_response(
+            headers={
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": "1060",
+                "X-RateLimit-Resource": "search",
+            }
+        )
+    )
+    limiter.update(
+        fake_response(
+            headers={
+                "X-RateLimit-Remaining": "4000",
+                "X-RateLimit-Reset": "3000",
+                "X-RateLimit-Resource": "core",
+            }
+        )
+    )
+    limiter.acquire("GET")
+    assert not clock.sleeps
+    limiter.acquire("GET", resource="search")
+    assert clock.sleeps == [60]
+
+
+def test_not_modified_responses_give_the_token_back():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock.time, sleep=clock.sleep)
+    headers = {"X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "1100"}
+    limiter.update(fake_response(headers=headers))
+    for _ in range(3):
+        limiter.acquire("GET")
+        limiter.update(fake_response(304, headers=headers))
+    assert not clock.sleeps
+    limiter.acquire("GET")
+    limiter.update(fake_response(200))
+    limiter.acquire("GET")
+    assert clock.sleeps == [100]
+
+
+def test_resource_of():
+    assert resource_of("https://api.github.com/search/repositories?q=x") == "search"
+    assert resource_of("https://ghe.example.com/api/v3/search/issues") == "search"
+    assert resource_of("https://api.github.com/graphql") == "graphql"
+    assert resource_of("https://api.github.com/repos/jdoe/search/pulls") == "core"
+    assert resource_of("https://api.github.com/user/repos") == "core"
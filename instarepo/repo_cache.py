@@ -0,0 +1,188 @@
+"""
+Caches repository metadata in a local SQLite database.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import os.path
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional
+
+import instarepo.github
+
+DEFAULT_TTL = timedelta(hours=1)
+"""How long cached repositories are served without asking GitHub for changes."""
+
+DEFAULT_FULL_REFRESH_INTERVAL = timedelta(days=7)
+"""How often all repositories are listed again, to forget deleted and transferred ones."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos (
+    source TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    json TEXT NOT NULL,
+    PRIMARY KEY (source, full_name)
+);
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    refreshed_at REAL NOT NULL,
+    full_refreshed_at REAL NOT NULL
+);
+"""
+
+Fetch = Callable[
+    [Optional[Callable[[instarepo.github.Repo], bool]]],
+    Iterable[instarepo.github.Repo],
+]
+"""
+Lists the repositories of a source, most recently updated first,
+stopping at the first repository for which the given predicate returns True.
+"""
+
+
+class RepoCache:
+    """
+    Keeps the repositories of each source (e.g. an organization) in a SQLite database.
+
+    Within the TTL, repositories are served from the database without any request.
+    After that, the cache is refreshed incrementally: repositories are listed
+    most recently updated first, until reaching the ones that are already known.
+    Every `full_refresh_interval`, all repositories are listed again,
+    because an incremental refresh cannot notice deleted repositories.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[timedelta] = DEFAULT_TTL,
+        offline: bool = False,
+        full_refresh_interval: timedelta = DEFAULT_FULL_REFRESH_INTERVAL,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Creates an instance of this class.
+
+        :param path: The path of the SQLite database. It is created if it does not exist
+        :param ttl: How long cached repositories are served without a refresh. None refreshes every time
+        :param offline: Only serve cached repositories, never contacting GitHub
+        :param full_refresh_interval: How often all repositories are listed again
+        :param clock: Returns the current time in seconds since the epoch
+        """
+        self.path = path
+        self.ttl = ttl
+        self.offline = offline
+        self.full_refresh_interval = full_refresh_interval
+        self._clock = clock
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def get(self, source: str, fetch: Fetch) -> List[instarepo.github.Repo]:
+        """
+        Gets the repositories of the given source, refreshing them if needed.
+
+        :param source: Identifies the listing, e.g. "org:acme"
+        :param fetch: Lists the repositories of the source, see `Fetch`
+        """
+        state = self._get_state(source)
+        if self.offline:
+            if state is None:
+                logging.warning("No cached repositories for %s", source)
+        else:
+            now = self._clock()
+            if (
+                state is None
+                or now - state[1] >= self.full_refresh_interval.total_seconds()
+            ):
+                logging.debug("Listing all repositories of %s", source)
+                self._replace(source, fetch(None), now)
+            elif self.ttl is None or now - state[0] >= self.ttl.total_seconds():
+                self._refresh(source, fetch, now)
+        return self._load(source)
+
+    def _refresh(self, source: str, fetch: Fetch, now: float):
+        with self._connect() as connection:
+            (watermark,) = connection.execute(
+                "SELECT MAX(updated_at) FROM repos WHERE source = ?", (source,)
+            ).fetchone()
+        if watermark is None:
+            stop = None
+        else:
+            known = _parse(watermark)
+
+            def stop(repo: instarepo.github.Repo) -> bool:
+                # repositories updated in the same second as the newest known one
+                # might have been missed, so they are listed again
+                return repo.updated_at < known
+
+        repos = list(fetch(stop))
+        logging.debug("Found %d updated repositories of %s", len(repos), source)
+        with self._connect() as connection:
+            self._upsert(connection, source, repos)
+            connection.execute(
+                "UPDATE sources SET refreshed_at = ? WHERE source = ?", (now, source)
+            )
+
+    def _replace(self, source: str, repos: Iterable[instarepo.github.Repo], now: float):
+        repos = list(repos)
+        with self._connect() as connection:
+            connection.execute("DELETE FROM repos WHERE source = ?", (source,))
+            self._upsert(connection, source, repos)
+            connection.execute(
+                "INSERT OR REPLACE INTO sources (source, refreshed_at, full_refreshed_at) "
+                "VALUES (?, ?, ?)",
+                (source, now, now),
+            )
+
+    @staticmethod
+    def _upsert(connection, source: str, repos: List[instarepo.github.Repo]):
+        rows = []
+        for repo in repos:
+            repo_json = repo.to_json()
+            rows.append(
+                (
+                    source,
+                    repo.full_name,
+                    repo_json["updated_at"],
+                    json.dumps(repo_json),
+                )
+            )
+        connection.executemany(
+            "INSERT OR REPLACE INTO repos (source, full_name, updated_at, json) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+    def _get_state(self, source: str):
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT refreshed_at, full_refreshed_at FROM sources WHERE source = ?",
+                (source,),
+            ).fetchone()
+
+    def _load(self, source: str) -> List[instarepo.github.Repo]:
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT json FROM repos WHERE source = ?", (source,)
+            ).fetchall()
+        return [instarepo.github.Repo(json.loads(row[0])) for row in rows]
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # a connection per operation, so that the cache can be used from any thread
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+
+def _parse(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
@@ -0,0 +1,162 @@
+"""
+Unit tests for the repo_cache module.
+"""
+
+from datetime import timedelta
+
+from .github import Repo
+from .main import parse_args
+from .repo_cache import RepoCache
+from .repo_source import RepoSourceBuilder
+from .repo_source_test import dummy_repo
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeListing:
+    """
+    Lists repositories most recently updated first, honoring the stop predicate.
+    """
+
+    def __init__(self, repos):
+        self.repos = repos
+        self.calls = 0
+        self.listed = []
+
+    def __call__(self, stop):
+        self.calls += 1
+        for repo in sorted(self.repos, key=lambda repo: repo.updated_at, reverse=True):
+            self.listed.append(repo.name)
+            if stop and stop(repo):
+                return
+            yield repo
+
+
+def _repo(name: str, updated_at: str):
+    repo_json = dummy_repo(name, f"jdoe/{name}").to_json()
+    repo_json["updated_at"] = updated_at
+    return Repo(repo_json)
+
+
+def test_repos_are_served_from_the_cache_within_the_ttl(tmp_path):
+    clock = FakeClock()
+    cache = RepoCache(str(tmp_path / "repos.db"), timedelta(hours=1), clock=clock)
+    listing = FakeListing([_repo("a", "2021-11-01T00:00:00Z")])
+
+    first = cache.get("org:acme", listing)
+    clock.now += 60
+    second = cache.get("org:acme", listing)
+
+    assert [repo.full_name for repo in first] == ["jdoe/a"]
+    assert [repo.full_name for repo in second] == ["jdoe/a"]
+    assert listing.calls == 1
+
+
+def test_refresh_stops_at_known_repos(tmp_path):
+    clock = FakeClock()
+    cache = RepoCache(str(tmp_path / "repos.db"), timedelta(hours=1), clock=clock)
+    listing = FakeListing(
+        [_repo("a", "2021-11-01T00:00:00Z"), _repo("b", "2021-11-02T00:00:00Z")]
+    )
+    cache.get("org:acme", listing)
+    listing.repos = [
+        _repo("a", "2021-11-01T00:00:00Z"),
+        _repo("b", "2021-11-03T00:00:00Z"),
+        _repo("c", "2021-11-04T00:00:00Z"),
+    ]
+    listing.listed = []
+    clock.now += 7200
+
+    repos = cache.get("org:acme", listing)
+
+    assert sorted(repo.name for repo in repos) == ["a", "b", "c"]
+    assert listing.listed == ["c", "b", "a"]
+    updated = {repo.name: repo.updated_at.day for repo in repos}
+    assert updated == {"a": 1, "b": 3, "c": 4}
+
+
+def test_full_refresh_forgets_deleted_repos(tmp_path):
+    clock = FakeClock()
+    cache = RepoCache(
+        str(tmp_path / "repos.db"),
+        timedelta(hours=1),
+        full_refresh_interval=timedelta(days=1),
+        clock=clock,
+    )
+    listing = FakeListing(
+        [_repo("a", "2021-11-01T00:00:00Z"), _repo("b", "2021-11-02T00:00:00Z")]
+    )
+    cache.get("org:acme", listing)
+    listing.repos = [_repo("b", "2021-11-02T00:00:00Z")]
+    clock.now += 2 * 86400
+
+    repos = cache.get("org:acme", listing)
+
+    assert [repo.name for repo in repos] == ["b"]
+
+
+def test_offline_cache_never_lists(tmp_path):
+    path = str(tmp_path / "repos.db")
+    RepoCache(path).get("org:acme", FakeListing([_repo("a", "2021-11-01T00:00:00Z")]))
+    listing = FakeListing([])
+
+    repos = RepoCache(path, ttl=timedelta(0), offline=True).get("org:acme", listing)
+    missing = RepoCache(path, offline=True).get("org:other", listing)
+
+    assert [repo.name for repo in repos] == ["a"]
+    assert not missing
+    assert listing.calls == 0
+
+
+class FakeCachedGitHub:
+    def __init__(self, repos):
+        self.auth = None
+        self.repos = repos
+        self.calls = []
+
+    def get_all_repos(self, sort: str, direction: str, stop=None):
+        self.calls.append((sort, direction))
+        return iter(self.repos)
+
+
+def test_repo_source_sorts_cached_repos_locally(tmp_path):
+    path = str(tmp_path / "repos.db")
+    github = FakeCachedGitHub(
+        [
+            dummy_repo("b", "jdoe/b", "2021-11-02T00:00:00Z"),
+            dummy_repo("c", "jdoe/c", "2021-11-03T00:00:00Z"),
+            dummy_repo("a", "jdoe/a", "2021-11-01T00:00:00Z"),
+        ]
+    )
+    args = parse_args(["list", "-u", "jdoe", "-t", "secret", "--repo-cache-db", path])
+    online = RepoSourceBuilder().with_github(github).with_args(args).build()
+    offline_args = parse_args(
+        [
+            "list",
+            "-u",
+            "jdoe",
+            "-t",
+            "secret",
+            "--repo-cache-db",
+            path,
+            "--cached",
+            "--sort",
+            "pushed",
+            "--direction",
+            "desc",
+        ]
+    )
+    offline = RepoSourceBuilder().with_github(github).with_args(offline_args).build()
+
+    by_name = [repo.name for repo in online.get()]
+    by_pushed = [repo.name for repo in offline.get()]
+
+    assert by_name == ["a", "b", "c"]
+    assert by_pushed == ["c", "b", "a"]
+    assert github.calls == [("updated", "desc")]
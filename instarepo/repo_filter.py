@@ -0,0 +1,153 @@
+"""
+Compiles repository filters into a single predicate.
+"""
+
+from __future__ import annotations
+import re
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import instarepo.github
+
+Check = Callable[[instarepo.github.Repo], bool]
+"""Returns True if a repository passes a filter."""
+
+# the relative cost of each kind of check
+COST_FLAG = 0
+COST_LOOKUP = 1
+COST_PREFIX = 2
+COST_PATTERN = 3
+# parsing a timestamp is the most expensive check, the result is kept on the repo
+COST_TIMESTAMP = 4
+
+
+class RepoFilter:
+    """
+    Collects the checks that a repository must pass and compiles
+    them into one predicate, which is evaluated once per repository.
+
+    The checks run cheapest first, so that most repositories are
+    rejected by a boolean or a set lookup before any regular expression
+    is matched or any timestamp is parsed. Checks of the same cost run
+    in the order they were added, which should be the most selective first.
+    """
+
+    def __init__(self):
+        self._checks: List[Tuple[int, Check]] = []
+
+    def add(self, check: Check, cost: int) -> RepoFilter:
+        """
+        Adds a check.
+
+        :param check: The check
+        :param cost: The relative cost of the check, see the `COST_` constants
+        """
+        self._checks.append((cost, check))
+        return self
+
+    def require_flag(self, name: str, value: bool) -> RepoFilter:
+        """
+        Keeps the repositories whose boolean field (e.g. "archived") has the given value.
+        """
+        return self.add(lambda repo: bool(getattr(repo, name)) == value, COST_FLAG)
+
+    def require_size(
+        self, minimum: Optional[int] = None, maximum: Optional[int] = None
+    ) -> RepoFilter:
+        """
+        Keeps the repositories whose size (in KB) is within the given inclusive bounds.
+        """
+        if minimum is not None:
+            self.add(lambda repo: repo.size >= minimum, COST_FLAG)
+        if maximum is not None:
+            self.add(lambda repo: repo.size <= maximum, COST_FLAG)
+        return self
+
+    def require_language(self, languages: Iterable[str], match: bool) -> RepoFilter:
+        """
+        Keeps the repositories whose language is (or is not, if `match` is False)
+        one of the given languages. An empty string stands for no language.
+        """
+        names = frozenset(languages)
+        return self.add(
+            lambda repo: ((repo.language or "") in names) == match, COST_LOOKUP
+        )
+
+    def require_topic(self, topics: Iterable[str], match: bool) -> RepoFilter:
+        """
+        Keeps the repositories that have at least one of the given topics,
+        or, if `match` is False, none of them.
+        """
+        names = frozenset(topic.lower() for topic in topics)
+        return self.add(
+            lambda repo: (not names.isdisjoint(repo.topics)) == match, COST_LOOKUP
+        )
+
+    def require_prefix(self, prefixes: Sequence[str], match: bool) -> RepoFilter:
+        """
+        Keeps the repositories whose name starts with one of the given prefixes,
+        or, if `match` is False, with none of them.
+        """
+        values = tuple(prefixes)
+        return self.add(lambda repo: repo.name.startswith(values) == match, COST_PREFIX)
+
+    def require_pattern(self, patterns: Sequence[str], match: bool) -> RepoFilter:
+        """
+        Keeps the repositories whose name matches one of the given regular expressions,
+        or, if `match` is False, none of them. The patterns are searched anywhere
+        in the name, unless they are anchored.
+        """
+        try:
+            regex = re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+        except re.error as ex:
+            raise ValueError(f"Invalid name pattern: {ex}") from ex
+        return self.add(
+            lambda repo: (regex.search(repo.name) is not None) == match, COST_PATTERN
+        )
+
+    def require_after(
+        self, key: Callable[[instarepo.github.Repo], datetime], threshold: datetime
+    ) -> RepoFilter:
+        """
+        Keeps the repositories whose timestamp, as returned by `key`, is after the given threshold.
+        """
+        return self.add(lambda repo: key(repo) > threshold, COST_TIMESTAMP)
+
+    def require_before(
+        self, key: Callable[[instarepo.github.Repo], datetime], threshold: datetime
+    ) -> RepoFilter:
+        """
+        Keeps the repositories whose timestamp, as returned by `key`, is before the given threshold.
+        """
+        return self.add(lambda repo: key(repo) < threshold, COST_TIMESTAMP)
+
+    def compile(self) -> Optional[Check]:
+        """
+        Compiles the checks into one predicate. Returns None if there are no checks.
+        """
+        checks = tuple(
+            check for _, check in sorted(self._checks, key=lambda item: item[0])
+        )
+        if not checks:
+            return None
+        if len(checks) == 1:
+            return checks[0]
+
+        def predicate(repo: instarepo.github.Repo) -> bool:
+            for check in checks:
+                if not check(repo):
+                    return False
+            return True
+
+        return predicate
+
+    def apply(
+        self, repos: Iterable[instarepo.github.Repo]
+    ) -> Iterable[instarepo.github.Repo]:
+        """
+        Filters the given repositories in one pass.
+        """
+        predicate = self.compile()
+        if predicate is None:
+            return repos
+        return (repo for repo in repos if predicate(repo))
@@ -0,0 +1,123 @@
+"""
+Unit tests for the repo_filter module.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from .github import Repo
+from .repo_filter import COST_FLAG, COST_PATTERN, RepoFilter
+from .repo_source_test import dummy_repo
+
+
+def _repo(name: str, **fields) -> Repo:
+    repo_json = dummy_repo(name, f"jdoe/{name}").to_json()
+    repo_json.update(fields)
+    return Repo(repo_json)
+
+
+def _names(repo_filter: RepoFilter, repos) -> list:
+    return [repo.name for repo in repo_filter.apply(repos)]
+
+
+def test_no_checks_returns_the_repos_unchanged():
+    repos = [_repo("a")]
+    assert RepoFilter().compile() is None
+    assert RepoFilter().apply(repos) is repos
+
+
+def test_cheap_checks_run_first():
+    calls = []
+
+    def check(name, result):
+        def run(_repo):
+            calls.append(name)
+            return result
+
+        return run
+
+    predicate = (
+        RepoFilter()
+        .add(check("pattern", True), COST_PATTERN)
+        .add(check("flag", False), COST_FLAG)
+        .compile()
+    )
+
+    assert not predicate(_repo("a"))
+    assert calls == ["flag"]
+
+
+def test_multiple_prefixes():
+    repos = [_repo("api-x"), _repo("web-y"), _repo("lib-z")]
+    assert _names(RepoFilter().require_prefix(["api-", "web-"], True), repos) == [
+        "api-x",
+        "web-y",
+    ]
+    assert _names(RepoFilter().require_prefix(["api-", "web-"], False), repos) == [
+        "lib-z"
+    ]
+
+
+def test_patterns():
+    repos = [_repo("service-1"), _repo("service-two"), _repo("docs")]
+    assert _names(RepoFilter().require_pattern([r"-\d+$", "^docs"], True), repos) == [
+        "service-1",
+        "docs",
+    ]
+    assert _names(RepoFilter().require_pattern([r"\d"], False), repos) == [
+        "service-two",
+        "docs",
+    ]
+
+
+def test_invalid_pattern():
+    with pytest.raises(ValueError):
+        RepoFilter().require_pattern(["("], True)
+
+
+def test_topics():
+    repos = [
+        _repo("a", topics=["cli", "python"]),
+        _repo("b", topics=["web"]),
+        _repo("c"),
+    ]
+    assert _names(RepoFilter().require_topic(["CLI", "web"], True), repos) == [
+        "a",
+        "b",
+    ]
+    assert _names(RepoFilter().require_topic(["cli"], False), repos) == ["b", "c"]
+
+
+def test_size_bounds():
+    repos = [
+        _repo("small", size=10),
+        _repo("medium", size=500),
+        _repo("big", size=9000),
+    ]
+    assert _names(RepoFilter().require_size(100, 1000), repos) == ["medium"]
+    assert _names(RepoFilter().require_size(maximum=500), repos) == ["small", "medium"]
+
+
+def test_language_without_a_value_matches_repos_without_language():
+    repos = [_repo("a", language="Go"), _repo("b", language=None)]
+    assert _names(RepoFilter().require_language([""], True), repos) == ["b"]
+    assert _names(RepoFilter().require_language(["Go", ""], False), repos) == []
+
+
+def test_all_checks_in_one_pass():
+    threshold = datetime(2021, 11, 1, tzinfo=timezone.utc)
+    repos = [
+        _repo("api-new", pushed_at="2021-11-02T00:00:00Z", topics=["cli"]),
+        _repo("api-old", pushed_at="2021-10-01T00:00:00Z", topics=["cli"]),
+        _repo("api-archived", archived=True, topics=["cli"]),
+        _repo("web-new", pushed_at="2021-11-02T00:00:00Z", topics=["cli"]),
+    ]
+    repo_filter = (
+        RepoFilter()
+        .require_after(lambda repo: repo.pushed_at, threshold)
+        .require_prefix(["api-"], True)
+        .require_topic(["cli"], True)
+        .require_flag("archived", False)
+    )
+    assert _names(repo_filter, repos) == ["api-new"]
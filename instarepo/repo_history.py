@@ -0,0 +1,184 @@
+"""
+Keeps a history of the outcomes of processing each repository,
+to process first the repositories that are most likely to need fixes.
+"""
+
+import contextlib
+import os
+import os.path
+import sqlite3
+import statistics
+import time
+from typing import Callable, Dict, Iterable, List
+
+import instarepo.github
+
+DEFAULT_MAX_RUNS = 10
+"""How many of the most recent runs of each repository are kept."""
+
+DEFAULT_DURATION = 1.0
+"""The expected duration (in seconds) of processing a repository, when nothing is known."""
+
+# durations are rounded up to this, so that a fast run does not outweigh everything else
+_MIN_DURATION = 0.1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    full_name TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    changed INTEGER NOT NULL,
+    pull_request INTEGER NOT NULL,
+    failed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_full_name ON runs (full_name, finished_at);
+"""
+
+
+class RunOutcome:
+    """
+    What processing a repository achieved.
+    """
+
+    def __init__(self, changed: bool = False, pull_request: bool = False):
+        """
+        Creates an instance of this class.
+
+        :param changed: The fixers produced changes
+        :param pull_request: A pull request was created
+        """
+        self.changed = changed
+        self.pull_request = pull_request
+
+
+class RepoStats:
+    """
+    Aggregates the recent runs of a repository.
+    """
+
+    def __init__(
+        self,
+        runs: int,
+        changes: int,
+        pull_requests: int,
+        failures: int,
+        mean_duration: float,
+    ):
+        self.runs = runs
+        self.changes = changes
+        self.pull_requests = pull_requests
+        self.failures = failures
+        self.mean_duration = mean_duration
+
+    @property
+    def change_rate(self) -> float:
+        """
+        The likelihood that the next run produces changes, smoothed so that
+        a few runs do not rule a repository in or out completely.
+        Failed runs are wasted work, so they do not count as changes.
+        """
+        return (self.changes + 1) / (self.runs + 2)
+
+
+class RepoHistory:
+    """
+    Keeps the outcomes and durations of the last runs of each repository in a SQLite database.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_runs: int = DEFAULT_MAX_RUNS,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Creates an instance of this class.
+
+        :param path: The path of the SQLite database. It is created if it does not exist
+        :param max_runs: How many of the most recent runs of each repository are kept
+        :param clock: Returns the current time in seconds since the epoch
+        """
+        self.path = path
+        self.max_runs = max_runs
+        self._clock = clock
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def record(
+        self, full_name: str, duration: float, outcome: RunOutcome, failed: bool
+    ):
+        """
+        Records a run of a repository, forgetting its oldest runs beyond `max_runs`.
+
+        :param full_name: The full name of the repository
+        :param duration: How long processing the repository took, in seconds
+        :param outcome: What the run achieved
+        :param failed: The run raised an error
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO runs (full_name, finished_at, duration, changed, pull_request, failed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    full_name,
+                    self._clock(),
+                    duration,
+                    int(outcome.changed and not failed),
+                    int(outcome.pull_request),
+                    int(failed),
+                ),
+            )
+            connection.execute(
+                "DELETE FROM runs WHERE full_name = ? AND rowid NOT IN "
+                "(SELECT rowid FROM runs WHERE full_name = ? "
+                "ORDER BY finished_at DESC LIMIT ?)",
+                (full_name, full_name, self.max_runs),
+            )
+
+    def stats(self) -> Dict[str, RepoStats]:
+        """
+        Gets the aggregated runs of every known repository, by full name.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT full_name, COUNT(*), SUM(changed), SUM(pull_request), "
+                "SUM(failed), AVG(duration) FROM runs GROUP BY full_name"
+            ).fetchall()
+        return {row[0]: RepoStats(*row[1:]) for row in rows}
+
+    def order(
+        self, repos: Iterable[instarepo.github.Repo]
+    ) -> List[instarepo.github.Repo]:
+        """
+        Sorts the given repositories so that the ones that are likely to change
+        and cheap to process come first, i.e. by the expected changes per second.
+
+        Repositories without history are expected to change half of the time
+        and to take the median duration of the known ones.
+        Ties keep the original order.
+        """
+        stats = self.stats()
+        durations = [repo_stats.mean_duration for repo_stats in stats.values()]
+        default_duration = (
+            statistics.median(durations) if durations else DEFAULT_DURATION
+        )
+
+        def score(repo: instarepo.github.Repo) -> float:
+            repo_stats = stats.get(repo.full_name)
+            if repo_stats is None:
+                return 0.5 / max(default_duration, _MIN_DURATION)
+            return repo_stats.change_rate / max(repo_stats.mean_duration, _MIN_DURATION)
+
+        return sorted(repos, key=score, reverse=True)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # a connection per operation, like instarepo.repo_cache
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
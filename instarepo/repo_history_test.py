@@ -0,0 +1,59 @@
+"""
+Unit tests for the repo_history module.
+"""
+
+from .repo_history import RepoHistory, RunOutcome
+from .repo_source_test import dummy_repo
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def _history(tmp_path, **kwargs) -> RepoHistory:
+    return RepoHistory(str(tmp_path / "history.db"), clock=FakeClock(), **kwargs)
+
+
+def test_keeps_the_most_recent_runs(tmp_path):
+    history = _history(tmp_path, max_runs=2)
+    history.record("jdoe/a", 1.0, RunOutcome(changed=True), False)
+    history.record("jdoe/a", 3.0, RunOutcome(), False)
+    history.record("jdoe/a", 5.0, RunOutcome(changed=True, pull_request=True), False)
+    history.record("jdoe/b", 2.0, RunOutcome(changed=True), True)
+
+    stats = history.stats()
+
+    assert (stats["jdoe/a"].runs, stats["jdoe/a"].changes) == (2, 1)
+    assert stats["jdoe/a"].pull_requests == 1
+    assert stats["jdoe/a"].mean_duration == 4.0
+    # failed runs do not count as changes
+    assert (stats["jdoe/b"].changes, stats["jdoe/b"].failures) == (0, 1)
+
+
+def test_order_prefers_likely_changes_and_quick_repos(tmp_path):
+    history = _history(tmp_path)
+    for _ in range(3):
+        history.record("jdoe/never", 1.0, RunOutcome(), False)
+        history.record("jdoe/always-slow", 10.0, RunOutcome(changed=True), False)
+        history.record("jdoe/always-quick", 1.0, RunOutcome(changed=True), False)
+    repos = [
+        dummy_repo("never", "jdoe/never"),
+        dummy_repo("always-slow", "jdoe/always-slow"),
+        dummy_repo("new", "jdoe/new"),
+        dummy_repo("always-quick", "jdoe/always-quick"),
+    ]
+
+    ordered = [repo.name for repo in history.order(repos)]
+
+    # the new repo is expected to change half of the time, in the median duration
+    assert ordered == ["always-quick", "new", "never", "always-slow"]
+
+
+def test_order_without_history_keeps_the_original_order(tmp_path):
+    repos = [dummy_repo("b", "jdoe/b"), dummy_repo("a", "jdoe/a")]
+    assert _history(tmp_path).order(repos) == repos
@@ -0,0 +1,52 @@
+"""
+Saves and loads a selection of repositories as a JSONL snapshot.
+"""
+
+import json
+import os
+import os.path
+import tempfile
+from typing import Iterable, Iterator, List
+
+import instarepo.github
+
+
+def save_selection(
+    path: str, repos: Iterable[instarepo.github.Repo]
+) -> Iterator[instarepo.github.Repo]:
+    """
+    Passes the given repositories through, writing each one as a line of JSON.
+
+    The file is replaced only after all repositories have been consumed,
+    so that an interrupted run does not leave a partial selection behind.
+
+    :param path: The path of the snapshot file
+    :param repos: The selected repositories
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    completed = False
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            for repo in repos:
+                file.write(json.dumps(repo.to_json(), separators=(",", ":")))
+                file.write("\n")
+                yield repo
+        os.replace(temp_path, path)
+        completed = True
+    finally:
+        if not completed:
+            os.remove(temp_path)
+
+
+def load_selection(path: str) -> List[instarepo.github.Repo]:
+    """
+    Loads the repositories that were saved with `save_selection`, in the same order.
+
+    :param path: The path of the snapshot file
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        return [
+            instarepo.github.Repo(json.loads(line)) for line in file if line.strip()
+        ]
@@ -0,0 +1,93 @@
+"""
+Unit tests for the repo_selection module.
+"""
+
+from .main import parse_args
+from .repo_selection import load_selection, save_selection
+from .repo_source import RepoSourceBuilder
+from .repo_source_test import dummy_repo
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "selection.jsonl")
+    repos = [dummy_repo("b", "jdoe/b"), dummy_repo("a", "jdoe/a")]
+    repos[0].topics = ["cli"]
+    repos[0].size = 42
+
+    passed = list(save_selection(path, repos))
+    loaded = load_selection(path)
+
+    assert passed == repos
+    assert [repo.full_name for repo in loaded] == ["jdoe/b", "jdoe/a"]
+    assert [repo.to_json() for repo in loaded] == [repo.to_json() for repo in repos]
+    with open(path, encoding="utf-8") as file:
+        assert len(file.read().splitlines()) == 2
+
+
+def test_interrupted_save_keeps_the_previous_selection(tmp_path):
+    path = str(tmp_path / "selection.jsonl")
+    list(save_selection(path, [dummy_repo("old", "jdoe/old")]))
+
+    saving = save_selection(
+        path, [dummy_repo("a", "jdoe/a"), dummy_repo("b", "jdoe/b")]
+    )
+    next(saving)
+    saving.close()
+
+    assert [repo.name for repo in load_selection(path)] == ["old"]
+    assert [p.name for p in tmp_path.iterdir()] == ["selection.jsonl"]
+
+
+class FakeListingGitHub:
+    def __init__(self, repos):
+        self.auth = None
+        self.repos = repos
+        self.calls = 0
+
+    def get_all_repos(self, sort: str, direction: str, stop=None):
+        self.calls += 1
+        return iter(self.repos)
+
+
+def test_repo_source_reuses_the_saved_selection(tmp_path):
+    path = str(tmp_path / "selection.jsonl")
+    github = FakeListingGitHub(
+        [dummy_repo("api-a", "jdoe/api-a"), dummy_repo("web-b", "jdoe/web-b")]
+    )
+    save_args = parse_args(
+        [
+            "list",
+            "-u",
+            "jdoe",
+            "-t",
+            "secret",
+            "--only-name-prefix",
+            "api-",
+            "--save-selection",
+            path,
+        ]
+    )
+    load_args = parse_args(
+        [
+            "analyze",
+            "-u",
+            "jdoe",
+            "-t",
+            "secret",
+            "--since",
+            "2021-01-01",
+            "--repos-from",
+            path,
+        ]
+    )
+
+    saved = list(
+        RepoSourceBuilder().with_github(github).with_args(save_args).build().get()
+    )
+    loaded = list(
+        RepoSourceBuilder().with_github(github).with_args(load_args).build().get()
+    )
+
+    assert [repo.full_name for repo in saved] == ["jdoe/api-a"]
+    assert [repo.full_name for repo in loaded] == ["jdoe/api-a"]
+    assert github.calls == 1
@@ -0,0 +1,92 @@
+"""
+Splits a repository selection into disjoint shards, so that several
+workers can process it without coordinating.
+"""
+
+import hashlib
+from typing import Dict, Iterable, List
+
+import instarepo.github
+
+SHARD_BY_NAME = "name"
+SHARD_BY_SIZE = "size"
+
+
+class Shard:
+    """
+    Identifies one of `count` shards, numbered from 1.
+    """
+
+    def __init__(self, index: int, count: int):
+        if count < 1 or index < 1 or index > count:
+            raise ValueError(f"Invalid shard {index}/{count}")
+        self.index = index
+        self.count = count
+
+    @staticmethod
+    def parse(value: str):
+        """
+        Parses a shard in the format INDEX/COUNT, e.g. 2/4.
+        """
+        index, separator, count = value.partition("/")
+        if not separator or not index.isdigit() or not count.isdigit():
+            raise ValueError(f"Invalid shard {value}, expected INDEX/COUNT e.g. 2/4")
+        return Shard(int(index), int(count))
+
+    def select(
+        self, repos: Iterable[instarepo.github.Repo], by: str = SHARD_BY_NAME
+    ) -> Iterable[instarepo.github.Repo]:
+        """
+        Keeps the repositories that belong to this shard, in their original order.
+
+        :param repos: The whole selection
+        :param by: SHARD_BY_NAME assigns each repository by a hash of its full name,
+        so that the assignment does not depend on the rest of the selection.
+        SHARD_BY_SIZE balances the total size of the shards, which needs
+        every worker to see the same selection (e.g. with --repos-from)
+        """
+        if self.count == 1:
+            return repos
+        if by == SHARD_BY_NAME:
+            return (
+                repo
+                for repo in repos
+                if shard_number(repo.full_name, self.count) == self.index
+            )
+        if by == SHARD_BY_SIZE:
+            repos = list(repos)
+            assignment = balance_by_size(repos, self.count)
+            return (repo for repo in repos if assignment[repo.full_name] == self.index)
+        raise ValueError(f"Invalid shard key {by}")
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+
+def shard_number(full_name: str, count: int) -> int:
+    """
+    Gets the shard (numbered from 1) of a repository, by a hash of its full name
+    that is the same on every machine and every run.
+    """
+    return _hash(full_name) % count + 1
+
+
+def balance_by_size(repos: List[instarepo.github.Repo], count: int) -> Dict[str, int]:
+    """
+    Assigns the given repositories to shards (numbered from 1), biggest first,
+    each one to the shard with the smallest total size so far.
+    Ties are broken by the hash of the full name, so the result is reproducible.
+    """
+    loads = [0] * count
+    assignment: Dict[str, int] = {}
+    for repo in sorted(repos, key=lambda repo: (-repo.size, _hash(repo.full_name))):
+        shard = min(range(count), key=lambda index: (loads[index], index))
+        # counting every repository as at least 1 KB spreads the empty ones as well
+        loads[shard] += repo.size + 1
+        assignment[repo.full_name] = shard + 1
+    return assignment
+
+
+def _hash(full_name: str) -> int:
+    digest = hashlib.sha256(full_name.lower().encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
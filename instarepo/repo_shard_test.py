@@ -0,0 +1,79 @@
+"""
+Unit tests for the repo_shard module.
+"""
+
+import pytest
+
+from .main import parse_args
+from .repo_selection_test import FakeListingGitHub
+from .repo_shard import SHARD_BY_SIZE, Shard, balance_by_size, shard_number
+from .repo_source import RepoSourceBuilder
+from .repo_source_test import dummy_repo
+
+
+def _repos(count: int):
+    return [dummy_repo(f"repo-{i}", f"acme/repo-{i}") for i in range(count)]
+
+
+def test_parse():
+    shard = Shard.parse("2/4")
+    assert (shard.index, shard.count) == (2, 4)
+
+
+@pytest.mark.parametrize("value", ["2", "0/4", "5/4", "a/b", "1/0"])
+def test_parse_invalid(value):
+    with pytest.raises(ValueError):
+        Shard.parse(value)
+
+
+def test_shards_are_disjoint_and_complete():
+    repos = _repos(100)
+    shards = [list(Shard(index, 3).select(repos)) for index in (1, 2, 3)]
+    names = [repo.full_name for shard in shards for repo in shard]
+    assert sorted(names) == sorted(repo.full_name for repo in repos)
+    assert all(shard for shard in shards)
+
+
+def test_shard_number_is_stable():
+    # the same on every machine and run, regardless of PYTHONHASHSEED
+    assert [shard_number(f"acme/repo-{i}", 4) for i in range(5)] == [4, 2, 1, 1, 2]
+    assert shard_number("ACME/Repo-0", 4) == shard_number("acme/repo-0", 4)
+
+
+def test_shard_by_name_does_not_depend_on_the_rest_of_the_selection():
+    repos = _repos(20)
+    shard = Shard(1, 2)
+    removed = {repo.full_name for repo in repos[:5]}
+    full = {repo.full_name for repo in shard.select(repos)}
+    partial = {repo.full_name for repo in shard.select(repos[5:])}
+    assert partial == full - removed
+
+
+def test_balance_by_size():
+    repos = _repos(4)
+    for repo, size in zip(repos, [900, 500, 400, 10]):
+        repo.size = size
+    assignment = balance_by_size(repos, 2)
+    assert assignment == {
+        "acme/repo-0": 1,
+        "acme/repo-1": 2,
+        "acme/repo-2": 2,
+        "acme/repo-3": 1,
+    }
+    assert [repo.name for repo in Shard(2, 2).select(repos, SHARD_BY_SIZE)] == [
+        "repo-1",
+        "repo-2",
+    ]
+
+
+def test_repo_source_shards_the_selection():
+    github = FakeListingGitHub(_repos(10))
+    shards = []
+    for index in (1, 2):
+        args = parse_args(
+            ["list", "-u", "jdoe", "-t", "secret", "--shard", f"{index}/2"]
+        )
+        repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+        shards.append([repo.name for repo in repo_source.get()])
+    assert sorted(shards[0] + shards[1]) == sorted(repo.name for repo in _repos(10))
+    assert not set(shards[0]) & set(shards[1])
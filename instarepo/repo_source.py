@@ -3,13 +3,19 @@ Fetches repository info from GitHub.
 """
 
 from __future__ import annotations
+import heapq
+import logging
+import queue
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import Iterable, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from enum import Enum, auto, unique
 
 import instarepo.github
-
-from .credentials import build_requests_auth
+import instarepo.repo_cache
+import instarepo.repo_selection
+import instarepo.repo_shard
+from instarepo.repo_filter import RepoFilter
 
 
 @unique
@@ -42,12 +48,61 @@ class StringFilter:
     The combination of `value` and `mode` allows to
     include or exclude repositories based on the value of
     the property that is being filtered on.
+    `value` can also be a list of values, matching any of them.
     """
 
-    def __init__(self, value: str = "", mode: FilterMode = FilterMode.ALLOW):
+    def __init__(
+        self,
+        value: Union[str, Sequence[str]] = "",
+        mode: FilterMode = FilterMode.ALLOW,
+    ):
         self.value = value
         self.mode = mode
 
+    @property
+    def values(self) -> Tuple[str, ...]:
+        """
+        Gets the values of the filter.
+        """
+        if isinstance(self.value, str):
+            return (self.value,)
+        return tuple(self.value)
+
+    @property
+    def match(self) -> bool:
+        """
+        Whether repositories have to match the values (ONLY) or not (DENY).
+        """
+        return self.mode == FilterMode.ONLY
+
+    def is_active(self) -> bool:
+        """
+        Checks if the filter excludes any repositories.
+        """
+        if self.mode == FilterMode.ALLOW:
+            return False
+        if self.mode not in (FilterMode.ONLY, FilterMode.DENY):
+            raise ValueError(f"Invalid filter mode {self.mode}")
+        return bool(self.values)
+
+
+TIME_FIELDS = ("created", "updated", "pushed")
+"""The sort fields that are timestamps, which can also be filtered on."""
+
+
+class RepoOwner:
+    """
+    Identifies an account whose repositories should be processed.
+
+    `kind` is either "org" or "user".
+    """
+
+    def __init__(self, kind: str, name: str):
+        if kind not in ("org", "user"):
+            raise ValueError(f"Invalid repository owner kind {kind}")
+        self.kind = kind
+        self.name = name
+
 
 class RepoSource:
     """
@@ -65,6 +120,21 @@ class RepoSource:
         language: StringFilter,
         pushed_after,
         pushed_before,
+        owners: Optional[List[RepoOwner]] = None,
+        search: bool = True,
+        created_after=None,
+        created_before=None,
+        updated_after=None,
+        updated_before=None,
+        cache: Optional[instarepo.repo_cache.RepoCache] = None,
+        name_pattern: Optional[StringFilter] = None,
+        topic: Optional[StringFilter] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        repos_from: Optional[str] = None,
+        save_selection: Optional[str] = None,
+        shard: Optional[instarepo.repo_shard.Shard] = None,
+        shard_by: str = instarepo.repo_shard.SHARD_BY_NAME,
     ):
         """
         Creates an instance of this class
@@ -76,10 +146,29 @@ class RepoSource:
         :param direction: The direction to sort by
         :param archived: Determines how to filter archived repositories
         :param forks: Determines how to filter forks
-        :param repo_prefix: Optionally filter repositories whose name starts with this prefix
-        :param language: Optionally filter repositories by their language
+        :param repo_prefix: Optionally filter repositories whose name starts with these prefixes
+        :param language: Optionally filter repositories by their languages
         :param pushed_after: Optionally filter repositories that were pushed after the given timedelta
         :param pushed_before: Optionally filter repositories that were pushed before the given timedelta
+        :param owners: Optionally list the repositories of these organizations and users,
+        instead of the repositories of the authenticated user
+        :param search: Use the search API to filter repositories on the server side,
+        when the filters are selective enough
+        :param created_after: Optionally filter repositories that were created after the given timedelta
+        :param created_before: Optionally filter repositories that were created before the given timedelta
+        :param updated_after: Optionally filter repositories that were updated after the given timedelta
+        :param updated_before: Optionally filter repositories that were updated before the given timedelta
+        :param cache: Optionally serve the repositories from this cache,
+        which is refreshed as needed. Sorting is then done locally
+        :param name_pattern: Optionally filter repositories whose name matches these regular expressions
+        :param topic: Optionally filter repositories by their topics
+        :param min_size: Optionally filter repositories that are at least this big (in KB)
+        :param max_size: Optionally filter repositories that are at most this big (in KB)
+        :param repos_from: Optionally use the repositories of this snapshot file as they are,
+        instead of listing and filtering them
+        :param save_selection: Optionally save the selected repositories to this snapshot file
+        :param shard: Optionally keep only the repositories of this shard
+        :param shard_by: How repositories are assigned to shards, see `instarepo.repo_shard.Shard.select`
         """
         self.github = github
         self.sort = sort
@@ -90,66 +179,224 @@ class RepoSource:
         self.language = language
         self.pushed_after = pushed_after
         self.pushed_before = pushed_before
+        self.owners = owners or []
+        self.search = search
+        self.created_after = created_after
+        self.created_before = created_before
+        self.updated_after = updated_after
+        self.updated_before = updated_before
+        self.cache = cache
+        self.name_pattern = name_pattern or StringFilter()
+        self.topic = topic or StringFilter()
+        self.min_size = min_size
+        self.max_size = max_size
+        self.repos_from = repos_from
+        self.save_selection = save_selection
+        self.shard = shard
+        self.shard_by = shard_by
 
     def get(self) -> Iterable[instarepo.github.Repo]:
         """
         Retrieves repository information from GitHub.
         """
-        return self._filter_pushed_after(
-            self._filter_pushed_before(
-                self._filter_language(
-                    self._filter_prefix(
-                        self._filter_forks(
-                            self._filter_archived(
-                                self.github.get_all_repos(self.sort, self.direction)
-                            )
-                        )
-                    )
+        if self.repos_from:
+            # the snapshot is already filtered and sorted
+            repos = instarepo.repo_selection.load_selection(self.repos_from)
+        else:
+            now = datetime.now(timezone.utc)
+            repos = self.compile_filter(now).apply(self._get_unfiltered(now))
+        if self.shard:
+            repos = self.shard.select(repos, self.shard_by)
+        if self.save_selection:
+            repos = instarepo.repo_selection.save_selection(self.save_selection, repos)
+        return repos
+
+    def compile_filter(self, now: datetime) -> RepoFilter:
+        """
+        Compiles all filters into one `RepoFilter`.
+
+        :param now: The current time, which the time filters are relative to
+        """
+        repo_filter = RepoFilter()
+        if self.archived != FilterMode.ALLOW:
+            repo_filter.require_flag("archived", self.archived == FilterMode.ONLY)
+        if self.forks != FilterMode.ALLOW:
+            repo_filter.require_flag("fork", self.forks == FilterMode.ONLY)
+        repo_filter.require_size(self.min_size, self.max_size)
+        _add_language(repo_filter, self.language)
+        if self.topic.is_active():
+            repo_filter.require_topic(self.topic.values, self.topic.match)
+        _add_name_prefix(repo_filter, self.repo_prefix)
+        if self.name_pattern.is_active():
+            repo_filter.require_pattern(
+                self.name_pattern.values, self.name_pattern.match
+            )
+        for field in TIME_FIELDS:
+            key = sort_key(field)
+            after, before = self._time_bounds(field)
+            if after:
+                repo_filter.require_after(key, now - after)
+            if before:
+                repo_filter.require_before(key, now - before)
+        return repo_filter
+
+    def _get_unfiltered(self, now: datetime) -> Iterable[instarepo.github.Repo]:
+        if self.cache:
+            return self._get_cached()
+        query = self._search_query(now) if self.search else None
+        if query:
+            repos = self.github.search_repos(query)
+            if repos is not None:
+                return sorted(
+                    repos, key=sort_key(self.sort), reverse=self.direction == "desc"
                 )
+            logging.info(
+                "Could not search all repositories matching %s, listing all repositories instead",
+                query,
             )
+        stop = self._stop_predicate(now)
+        if not self.owners:
+            return self.github.get_all_repos(self.sort, self.direction, stop=stop)
+        return merge_sorted(
+            [
+                _prefetch(self._get_owner_repos(owner, self.sort, self.direction, stop))
+                for owner in self.owners
+            ],
+            self.sort,
+            self.direction,
         )
 
-    def _filter_archived(self, repos: Iterable[instarepo.github.Repo]):
-        if self.archived == FilterMode.ONLY:
-            return (repo for repo in repos if repo.archived)
-        elif self.archived == FilterMode.DENY:
-            return (repo for repo in repos if not repo.archived)
-        else:
-            return repos
+    def _get_owner_repos(
+        self, owner: RepoOwner, sort: str, direction: str, stop
+    ) -> Iterable[instarepo.github.Repo]:
+        if owner.kind == "org":
+            return self.github.get_org_repos(owner.name, sort, direction, stop=stop)
+        if self._is_authenticated_user(owner):
+            # includes private repositories
+            return self.github.get_all_repos(sort, direction, stop=stop)
+        return self.github.get_user_repos(owner.name, sort, direction, stop=stop)
+
+    def _is_authenticated_user(self, owner: RepoOwner) -> bool:
+        return owner.kind == "user" and owner.name == getattr(
+            self.github.auth, "username", None
+        )
 
-    def _filter_forks(self, repos: Iterable[instarepo.github.Repo]):
-        if self.forks == FilterMode.ONLY:
-            return (repo for repo in repos if repo.fork)
-        elif self.forks == FilterMode.DENY:
-            return (repo for repo in repos if not repo.fork)
-        else:
-            return repos
+    def _get_cached(self) -> Iterable[instarepo.github.Repo]:
+        """
+        Gets the repositories from the cache, sorting them locally.
+        The cache refreshes itself by listing the most recently updated repositories first.
+        """
+        sources = []
+        if not self.owners:
+            username = getattr(self.github.auth, "username", None) or ""
+            sources.append(
+                (
+                    f"viewer:{username}",
+                    lambda stop: self.github.get_all_repos(
+                        "updated", "desc", stop=stop
+                    ),
+                )
+            )
+        for owner in self.owners:
+            if self._is_authenticated_user(owner):
+                source = f"viewer:{owner.name}"
+            else:
+                source = f"{owner.kind}:{owner.name}"
+            sources.append(
+                (
+                    source,
+                    lambda stop, owner=owner: self._get_owner_repos(
+                        owner, "updated", "desc", stop
+                    ),
+                )
+            )
+        repos: Dict[str, instarepo.github.Repo] = {}
+        for source, fetch in sources:
+            for repo in self.cache.get(source, fetch):
+                repos.setdefault(repo.full_name, repo)
+        return sorted(
+            repos.values(), key=sort_key(self.sort), reverse=self.direction == "desc"
+        )
 
-    def _filter_prefix(self, repos: Iterable[instarepo.github.Repo]):
-        return filter_by_name_prefix(repos, self.repo_prefix)
+    def _time_bounds(self, field: str):
+        """
+        Gets the `after` and `before` time filters of the given sort field.
+        """
+        return getattr(self, f"{field}_after"), getattr(self, f"{field}_before")
 
-    def _filter_language(self, repos: Iterable[instarepo.github.Repo]):
-        return filter_by_language(repos, self.language)
+    def _stop_predicate(self, now: datetime):
+        """
+        Gets a predicate that tells the paginator when no later repository can match,
+        because the repositories are sorted on a field that is also filtered on.
+        Returns None if pagination has to go through all pages.
+        """
+        if self.sort not in TIME_FIELDS:
+            return None
+        key = sort_key(self.sort)
+        after, before = self._time_bounds(self.sort)
+        if self.direction == "desc" and after:
+            return lambda repo: key(repo) + after <= now
+        if self.direction == "asc" and before:
+            return lambda repo: key(repo) + before >= now
+        return None
 
-    def _filter_pushed_after(self, repos: Iterable[instarepo.github.Repo]):
-        if self.pushed_after:
-            return (
-                repo
-                for repo in repos
-                if repo.pushed_at + self.pushed_after > datetime.now(timezone.utc)
-            )
+    def _search_query(self, now: datetime) -> Optional[str]:
+        """
+        Translates the filters into a search query.
+
+        Returns None unless at least one filter is selective, because then listing
+        is cheaper than searching (the search API has a much lower rate limit).
+        The client side filters are applied to the search results as well,
+        covering the filters that the search syntax cannot express
+        (e.g. name prefixes).
+        """
+        qualifiers = []
+        selective = False
+        if self.language.mode == FilterMode.ONLY and len(self.language.values) == 1:
+            if self.language.values[0]:
+                qualifiers.append(f"language:{_quote(self.language.values[0])}")
+                selective = True
+        if self.topic.mode == FilterMode.ONLY and len(self.topic.values) == 1:
+            qualifiers.append(f"topic:{_quote(self.topic.values[0])}")
+            selective = True
+        if self.min_size is not None:
+            qualifiers.append(f"size:>={self.min_size}")
+        if self.max_size is not None:
+            qualifiers.append(f"size:<={self.max_size}")
+        # the search API cannot filter on when a repository was updated
+        for field in ("pushed", "created"):
+            after, before = self._time_bounds(field)
+            if after:
+                # whole days keep the query (and its cache entry) stable,
+                # the exact bounds are checked on the client side
+                qualifiers.append(f"{field}:>={_search_date(now - after)}")
+                selective = True
+            if before:
+                qualifiers.append(f"{field}:<={_search_date(now - before)}")
+                selective = True
+        if self.archived == FilterMode.ONLY:
+            qualifiers.append("archived:true")
+            selective = True
+        elif self.archived == FilterMode.DENY:
+            qualifiers.append("archived:false")
+        if self.forks == FilterMode.ONLY:
+            qualifiers.append("fork:only")
+            selective = True
+        elif self.forks == FilterMode.ALLOW:
+            qualifiers.append("fork:true")
         else:
-            return repos
-
-    def _filter_pushed_before(self, repos: Iterable[instarepo.github.Repo]):
-        if self.pushed_before:
-            return (
-                repo
-                for repo in repos
-                if repo.pushed_at + self.pushed_before < datetime.now(timezone.utc)
-            )
+            # forks are excluded from search results by default
+            qualifiers.append("fork:false")
+        if not selective:
+            return None
+        if self.owners:
+            owners = [f"{owner.kind}:{owner.name}" for owner in self.owners]
         else:
-            return repos
+            username = getattr(self.github.auth, "username", None)
+            if not username:
+                return None
+            owners = [f"user:{username}"]
+        return " ".join(owners + qualifiers)
 
 
 class RepoSourceBuilder:
@@ -169,8 +416,23 @@ class RepoSourceBuilder:
         self.forks = FilterMode.DENY
         self.repo_prefix = StringFilter()
         self.language = StringFilter()
+        self.name_pattern = StringFilter()
+        self.topic = StringFilter()
+        self.min_size: Optional[int] = None
+        self.max_size: Optional[int] = None
+        self.repos_from: Optional[str] = None
+        self.save_selection: Optional[str] = None
+        self.shard: Optional[instarepo.repo_shard.Shard] = None
+        self.shard_by = instarepo.repo_shard.SHARD_BY_NAME
         self.pushed_after = None
         self.pushed_before = None
+        self.created_after = None
+        self.created_before = None
+        self.updated_after = None
+        self.updated_before = None
+        self.cache: Optional[instarepo.repo_cache.RepoCache] = None
+        self.owners: List[RepoOwner] = []
+        self.search = True
 
     def with_github(self, github: instarepo.github.GitHub):
         """
@@ -188,7 +450,7 @@ class RepoSourceBuilder:
         a read-only GitHub client.
         """
         if self.github is None:
-            self.github = instarepo.github.GitHub(auth=build_requests_auth(args))
+            self.github = instarepo.github.build_github(args)
         if "sort" in args:
             self.sort = args.sort
         if "direction" in args:
@@ -207,8 +469,48 @@ class RepoSourceBuilder:
         elif args.except_language:
             self.language = StringFilter(args.except_language, FilterMode.DENY)
 
+        if "only_name_regex" in args:
+            if args.only_name_regex:
+                self.name_pattern = StringFilter(args.only_name_regex, FilterMode.ONLY)
+            elif args.except_name_regex:
+                self.name_pattern = StringFilter(
+                    args.except_name_regex, FilterMode.DENY
+                )
+            if args.only_topic:
+                self.topic = StringFilter(args.only_topic, FilterMode.ONLY)
+            elif args.except_topic:
+                self.topic = StringFilter(args.except_topic, FilterMode.DENY)
+            self.min_size = args.min_size
+            self.max_size = args.max_size
+
         self.pushed_after = parse_timedelta(args.pushed_after)
         self.pushed_before = parse_timedelta(args.pushed_before)
+        if "created_after" in args:
+            self.created_after = parse_timedelta(args.created_after)
+            self.created_before = parse_timedelta(args.created_before)
+            self.updated_after = parse_timedelta(args.updated_after)
+            self.updated_before = parse_timedelta(args.updated_before)
+
+        if "org" in args and args.org:
+            self.owners.extend(RepoOwner("org", org) for org in args.org)
+        if "user" in args and args.user:
+            self.owners.extend(RepoOwner("user", user) for user in args.user)
+        if "search" in args:
+            self.search = args.search
+        if "repo_cache_db" in args and args.repo_cache_db:
+            self.cache = instarepo.repo_cache.RepoCache(
+                args.repo_cache_db,
+                ttl=parse_timedelta(args.repo_cache_ttl),
+                offline=args.cached,
+            )
+        elif "cached" in args and args.cached:
+            raise ValueError("--cached needs --repo-cache-db")
+        if "repos_from" in args:
+            self.repos_from = args.repos_from
+            self.save_selection = args.save_selection
+        if "shard" in args and args.shard:
+            self.shard = instarepo.repo_shard.Shard.parse(args.shard)
+            self.shard_by = args.shard_by
 
         return self
 
@@ -228,6 +530,21 @@ class RepoSourceBuilder:
             self.language,
             self.pushed_after,
             self.pushed_before,
+            self.owners,
+            self.search,
+            self.created_after,
+            self.created_before,
+            self.updated_after,
+            self.updated_before,
+            self.cache,
+            self.name_pattern,
+            self.topic,
+            self.min_size,
+            self.max_size,
+            self.repos_from,
+            self.save_selection,
+            self.shard,
+            self.shard_by,
         )
 
 
@@ -237,18 +554,7 @@ def filter_by_name_prefix(
     """
     Filters the given repos on their name using the given filter.
     """
-    if (
-        not string_filter
-        or not string_filter.value
-        or string_filter.mode == FilterMode.ALLOW
-    ):
-        return repos
-    if string_filter.mode == FilterMode.ONLY:
-        return (repo for repo in repos if repo.name.startswith(string_filter.value))
-    elif string_filter.mode == FilterMode.DENY:
-        return (repo for repo in repos if not repo.name.startswith(string_filter.value))
-    else:
-        raise ValueError("Invalid filter mode " + string_filter.mode)
+    return _add_name_prefix(RepoFilter(), string_filter).apply(repos)
 
 
 def filter_by_language(
@@ -257,20 +563,106 @@ def filter_by_language(
     """
     Filters the given repos on their language using the given filter.
     """
-    if not string_filter or string_filter.mode == FilterMode.ALLOW:
-        return repos
-    if string_filter.mode == FilterMode.ONLY:
-        if string_filter.value:
-            return (repo for repo in repos if repo.language == string_filter.value)
-        else:
-            return (repo for repo in repos if not repo.language)
-    elif string_filter.mode == FilterMode.DENY:
-        if string_filter.value:
-            return (repo for repo in repos if repo.language != string_filter.value)
-        else:
-            return (repo for repo in repos if repo.language)
-    else:
-        raise ValueError("Invalid filter mode " + string_filter.mode)
+    return _add_language(RepoFilter(), string_filter).apply(repos)
+
+
+def _add_name_prefix(
+    repo_filter: RepoFilter, string_filter: Optional[StringFilter]
+) -> RepoFilter:
+    if string_filter and string_filter.is_active():
+        # an empty prefix matches every name
+        prefixes = [prefix for prefix in string_filter.values if prefix]
+        if len(prefixes) == len(string_filter.values):
+            repo_filter.require_prefix(prefixes, string_filter.match)
+    return repo_filter
+
+
+def _add_language(
+    repo_filter: RepoFilter, string_filter: Optional[StringFilter]
+) -> RepoFilter:
+    if string_filter and string_filter.is_active():
+        repo_filter.require_language(string_filter.values, string_filter.match)
+    return repo_filter
+
+
+def sort_key(sort: str):
+    """
+    Gets a function that returns the value of the given GitHub sort field of a repo.
+    """
+    if sort == "created":
+        return lambda repo: repo.created_at
+    if sort == "updated":
+        return lambda repo: repo.updated_at
+    if sort == "pushed":
+        return lambda repo: repo.pushed_at
+    return lambda repo: repo.full_name.lower()
+
+
+def merge_sorted(
+    streams: List[Iterable[instarepo.github.Repo]], sort: str, direction: str
+) -> Iterable[instarepo.github.Repo]:
+    """
+    Merges the given streams, each one already sorted by `sort` and `direction`,
+    into one sorted stream. Repositories that appear in more than one stream
+    are returned only once.
+    """
+    seen = set()
+    merged = heapq.merge(*streams, key=sort_key(sort), reverse=direction == "desc")
+    for repo in merged:
+        if repo.full_name not in seen:
+            seen.add(repo.full_name)
+            yield repo
+
+
+_END_OF_STREAM = object()
+
+
+def _prefetch(iterable: Iterable, max_size: int = 100) -> Iterable:
+    """
+    Consumes the given iterable on a background thread, keeping
+    at most `max_size` items ahead of the caller.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=max_size)
+    stopped = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not _put(buffer, item, stopped):
+                    return
+            _put(buffer, _END_OF_STREAM, stopped)
+        except Exception as ex:  # pylint: disable=broad-except
+            _put(buffer, ex, stopped)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_STREAM:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+
+
+def _put(buffer: queue.Queue, item, stopped: threading.Event) -> bool:
+    while not stopped.is_set():
+        try:
+            buffer.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _search_date(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _quote(value: str) -> str:
+    return f'"{value}"' if " " in value else value
 
 
 def parse_timedelta(value: Optional[str]):
@@ -1,9 +1,14 @@
-from datetime import timedelta
+import re
+from datetime import datetime, timedelta, timezone
+import requests.auth
 from .github import Repo
+from .main import parse_args
 from .repo_source import (
+    RepoSourceBuilder,
     StringFilter,
     FilterMode,
     filter_by_name_prefix,
+    merge_sorted,
     parse_timedelta,
 )
 
@@ -35,7 +40,12 @@ def test_filter_by_repo_deny_filter():
     assert result == repos[1:]
 
 
-def dummy_repo(name: str) -> Repo:
+def dummy_repo(
+    name: str,
+    full_name: str = "",
+    pushed_at: str = "2021-11-04T21:32:00Z",
+    created_at: str = "2021-11-04T21:32:00Z",
+) -> Repo:
     return Repo(
         {
             "name": name,
@@ -44,12 +54,12 @@ def dummy_repo(name: str) -> Repo:
             "html_url": "",
             "ssh_url": "",
             "default_branch": "",
-            "full_name": "",
+            "full_name": full_name,
             "description": "",
             "private": False,
             "fork": False,
-            "created_at": "2021-11-04T21:32:00Z",
-            "pushed_at": "2021-11-04T21:32:00Z",
+            "created_at": created_at,
+            "pushed_at": pushed_at,
             "updated_at": "2021-11-04T21:32:00Z",
             "language": "",
         }
@@ -61,3 +71,325 @@ def test_parse_timedelta():
     assert parse_timedelta("15m") == timedelta(minutes=15)
     assert parse_timedelta("3d") == timedelta(days=3)
     assert parse_timedelta(None) is None
+
+
+def test_merge_sorted_by_pushed_desc():
+    first = [
+        dummy_repo("a", "org1/a", "2021-11-06T00:00:00Z"),
+        dummy_repo("b", "org1/b", "2021-11-03T00:00:00Z"),
+    ]
+    second = [
+        dummy_repo("c", "org2/c", "2021-11-05T00:00:00Z"),
+        dummy_repo("a", "org1/a", "2021-11-06T00:00:00Z"),
+        dummy_repo("d", "org2/d", "2021-11-01T00:00:00Z"),
+    ]
+    result = list(merge_sorted([iter(first), iter(second)], "pushed", "desc"))
+    assert [repo.full_name for repo in result] == [
+        "org1/a",
+        "org2/c",
+        "org1/b",
+        "org2/d",
+    ]
+
+
+def test_merge_sorted_by_full_name_asc():
+    first = [dummy_repo("b", "jdoe/b"), dummy_repo("Z", "jdoe/Z")]
+    second = [dummy_repo("a", "acme/a"), dummy_repo("c", "jdoe/c")]
+    result = list(merge_sorted([iter(first), iter(second)], "full_name", "asc"))
+    assert [repo.full_name for repo in result] == [
+        "acme/a",
+        "jdoe/b",
+        "jdoe/c",
+        "jdoe/Z",
+    ]
+
+
+class FakeOwnersGitHub:
+    def __init__(self):
+        self.auth = None
+
+    def get_org_repos(self, org: str, sort: str, direction: str, stop=None):
+        return iter([dummy_repo("x", f"{org}/x"), dummy_repo("y", f"{org}/y")])
+
+    def get_user_repos(self, user: str, sort: str, direction: str, stop=None):
+        return iter([dummy_repo("w", f"{user}/w")])
+
+
+def test_repo_source_merges_owners():
+    args = parse_args(
+        ["list", "-u", "jdoe", "-t", "secret", "--org", "acme", "--user", "bob"]
+    )
+    repo_source = (
+        RepoSourceBuilder().with_github(FakeOwnersGitHub()).with_args(args).build()
+    )
+    result = [repo.full_name for repo in repo_source.get()]
+    assert result == ["acme/x", "acme/y", "bob/w"]
+
+
+class FakeSearchGitHub(FakeOwnersGitHub):
+    def __init__(self, search_results):
+        super().__init__()
+        self.auth = requests.auth.HTTPBasicAuth("jdoe", "secret")
+        self.search_results = search_results
+        self.queries = []
+
+    def get_all_repos(self, sort: str, direction: str, stop=None):
+        return iter([dummy_repo("listed", "jdoe/listed")])
+
+    def search_repos(self, query: str):
+        self.queries.append(query)
+        return self.search_results
+
+
+def test_repo_source_searches_selective_filters():
+    args = parse_args(
+        [
+            "list",
+            "-u",
+            "jdoe",
+            "-t",
+            "secret",
+            "--only-language",
+            "Python",
+            "--only-name-prefix",
+            "a",
+        ]
+    )
+    github = FakeSearchGitHub(
+        [
+            dummy_repo("b", "jdoe/b"),
+            dummy_repo("ab", "jdoe/ab"),
+            dummy_repo("aa", "jdoe/aa"),
+        ]
+    )
+    for repo in github.search_results:
+        repo.language = "Python"
+    repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+    result = [repo.full_name for repo in repo_source.get()]
+    assert github.queries == ["user:jdoe language:Python archived:false fork:false"]
+    # sorted locally, the name prefix is filtered locally
+    assert result == ["jdoe/aa", "jdoe/ab"]
+
+
+def test_repo_source_search_query_of_owners():
+    args = parse_args(
+        [
+            "list",
+            "-u",
+            "jdoe",
+            "-t",
+            "secret",
+            "--org",
+            "acme",
+            "--forks",
+            "only",
+            "--archived",
+            "allow",
+        ]
+    )
+    github = FakeSearchGitHub([])
+    repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+    assert not list(repo_source.get())
+    assert github.queries == ["org:acme fork:only"]
+
+
+def test_repo_source_lists_when_filters_are_not_selective():
+    args = parse_args(["list", "-u", "jdoe", "-t", "secret", "--except-language", "Go"])
+    github = FakeSearchGitHub([])
+    repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+    assert [repo.full_name for repo in repo_source.get()] == ["jdoe/listed"]
+    assert not github.queries
+
+
+def test_repo_source_lists_when_search_has_too_many_results():
+    args = parse_args(["list", "-u", "jdoe", "-t", "secret", "--pushed-after", "4h"])
+    github = FakeSearchGitHub(None)
+    repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+    # the listed repo is filtered out locally, because it was pushed long ago
+    assert not list(repo_source.get())
+    assert re.match(r"user:jdoe pushed:>=\d{4}-\d{2}-\d{2} ", github.queries[0])
+
+
+def test_repo_source_search_can_be_disabled():
+    args = parse_args(
+        ["list", "-u", "jdoe", "-t", "secret", "--forks", "only", "--no-search-api"]
+    )
+    github = FakeSearchGitHub([])
+    repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+    list(repo_source.get())
+    assert not github.queries
+
+
+class FakeStopGitHub:
+    def __init__(self, repos):
+        self.auth = None
+        self.repos = repos
+        self.listed = []
+
+    def get_all_repos(self, sort: str, direction: str, stop=None):
+        for repo in self.repos:
+            self.listed.append(repo.name)
+            if stop and stop(repo):
+                return
+            yield repo
+
+
+def _ago(**kwargs) -> str:
+    return (datetime.now(timezone.utc) - timedelta(**kwargs)).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+def test_repo_source_stops_listing_sorted_desc_after_the_time_filter():
+    args = parse_args(
+        [
+            "list",
+            "-u",
+            "jdoe",
+            "-t",
+            "secret",
+            "--sort",
+            "pushed",
+            "--direction",
+            "desc",
+            "--pushed-after",
+            "2d",
+            "--no-search-api",
+        ]
+    )
+    github = FakeStopGitHub(
+        [
+            dummy_repo("a", "jdoe/a", _ago(hours=1)),
+            dummy_repo("b", "jdoe/b", _ago(days=1)),
+            dummy_repo("c", "jdoe/c", _ago(days=3)),
+            dummy_repo("d", "jdoe/d", _ago(days=4)),
+        ]
+    )
+    repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+    assert [repo.name for repo in repo_source.get()] == ["a", "b"]
+    assert github.listed == ["a", "b", "c"]
+
+
+def test_repo_source_stops_listing_sorted_asc_before_the_time_filter():
+    args = parse_args(
+        [
+            "list",
+            "-u",
+            "jdoe",
+            "-t",
+            "secret",
+            "--sort",
+            "created",
+            "--direction",
+            "asc",
+            "--created-before",
+            "2d",
+            "--no-search-api",
+        ]
+    )
+    github = FakeStopGitHub(
+        [
+            dummy_repo("a", "jdoe/a"),
+            dummy_repo("b", "jdoe/b", created_at=_ago(days=1)),
+            dummy_repo("c", "jdoe/c"),
+        ]
+    )
+    repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+    assert [repo.name for repo in repo_source.get()] == ["a"]
+    assert github.listed == ["a", "b"]
+
+
+def test_repo_source_lists_all_pages_when_sort_and_filter_differ():
+    args = parse_args(
+        [
+            "list",
+            "-u",
+            "jdoe",
+            "-t",
+            "secret",
+            "--sort",
+            "updated",
+            "--direction",
+            "desc",
+            "--pushed-after",
+            "2d",
+            "--no-search-api",
+        ]
+    )
+    github = FakeStopGitHub(
+        [
+            dummy_repo("a", "jdoe/a", _ago(days=3)),
+            dummy_repo("b", "jdoe/b", _ago(hours=1)),
+        ]
+    )
+    repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+    assert [repo.name for repo in repo_source.get()] == ["b"]
+    assert github.listed == ["a", "b"]
+
+
+def test_repo_source_compiles_all_filters():
+    args = parse_args(
+        [
+            "list",
+            "-u",
+            "jdoe",
+            "-t",
+            "secret",
+            "--only-name-prefix",
+            "api-",
+            "--only-name-prefix",
+            "web-",
+            "--except-name-regex=-legacy$",
+            "--except-topic",
+            "deprecated",
+            "--max-size",
+            "1000",
+            "--no-search-api",
+        ]
+    )
+    repos = [
+        dummy_repo("api-a", "jdoe/api-a"),
+        dummy_repo("web-b", "jdoe/web-b"),
+        dummy_repo("lib-c", "jdoe/lib-c"),
+        dummy_repo("api-legacy", "jdoe/api-legacy"),
+        dummy_repo("web-d", "jdoe/web-d"),
+        dummy_repo("web-e", "jdoe/web-e"),
+    ]
+    repos[4].topics = ["deprecated"]
+    repos[5].size = 5000
+    repo_source = (
+        RepoSourceBuilder().with_github(FakeStopGitHub(repos)).with_args(args).build()
+    )
+    result = [repo.name for repo in repo_source.get()]
+    assert result == ["api-a", "web-b"]
+
+
+def test_repo_source_searches_one_topic():
+    args = parse_args(
+        ["list", "-u", "jdoe", "-t", "secret", "--only-topic", "cli", "--min-size", "5"]
+    )
+    github = FakeSearchGitHub([])
+    repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+    list(repo_source.get())
+    assert github.queries == ["user:jdoe topic:cli size:>=5 archived:false fork:false"]
+
+
+def test_repo_source_lists_when_several_languages_are_wanted():
+    args = parse_args(
+        [
+            "list",
+            "-u",
+            "jdoe",
+            "-t",
+            "secret",
+            "--only-language",
+            "Go",
+            "--only-language",
+            "",
+        ]
+    )
+    github = FakeSearchGitHub([])
+    repo_source = RepoSourceBuilder().with_github(github).with_args(args).build()
+    # the listed repo has no language
+    assert [repo.full_name for repo in repo_source.get()] == ["jdoe/listed"]
+    assert not github.queries
@@ -0,0 +1,80 @@
+"""
+Retries requests that failed because of transient errors.
+"""
+
+import random
+import time
+
+import requests
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+"""HTTP methods that can be sent again without changing the outcome."""
+
+RETRYABLE_STATUS_CODES = (500, 502, 503, 504)
+
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+
+class RetryPolicy:
+    """
+    Decides which failures are transient and how long to wait before
+    trying again, using capped exponential backoff with full jitter.
+
+    See https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+    """
+
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        rand=random.random,
+        sleep=time.sleep,
+    ):
+        """
+        Creates an instance of this class.
+
+        :param max_retries: The number of times to retry a failed request
+        :param base_delay: The maximum number of seconds to wait before the first retry
+        :param max_delay: The maximum number of seconds to wait before any retry
+        :param rand: Returns a random number in [0, 1)
+        :param sleep: Sleeps the calling thread for the given number of seconds
+        """
+        self.max_retries = max(max_retries, 0)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rand = rand
+        self._sleep = sleep
+
+    def can_retry(self, retry: int) -> bool:
+        """
+        Checks if the given retry (1 for the first one) is allowed.
+        """
+        return retry <= self.max_retries
+
+    def delay(self, retry: int) -> float:
+        """
+        Gets the number of seconds to wait before the given retry (1 for the first one).
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (retry - 1)))
+        return self._rand() * ceiling
+
+    def backoff(self, retry: int):
+        """
+        Waits before the given retry (1 for the first one).
+        """
+        self._sleep(self.delay(retry))
+
+
+def is_retryable_status(status_code: int) -> bool:
+    """
+    Checks if a response status code indicates a transient server error.
+    """
+    return status_code in RETRYABLE_STATUS_CODES
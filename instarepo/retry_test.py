@@ -0,0 +1,24 @@
+"""
+Unit tests for the retry module.
+"""
+
+from .retry import RetryPolicy, is_retryable_status
+
+
+def test_delay_is_capped_exponential_with_jitter():
+    policy = RetryPolicy(max_retries=10, base_delay=1, max_delay=5, rand=lambda: 0.99)
+    delays = [round(policy.delay(retry), 2) for retry in range(1, 6)]
+    assert delays == [0.99, 1.98, 3.96, 4.95, 4.95]
+
+
+def test_can_retry():
+    policy = RetryPolicy(max_retries=2)
+    assert policy.can_retry(1)
+    assert policy.can_retry(2)
+    assert not policy.can_retry(3)
+
+
+def test_is_retryable_status():
+    assert is_retryable_status(502)
+    assert not is_retryable_status(404)
+    assert not is_retryable_status(200)
@@ -0,0 +1,244 @@
+"""
+Stand-ins for a git working directory, backed by the GitHub API.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import instarepo.fixers.prescreen
+import instarepo.git
+import instarepo.github
+
+REMOTE_PREFIX = "origin/"
+
+
+class ApiWorkingDir:
+    """
+    Serves the files of a branch from the Git Trees and Blobs APIs,
+    so that fixers that only read files do not need a clone.
+
+    It supports the reading subset of `instarepo.git.GitWorkingDir`:
+    `join`, `isfile`, `isdir` and `read_text`. Paths returned by `join`
+    do not exist on disk and can only be passed back to this class.
+    Operations that change the repository raise an AttributeError,
+    as if they were not defined.
+    """
+
+    def __init__(self, full_name: str, tree: instarepo.fixers.prescreen.RepoTree):
+        """
+        Creates an instance of this class.
+
+        :param full_name: The full name of the repository
+        :param tree: The files of the branch
+        """
+        self.dir = full_name
+        self.tree = tree
+        self.quiet = True
+
+    def join(self, *args) -> str:
+        parts = [self.dir]
+        for arg in args:
+            parts.extend(part for part in arg.replace("\\", "/").split("/") if part)
+        return "/".join(parts)
+
+    def isfile(self, *args) -> bool:
+        return self.tree.isfile(self._relative(*args))
+
+    def isdir(self, *args) -> bool:
+        prefix = self._relative(*args) + "/"
+        return any(path.startswith(prefix) for path in self.tree.blobs)
+
+    def read_text(self, *args) -> str:
+        return self.tree.read_text(self._relative(*args))
+
+    def _relative(self, *args) -> str:
+        return self.join(*args)[len(self.dir) + 1 :]
+
+    def __getattr__(self, name):
+        # any other GitWorkingDir method needs a clone; an AttributeError
+        # keeps hasattr, getattr with a default, copy and pickle working
+        raise AttributeError(
+            f"{name} is not supported without a clone, the fixer must be read-only"
+        )
+
+
+class GitDataWorkingDir(ApiWorkingDir):
+    """
+    A working directory that commits through the Git Data API, so that
+    fixers that only change text files need neither a clone nor a push.
+
+    Written files are kept in memory. Commits are kept in memory as well,
+    until `push` creates their trees and commits on GitHub and points the
+    branch to the last one. Branch operations (`create_branch`, `checkout`,
+    `get_behind_ahead`, etc.) work on the branches of GitHub,
+    i.e. `origin/branch` and `branch` are the same.
+
+    Pushing costs a tree and a commit per commit, plus a branch update.
+    They are all mutating requests, which the rate limiter spaces by
+    `instarepo.rate_limit.DEFAULT_MUTATION_INTERVAL`, so they take about
+    a second each regardless of their size.
+    """
+
+    def __init__(
+        self,
+        github: instarepo.github.GitHub,
+        repo: instarepo.github.Repo,
+        head: str,
+        tree: instarepo.fixers.prescreen.RepoTree,
+        load_tree: Callable[[str], Optional[instarepo.fixers.prescreen.RepoTree]],
+    ):
+        """
+        Creates an instance of this class.
+        Use `open` to start from the default branch.
+
+        :param github: The GitHub client
+        :param repo: The repository
+        :param head: The SHA of the commit that is checked out
+        :param tree: The files of the commit that is checked out
+        :param load_tree: Gets the files of a commit by its SHA, or None if they are not available
+        """
+        super().__init__(repo.full_name, tree)
+        self.github = github
+        self.repo = repo
+        self.branch = repo.default_branch
+        self.head = head
+        self.base_tree = tree.sha
+        self._load_tree = load_tree
+        self._remote_heads: Dict[str, Optional[str]] = {repo.default_branch: head}
+        self._comparisons: Dict[Tuple[str, str], dict] = {}
+        self._written: Dict[str, str] = {}
+        self._staged: List[str] = []
+        self._commits: List[Tuple[str, Dict[str, str]]] = []
+
+    @staticmethod
+    def open(
+        github: instarepo.github.GitHub,
+        repo: instarepo.github.Repo,
+        load_tree: Callable[[str], Optional[instarepo.fixers.prescreen.RepoTree]],
+        head: Optional[str] = None,
+        tree: Optional[instarepo.fixers.prescreen.RepoTree] = None,
+    ):
+        """
+        Checks out the default branch of the given repository.
+        Returns None if its files are not available (e.g. the tree is truncated).
+
+        :param github: The GitHub API client
+        :param repo: The repository
+        :param load_tree: Gets the files of a commit by its SHA
+        :param head: The SHA of the default branch, if it is already known
+        :param tree: The files of `head`, if they are already fetched
+        """
+        if head is None:
+            head = github.get_branch_sha(repo.full_name, repo.default_branch)
+            if not head:
+                return None
+        if tree is None:
+            tree = load_tree(head)
+        if tree is None or not tree.sha:
+            return None
+        return GitDataWorkingDir(github, repo, head, tree, load_tree)
+
+    def isfile(self, *args) -> bool:
+        return self._relative(*args) in self._written or super().isfile(*args)
+
+    def isdir(self, *args) -> bool:
+        prefix = self._relative(*args) + "/"
+        return any(path.startswith(prefix) for path in self._written) or super().isdir(
+            *args
+        )
+
+    def read_text(self, *args) -> str:
+        path = self._relative(*args)
+        if path in self._written:
+            return self._written[path]
+        return super().read_text(*args)
+
+    def write_text(self, relative_path: str, contents: str) -> None:
+        self._written[self._relative(relative_path)] = contents
+
+    def add(self, file: str) -> None:
+        path = self._relative(file)
+        if path not in self._written:
+            raise ValueError(f"Only written files can be added, {file} was not")
+        if path not in self._staged:
+            self._staged.append(path)
+
+    def commit(self, message: str) -> None:
+        files = {path: self._written.pop(path) for path in self._staged}
+        self._staged = []
+        self._commits.append((message, files))
+        self.tree = self.tree.with_files(files)
+
+    def create_branch(self, name: str) -> None:
+        self.branch = name
+
+    def checkout(self, name: str) -> None:
+        head = self._remote_head(name)
+        tree = self._load_tree(head) if head else None
+        if tree is None or not tree.sha:
+            raise ValueError(f"Could not check out branch {name}")
+        self.branch = name
+        self.head = head
+        self.tree = tree
+        self.base_tree = tree.sha
+
+    def push(self, force: bool = False, remote_name: str = "origin") -> None:
+        head = self.head
+        base_tree = self.base_tree
+        for message, files in self._commits:
+            entries = [
+                {
+                    "path": path,
+                    "mode": self.tree.mode(path),
+                    "type": "blob",
+                    "content": contents,
+                }
+                for path, contents in files.items()
+            ]
+            base_tree = self.github.create_tree(self.dir, base_tree, entries)
+            head = self.github.create_commit(self.dir, message, base_tree, [head])
+        if self._remote_head(self.branch) is None:
+            self.github.create_ref(self.dir, self.branch, head)
+        else:
+            self.github.update_ref(self.dir, self.branch, head, force)
+        self._commits = []
+        self.head = head
+        self.base_tree = base_tree
+        self._remote_heads[self.branch] = head
+        self._comparisons.clear()
+
+    def delete_remote_branch(
+        self, branch_name: str, remote_name: str = "origin"
+    ) -> None:
+        self.github.delete_ref(self.dir, branch_name)
+        self._remote_heads[branch_name] = None
+        self._comparisons.clear()
+
+    def is_remote_branch_present(self, branch: str, remote="origin") -> bool:
+        return self._remote_head(branch) is not None
+
+    def get_behind_ahead(self, base: str, head: str):
+        comparison = self._compare(base, head)
+        return comparison["behind_by"], comparison["ahead_by"]
+
+    def get_author_names(self, branch_name: str) -> List[str]:
+        comparison = self._compare(self.repo.default_branch, branch_name)
+        return [commit["commit"]["author"]["name"] for commit in comparison["commits"]]
+
+    def user_name(self) -> str:
+        return instarepo.git.global_user_name()
+
+    def _compare(self, base: str, head: str) -> dict:
+        key = (_branch_name(base), _branch_name(head))
+        if key not in self._comparisons:
+            self._comparisons[key] = self.github.compare_commits(self.dir, *key)
+        return self._comparisons[key]
+
+    def _remote_head(self, branch: str) -> Optional[str]:
+        branch = _branch_name(branch)
+        if branch not in self._remote_heads:
+            self._remote_heads[branch] = self.github.get_branch_sha(self.dir, branch)
+        return self._remote_heads[branch]
+
+
+def _branch_name(name: str) -> str:
+    return name[len(REMOTE_PREFIX) :] if name.startswith(REMOTE_PREFIX) else name
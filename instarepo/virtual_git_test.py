@@ -0,0 +1,124 @@
+"""
+Unit tests for the virtual_git module.
+"""
+
+import pytest
+import requests.auth
+from pytest_mock import MockerFixture
+
+import instarepo.fixers.context
+import instarepo.git
+from .fake_github import FakeGitHubServer
+from .fixers.prescreen import RepoTree
+from .fixers.repo_description import RepoDescriptionFix
+from .github import ReadWriteGitHub
+from .repo_source_test import dummy_repo
+from .virtual_git import ApiWorkingDir, GitDataWorkingDir
+
+
+def _working_dir(files):
+    texts = dict(files)
+    tree = RepoTree({path: path for path in files}, texts.__getitem__)
+    return ApiWorkingDir("jdoe/foo", tree)
+
+
+def test_read_files():
+    git = _working_dir({"README.md": "# foo\n", "docs/index.md": "Docs"})
+    assert git.isfile("README.md")
+    assert not git.isfile("LICENSE")
+    assert git.isdir("docs")
+    assert not git.isdir("src")
+    assert git.read_text("docs", "index.md") == "Docs"
+
+
+def test_changes_are_not_supported():
+    git = _working_dir({})
+    with pytest.raises(AttributeError):
+        git.commit("chore: change")
+    assert not hasattr(git, "commit")
+
+
+def test_repo_description_without_clone(mocker: MockerFixture):
+    # arrange
+    github = mocker.Mock()
+    context = instarepo.fixers.context.Context(
+        git=_working_dir({"README.md": "# foo\n\nA better description\n"}),
+        config=None,
+        repo=dummy_repo("foo", "jdoe/foo"),
+        github=github,
+    )
+
+    # act
+    result = RepoDescriptionFix(context).run()
+
+    # assert
+    assert result == []
+    github.update_description.assert_called_once_with(
+        "jdoe/foo", "A better description"
+    )
+
+
+def _read_write_github(server: FakeGitHubServer) -> ReadWriteGitHub:
+    github = ReadWriteGitHub(
+        auth=requests.auth.HTTPBasicAuth("octocat", "token"), api_url=server.url
+    )
+    github.rate_limiter.mutation_interval = 0
+    return github
+
+
+def _open_git_data_working_dir(github, repo):
+    return GitDataWorkingDir.open(
+        github,
+        repo,
+        lambda sha: RepoTree.from_json(
+            github.get_tree(repo.full_name, sha),
+            lambda blob: github.get_blob_text(repo.full_name, blob),
+        ),
+    )
+
+
+def test_commits_are_pushed_through_the_git_data_api(tmp_path):
+    with FakeGitHubServer(repo_count=1, git_dir=str(tmp_path / "remotes")) as server:
+        github = _read_write_github(server)
+        repo = next(github.get_all_repos("full_name", "asc"))
+        git = _open_git_data_working_dir(github, repo)
+        git.create_branch("instarepo_branch")
+        git.write_text("docs/index.md", "Docs\n")
+        git.add("docs/index.md")
+        git.commit("Adding docs")
+        git.write_text("README.md", "# Readme\n")
+        git.add("README.md")
+        git.commit("Updated README")
+        assert git.read_text("README.md") == "# Readme\n"
+        assert git.isdir("docs")
+        git.push()
+
+        # a second working dir continues on the pushed branch
+        other = _open_git_data_working_dir(github, repo)
+        assert other.is_remote_branch_present("instarepo_branch")
+        assert other.get_behind_ahead("origin/main", "origin/instarepo_branch") == (
+            0,
+            2,
+        )
+        assert other.get_author_names("origin/instarepo_branch") == [
+            instarepo.git.AUTHOR_NAME,
+            instarepo.git.AUTHOR_NAME,
+        ]
+        other.checkout("instarepo_branch")
+        assert other.read_text("docs/index.md") == "Docs\n"
+        other.delete_remote_branch("instarepo_branch")
+        assert not other.is_remote_branch_present("instarepo_branch")
+
+    clone = instarepo.git.clone(repo.ssh_url, str(tmp_path / "clone"), quiet=True)
+    assert not clone.is_remote_branch_present("instarepo_branch")
+
+
+def test_only_written_files_can_be_added(tmp_path):
+    with FakeGitHubServer(repo_count=1, git_dir=str(tmp_path / "remotes")) as server:
+        github = _read_write_github(server)
+        repo = next(github.get_all_repos("full_name", "asc"))
+        git = _open_git_data_working_dir(github, repo)
+    with pytest.raises(ValueError):
+        git.add("README.md")
+    with pytest.raises(AttributeError):
+        git.rm("README.md")
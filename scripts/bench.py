@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Times an instarepo command against a local fake GitHub API.
+
+Starts instarepo.fake_github.FakeGitHubServer with the requested number of
+synthetic repositories and runs the given instarepo command against it.
+
+Usage: python scripts/bench.py [--repos N] [--latency SECONDS]
+           [--error-rate RATE] [--rate-limit N] [--git-dir DIR] -- COMMAND [ARGS...]
+
+Example: python scripts/bench.py --repos 10000 -- list
+"""
+
+import argparse
+import logging
+import os.path
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# pylint: disable=wrong-import-position
+import instarepo.http_metrics
+import instarepo.http_session
+import instarepo.main
+from instarepo.fake_github import FakeGitHubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repos", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int)
+    parser.add_argument("--git-dir")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    command = [arg for arg in args.command if arg != "--"] or ["list"]
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    with FakeGitHubServer(
+        repo_count=args.repos,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        git_dir=args.git_dir,
+    ) as server:
+        instarepo_args = instarepo.main.parse_args(
+            [
+                command[0],
+                "-u",
+                server.owner,
+                "-t",
+                "token",
+                "--api-url",
+                server.url,
+                *command[1:],
+            ]
+        )
+        cmd = instarepo.main.create_command(instarepo_args)
+        started = time.perf_counter()
+        # the output of the command is not interesting here
+        with open(os.devnull, "w", encoding="utf-8") as devnull:
+            stdout = sys.stdout
+            sys.stdout = devnull
+            try:
+                cmd.run()
+            finally:
+                sys.stdout = stdout
+        elapsed = time.perf_counter() - started
+        print(f"{' '.join(command)}: {elapsed:.3f}s for {args.repos} repos")
+        print(f"Server requests: {server.request_count}")
+        print(f"HTTP connections: {instarepo.http_session.CONNECTION_STATS}")
+        print(instarepo.http_metrics.HTTP_METRICS.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Measures the memory and construction cost of instarepo.github.Repo objects.
+
+Compares the current implementation with the previous one, which parsed
+all timestamps eagerly and kept a per-instance attribute dictionary.
+
+Usage: python scripts/benchmark_repo.py [COUNT]
+"""
+
+import datetime
+import gc
+import os.path
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# pylint: disable=wrong-import-position
+from instarepo.github import Repo
+
+
+class EagerRepo:
+    """The previous implementation of Repo, kept for comparison."""
+
+    def __init__(self, repo_json):
+        self.name: str = repo_json["name"]
+        self.archived: bool = repo_json["archived"]
+        self.clone_url: str = repo_json["clone_url"]
+        self.html_url: str = repo_json["html_url"]
+        self.ssh_url: str = repo_json["ssh_url"]
+        self.default_branch: str = repo_json["default_branch"]
+        self.full_name: str = repo_json["full_name"]
+        self.description: str = repo_json["description"]
+        self.private: bool = repo_json["private"]
+        self.fork: bool = repo_json["fork"]
+        self.created_at = datetime.datetime.strptime(
+            repo_json["created_at"], "%Y-%m-%dT%H:%M:%S%z"
+        )
+        self.pushed_at = datetime.datetime.strptime(
+            repo_json["pushed_at"], "%Y-%m-%dT%H:%M:%S%z"
+        )
+        self.updated_at = datetime.datetime.strptime(
+            repo_json["updated_at"], "%Y-%m-%dT%H:%M:%S%z"
+        )
+        self.language: str = repo_json["language"]
+
+
+def repo_json(i: int):
+    """Creates a payload similar to the one of the GitHub API"""
+    name = f"repo-{i}"
+    full_name = f"jdoe/{name}"
+    result = {
+        "id": i,
+        "name": name,
+        "full_name": full_name,
+        "archived": False,
+        "clone_url": f"https://github.com/{full_name}.git",
+        "html_url": f"https://github.com/{full_name}",
+        "ssh_url": f"git@github.com:{full_name}.git",
+        "default_branch": "main",
+        "description": f"Description of {name}",
+        "private": False,
+        "fork": False,
+        "created_at": "2021-11-04T21:32:00Z",
+        "pushed_at": "2022-01-04T21:32:00Z",
+        "updated_at": "2022-02-04T21:32:00Z",
+        "language": "Python",
+        "owner": {"login": "jdoe", "id": 1, "url": "https://api.github.com/users/jdoe"},
+        "permissions": {"admin": True, "push": True, "pull": True},
+    }
+    for key in ["archive", "assignees", "blobs", "branches", "commits", "events"]:
+        result[key + "_url"] = f"https://api.github.com/repos/{full_name}/{key}"
+    return result
+
+
+def measure_memory(repo_class, payloads):
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    repos = [repo_class(payload) for payload in payloads]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del repos
+    return (after - before) / len(payloads)
+
+
+def measure_time(repo_class, payloads):
+    seconds = min(
+        timeit.repeat(
+            lambda: [repo_class(payload) for payload in payloads], number=1, repeat=5
+        )
+    )
+    return seconds / len(payloads) * 1_000_000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    payloads = [repo_json(i) for i in range(count)]
+    print(f"{'implementation':15s} {'bytes/repo':>12s} {'us/repo':>10s}")
+    for label, repo_class in [("before (eager)", EagerRepo), ("after (slots)", Repo)]:
+        memory = measure_memory(repo_class, payloads)
+        micros = measure_time(repo_class, payloads)
+        print(f"{label:15s} {memory:12.0f} {micros:10.2f}")
+
+
+if __name__ == "__main__":
+    main()